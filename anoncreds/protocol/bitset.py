@@ -0,0 +1,211 @@
+from collections.abc import MutableSet, Set
+
+
+class BitSet(MutableSet):
+    """
+    A set of non-negative integers packed into the bits of a bytearray.
+
+    A drop-in replacement for a `set` of claim indexes: it takes a bit per
+    possible index instead of tens of bytes per member. Membership tests,
+    `add` and `discard` touch a single byte; unions, differences and
+    comparisons go through one big-integer operation on the whole set.
+    """
+
+    __slots__ = ('_buf', '_len')
+
+    def __init__(self, values=()):
+        if isinstance(values, BitSet):
+            self._buf = bytearray(values._buf)
+            self._len = values._len
+        else:
+            self._buf = bytearray()
+            self._len = 0
+            for value in values:
+                self.add(value)
+
+    @classmethod
+    def _fromInt(cls, bits):
+        result = cls()
+        result._buf = bytearray(_toBytes(bits))
+        result._len = _popCount(bits)
+        return result
+
+    @classmethod
+    def _coerce(cls, other):
+        if isinstance(other, BitSet):
+            return other
+        if isinstance(other, Set):
+            return cls(other)
+        return None
+
+    def _toInt(self):
+        return int.from_bytes(self._buf, 'little')
+
+    def _assign(self, bits):
+        self._buf = bytearray(_toBytes(bits))
+        self._len = _popCount(bits)
+        return self
+
+    def __contains__(self, value):
+        if not isinstance(value, int) or value < 0:
+            return False
+        offset = value >> 3
+        return offset < len(self._buf) and \
+            bool(self._buf[offset] & 1 << (value & 7))
+
+    def __iter__(self):
+        for offset, byte in enumerate(self._buf):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield offset * 8 + bit
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len != 0
+
+    def __eq__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._len == other._len and self._toInt() == other._toInt()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'BitSet({})'.format(sorted(self))
+
+    def add(self, value):
+        offset = _index(value) >> 3
+        if offset >= len(self._buf):
+            self._buf.extend(bytes(offset + 1 - len(self._buf)))
+        mask = 1 << (value & 7)
+        if not self._buf[offset] & mask:
+            self._buf[offset] |= mask
+            self._len += 1
+
+    def discard(self, value):
+        if value in self:
+            self._buf[value >> 3] ^= 1 << (value & 7)
+            self._len -= 1
+
+    def copy(self):
+        return BitSet(self)
+
+    def __or__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._fromInt(self._toInt() | other._toInt())
+
+    def __and__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._fromInt(self._toInt() & other._toInt())
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._fromInt(self._toInt() & ~other._toInt())
+
+    def __rsub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._fromInt(other._toInt() & ~self._toInt())
+
+    def __xor__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._fromInt(self._toInt() ^ other._toInt())
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __ior__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._assign(self._toInt() | other._toInt())
+
+    def __iand__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._assign(self._toInt() & other._toInt())
+
+    def __isub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._assign(self._toInt() & ~other._toInt())
+
+    def __ixor__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._assign(self._toInt() ^ other._toInt())
+
+    def __le__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self._toInt() & ~other._toInt() == 0
+
+    def __ge__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return other._toInt() & ~self._toInt() == 0
+
+    def __lt__(self, other):
+        return self <= other and self != other
+
+    def __gt__(self, other):
+        return self >= other and self != other
+
+    def changes(self, other):
+        """
+        The members of either set that are not in the other one, as
+        (added, removed) BitSets where `added` are the members of `other`
+        missing from this set.
+        """
+        other = self._coerce(other)
+        bits, otherBits = self._toInt(), other._toInt()
+        diff = bits ^ otherBits
+        return self._fromInt(diff & otherBits), self._fromInt(diff & bits)
+
+    def toBytes(self) -> bytes:
+        return bytes(self._buf.rstrip(b'\0'))
+
+    @classmethod
+    def fromBytes(cls, data: bytes):
+        return cls._fromInt(int.from_bytes(data, 'little'))
+
+    def __getstate__(self):
+        return (self.toBytes(),)
+
+    def __setstate__(self, state):
+        data, = state
+        self._buf = bytearray(data)
+        self._len = _popCount(int.from_bytes(data, 'little'))
+
+
+def _index(value):
+    if not isinstance(value, int) or value < 0:
+        raise ValueError('{} is not a non-negative integer'.format(value))
+    return value
+
+
+def _toBytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def _popCount(bits):
+    return bin(bits).count('1')
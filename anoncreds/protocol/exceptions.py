@@ -4,3 +4,11 @@ class NotFoundError(RuntimeError):
 
 class SchemaNotFoundError(NotFoundError):
     pass
+
+
+class ProofValidationError(ValueError):
+    pass
+
+
+class NonceError(ProofValidationError):
+    pass
@@ -14,8 +14,35 @@ LARGE_VTILDE = 3060
 LARGE_MASTER_SECRET = 256
 LARGE_ALPHATILDE = 2787
 LARGE_M2_TILDE = 1024
+LARGE_CHASH = 256
 ITERATIONS = 4
 
+SIEVE_LIMIT = 2 ** 16
+SIEVE_WINDOW = 2 ** 15
+SAFE_PRIME_SEARCH_WINDOWS = 4
+E_SIEVE_LIMIT = 2 ** 11
+E_SIEVE_WINDOW = 2 ** 9
+E_PRIME_POOL_SIZE = 32
+FIXED_BASE_WINDOW = 6
+OFFLINE_SIGNATURE_POOL_SIZE = 16
+PROOF_COMMITMENT_POOL_SIZE = 4
+# background pools compute their values in this many shared processes
+BACKGROUND_POOL_WORKERS = 1
+NONCE_WINDOW = 300  # seconds
+NONCE_GENERATIONS = 4
+NONCE_CAPACITY = 2 ** 22
+NONCE_ERROR_RATE = 1e-6
+VERIFICATION_CACHE_SIZE = 10000
+VERIFICATION_CACHE_TTL = 300  # seconds
+SERVER_QUEUE_SIZE = 256
+SERVER_MAX_REQUEST_SIZE = 2 ** 20
+SERVER_MAX_HEADERS = 100
+SERVER_MAX_CONNECTIONS = 1024
+SERVER_READ_TIMEOUT = 10  # seconds
+TAILS_CHUNK_SIZE = 1000
+# the number of latest accumulator epochs whose changes are published
+ACCUMULATOR_CHANGE_LOG_SIZE = 1000
+
 PAIRING_GROUP = 'SS1024'  # super singular curve, 1024 bits
 
 MASTER_SEC_RAND = "master_secret_rand"
@@ -1,24 +1,34 @@
-from typing import Dict
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Sequence, Tuple, List
 
-from anoncreds.protocol.globals import LARGE_MASTER_SECRET
+from anoncreds.protocol.globals import LARGE_MASTER_SECRET, \
+    OFFLINE_SIGNATURE_POOL_SIZE
 from anoncreds.protocol.primary.primary_claim_issuer import PrimaryClaimIssuer
+from anoncreds.protocol.primes import SafePrimePool, EPrimePool
 from anoncreds.protocol.repo.attributes_repo import AttributeRepo
 from anoncreds.protocol.revocation.accumulators.non_revocation_claim_issuer import \
     NonRevocationClaimIssuer
 from anoncreds.protocol.types import PrimaryClaim, NonRevocationClaim, \
     Schema, ID, Claims, ClaimRequest, Attribs, PublicKey, \
-    RevocationPublicKey, AccumulatorPublicKey, ClaimAttributeValues
+    RevocationPublicKey, AccumulatorPublicKey, ClaimAttributeValues, \
+    IssuanceContext
 from anoncreds.protocol.utils import strToInt, get_hash_as_int
 from anoncreds.protocol.wallet.issuer_wallet import IssuerWallet
 from config.config import cmod
 
 
 class Issuer:
-    def __init__(self, wallet: IssuerWallet, attrRepo: AttributeRepo):
+    def __init__(self, wallet: IssuerWallet, attrRepo: AttributeRepo,
+                 primePool: SafePrimePool = None, ePrimePool: EPrimePool = None,
+                 offlinePoolSize=OFFLINE_SIGNATURE_POOL_SIZE):
         self.wallet = wallet
         self._attrRepo = attrRepo
-        self._primaryIssuer = PrimaryClaimIssuer(wallet)
+        self._primaryIssuer = PrimaryClaimIssuer(wallet, primePool, ePrimePool,
+                                                 offlinePoolSize)
         self._nonRevocationIssuer = NonRevocationClaimIssuer(wallet)
+        # locks serializing accumulator updates with key=schemaKey
+        self._accumLocks = {}
 
     #
     # PUBLIC
@@ -51,8 +61,10 @@ class Issuer:
 
         :param schemaId: The schema ID (reference to claim
         definition schema)
-        :param p_prime: optional p_prime parameter
-        :param q_prime: optional q_prime parameter
+        :param p_prime: optional p_prime parameter (drawn from the prime
+        pool or generated if not given)
+        :param q_prime: optional q_prime parameter (drawn from the prime
+        pool or generated if not given)
         :return: Submitted Public keys (both primary and non-revocation)
         """
         pk, sk = await self._primaryIssuer.genKeys(schemaId, p_prime, q_prime)
@@ -64,7 +76,8 @@ class Issuer:
         return pk, pkR
 
     async def issueAccumulator(self, schemaId: ID, iA,
-                               L) -> AccumulatorPublicKey:
+                               L, tailsPath=None,
+                               executor: Executor = None) -> AccumulatorPublicKey:
         """
         Issues and submits an accumulator used for non-revocation proof.
 
@@ -72,10 +85,14 @@ class Issuer:
         definition schema)
         :param iA: accumulator ID
         :param L: maximum number of claims within accumulator.
+        :param tailsPath: a directory to write the tails to as they are
+        generated; an interrupted generation resumes from it
+        :param executor: an executor to generate the tails in; they are
+        generated in the current process if not given
         :return: Submitted accumulator public key
         """
         accum, tails, accPK, accSK = await self._nonRevocationIssuer.issueAccumulator(
-            schemaId, iA, L)
+            schemaId, iA, L, tailsPath, executor)
         accPK = await self.wallet.submitAccumPublic(schemaId=schemaId,
                                                     accumPK=accPK,
                                                     accum=accum, tails=tails)
@@ -91,9 +108,10 @@ class Issuer:
         definition schema)
         :param i: claim's sequence number within accumulator
         """
-        acc, ts = await self._nonRevocationIssuer.revoke(schemaId, i)
-        await self.wallet.submitAccumUpdate(schemaId=schemaId, accum=acc,
-                                            timestampMs=ts)
+        async with await self._accumLock(schemaId):
+            acc, ts = await self._nonRevocationIssuer.revoke(schemaId, i)
+            await self.wallet.submitAccumUpdate(schemaId=schemaId, accum=acc,
+                                                timestampMs=ts)
 
     async def issueClaim(self, schemaId: ID, claimRequest: ClaimRequest,
                          iA=None,
@@ -101,6 +119,9 @@ class Issuer:
         """
         Issue a claim for the given user and schema.
 
+        Every call carries its own issuance context, so claims for the same
+        schema can be issued concurrently.
+
         :param schemaId: The schema ID (reference to claim
         definition schema)
         :param claimRequest: A claim request containing prover ID and
@@ -117,14 +138,13 @@ class Issuer:
         # TODO re-enable when revocation registry is implemented
         # iA = iA if iA else (await self.wallet.getAccumulator(schemaId)).iA
 
-        # TODO this has un-obvious side-effects
-        await self._genContxt(schemaId, iA, claimRequest.userId)
+        context = self._genContxt(iA, claimRequest.userId)
 
         (c1, claim) = await self._issuePrimaryClaim(schemaId, attributes,
-                                                    claimRequest.U)
+                                                    claimRequest.U, context)
         # TODO re-enable when revocation registry is fully implemented
         c2 = await self._issueNonRevocationClaim(schemaId, claimRequest.Ur,
-                                                 iA,
+                                                 context,
                                                  i) if claimRequest.Ur else None
 
         signature = Claims(primaryClaim=c1, nonRevocClaim=c2)
@@ -145,30 +165,89 @@ class Issuer:
             res[schemaId] = await self.issueClaim(schemaId, claimReq)
         return res
 
+    async def issueClaimsBatch(self,
+                               claimRequests: Sequence[Tuple[ID, ClaimRequest]],
+                               executor: Executor = None) -> \
+            List[Tuple[Claims, Dict[str, ClaimAttributeValues]]]:
+        """
+        Issue claims for many (schema, claim request) pairs at once.
+
+        Primary signatures are computed in parallel in the executor, or
+        one after another in the current process without one.
+        Non-revocation claims (accumulator index assignment and accumulator
+        updates) are issued one by one in the order of the requests once
+        all the primary signatures are ready, so a failed batch leaves the
+        accumulators as they were.
+
+        :param claimRequests: a sequence of (schema ID, claim request) pairs
+        :param executor: an executor (usually a process pool the caller
+        keeps for many batches) to compute primary signatures in; they are
+        computed in the current process if not given
+        :return: the claims and claim attributes in the order of requests
+        """
+        primaryClaims = []
+        contexts = []
+        try:
+            for schemaId, claimRequest in claimRequests:
+                schemaKey = (await self.wallet.getSchema(schemaId)).getKey()
+                attributes = self._attrRepo.getAttributes(schemaKey,
+                                                          claimRequest.userId)
+                context = self._genContxt(None, claimRequest.userId)
+                contexts.append(context)
+                primaryClaims.append(asyncio.ensure_future(
+                    self._issuePrimaryClaim(schemaId, attributes,
+                                            claimRequest.U, context,
+                                            executor)))
+            primaryClaims = await asyncio.gather(*primaryClaims)
+        finally:
+            for f in primaryClaims:
+                if isinstance(f, asyncio.Future):
+                    f.cancel()
+
+        nonRevocClaims = []
+        for (schemaId, claimRequest), context in zip(claimRequests, contexts):
+            nonRevocClaims.append(
+                await self._issueNonRevocationClaim(
+                    schemaId, claimRequest.Ur, context)
+                if claimRequest.Ur else None)
+
+        return [(Claims(primaryClaim=c1, nonRevocClaim=c2), claim)
+                for (c1, claim), c2 in zip(primaryClaims, nonRevocClaims)]
+
     #
     # PRIVATE
     #
 
-    async def _genContxt(self, schemaId: ID, iA, userId):
-        iA = strToInt(str(iA))
-        userId = strToInt(str(userId))
-        S = iA | userId
+    @staticmethod
+    def _genContxt(iA, userId) -> IssuanceContext:
+        S = strToInt(str(iA)) | strToInt(str(userId))
         H = get_hash_as_int(S)
         m2 = cmod.integer(H % (2 ** LARGE_MASTER_SECRET))
-        await self.wallet.submitContextAttr(schemaId, m2)
-        return m2
+        return IssuanceContext(userId, iA, m2)
+
+    async def _accumLock(self, schemaId: ID) -> asyncio.Lock:
+        schemaKey = (await self.wallet.getSchema(schemaId)).getKey()
+        if schemaKey not in self._accumLocks:
+            self._accumLocks[schemaKey] = asyncio.Lock()
+        return self._accumLocks[schemaKey]
 
     async def _issuePrimaryClaim(self, schemaId: ID, attributes: Attribs,
-                                 U) -> (PrimaryClaim, Dict[str, ClaimAttributeValues]):
+                                 U, context: IssuanceContext,
+                                 executor: Executor = None) -> (
+            PrimaryClaim, Dict[str, ClaimAttributeValues]):
         return await self._primaryIssuer.issuePrimaryClaim(schemaId,
-                                                           attributes, U)
+                                                           attributes, U,
+                                                           context, executor)
 
-    async def _issueNonRevocationClaim(self, schemaId: ID, Ur, iA=None,
+    async def _issueNonRevocationClaim(self, schemaId: ID, Ur,
+                                       context: IssuanceContext,
                                        i=None) -> NonRevocationClaim:
-        claim, accum, ts = await self._nonRevocationIssuer.issueNonRevocationClaim(
-            schemaId, Ur, iA, i)
-        await self.wallet.submitAccumUpdate(schemaId=schemaId, accum=accum,
-                                            timestampMs=ts)
+        # index assignment and accumulator updates go one at a time
+        async with await self._accumLock(schemaId):
+            claim, accum, ts = await self._nonRevocationIssuer.issueNonRevocationClaim(
+                schemaId, Ur, context, i)
+            await self.wallet.submitAccumUpdate(schemaId=schemaId,
+                                                accum=accum, timestampMs=ts)
         return claim
 
     def __repr__(self):
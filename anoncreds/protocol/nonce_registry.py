@@ -0,0 +1,142 @@
+import hashlib
+import math
+import threading
+import time
+
+from anoncreds.protocol.exceptions import NonceError
+from anoncreds.protocol.globals import NONCE_WINDOW, NONCE_GENERATIONS, \
+    NONCE_CAPACITY, NONCE_ERROR_RATE
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter of integers.
+
+    Its size depends only on the capacity and the false positive rate it
+    is built for, not on the number of values added.
+    """
+
+    def __init__(self, capacity, errorRate):
+        self.bits = max(8, int(-capacity * math.log(errorRate) /
+                               math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def __contains__(self, value):
+        return all(self._array[i >> 3] & (1 << (i & 7))
+                   for i in self._indexes(value))
+
+    def add(self, value):
+        for i in self._indexes(value):
+            self._array[i >> 3] |= 1 << (i & 7)
+
+    def _indexes(self, value):
+        # double hashing: k indexes from two halves of one digest
+        digest = hashlib.sha256(str(int(value)).encode()).digest()
+        h1 = int.from_bytes(digest[:16], 'big')
+        h2 = int.from_bytes(digest[16:], 'big') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+
+class _Generation:
+    def __init__(self, capacity, errorRate, started):
+        self.issued = BloomFilter(capacity, errorRate)
+        self.consumed = BloomFilter(capacity, errorRate)
+        self.started = started
+        self.count = 0
+
+
+class NonceRegistry:
+    """
+    Remembers the nonces a verifier issued and the ones already used in a
+    proof, for a limited time and in a fixed amount of memory.
+
+    The time window is split into generations, each with a pair of Bloom
+    filters (issued and consumed nonces). The oldest generation is dropped
+    when a new one starts, so a nonce expires between
+    `window * (generations - 1) / generations` and `window` seconds after
+    it was issued. A generation also ends early once it holds its share of
+    `capacity` nonces; the window is shorter then, but the false positive
+    rate stays bounded.
+
+    False positives are possible but rare (`errorRate`): a never issued
+    nonce may be taken for an issued one, and a fresh nonce may be taken
+    for a used one. Nonces are 80-bit random values, so the former doesn't
+    let a prover choose its own nonce.
+    """
+
+    def __init__(self, window=NONCE_WINDOW, generations=NONCE_GENERATIONS,
+                 capacity=NONCE_CAPACITY, errorRate=NONCE_ERROR_RATE,
+                 clock=time.monotonic):
+        """
+        :param window: the time in seconds a nonce may be used in
+        :param generations: the number of generations the window is split in
+        :param capacity: the number of nonces issued within a window the
+        registry is sized for
+        :param errorRate: the false positive rate of each filter
+        :param clock: a function returning the current time in seconds
+        """
+        self.window = window
+        self.generationCapacity = max(1, capacity // generations)
+        self.generationLength = window / generations
+        self.errorRate = errorRate
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._generations = [self._newGeneration()
+                             for _ in range(generations)]
+
+    def issue(self, nonce):
+        with self._lock:
+            self._rotate()
+            current = self._generations[-1]
+            if current.count >= self.generationCapacity:
+                self._shift()
+                current = self._generations[-1]
+            current.issued.add(nonce)
+            current.count += 1
+
+    def check(self, nonce):
+        """
+        Checks that a nonce may be used, without marking it as used.
+
+        :raises NonceError: if the nonce was not issued, has expired or has
+        already been used
+        """
+        with self._lock:
+            self._rotate()
+            self._check(nonce)
+
+    def consume(self, nonce):
+        """
+        Marks a nonce as used.
+
+        :raises NonceError: if the nonce was not issued, has expired or has
+        already been used
+        """
+        with self._lock:
+            self._rotate()
+            self._check(nonce)
+            # a consumed nonce is remembered as long as it could still be
+            # found among the issued ones
+            self._generations[-1].consumed.add(nonce)
+
+    def _check(self, nonce):
+        if not any(nonce in g.issued for g in self._generations):
+            raise NonceError(
+                'Nonce {} was not issued or has expired'.format(nonce))
+        if any(nonce in g.consumed for g in self._generations):
+            raise NonceError('Nonce {} has already been used'.format(nonce))
+
+    def _newGeneration(self):
+        return _Generation(self.generationCapacity, self.errorRate,
+                           self._clock())
+
+    def _shift(self):
+        self._generations.pop(0)
+        self._generations.append(self._newGeneration())
+
+    def _rotate(self):
+        elapsed = self._clock() - self._generations[-1].started
+        expired = int(elapsed // self.generationLength)
+        for _ in range(min(expired, len(self._generations))):
+            self._shift()
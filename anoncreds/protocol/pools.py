@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    TimeoutError as FutureTimeoutError
+
+from anoncreds.protocol.globals import BACKGROUND_POOL_WORKERS
+
+_workersLock = threading.Lock()
+_workers = None
+
+
+def _backgroundWorkers() -> Executor:
+    """
+    The process pool shared by all background pools, started on first use.
+    """
+    global _workers
+    with _workersLock:
+        if _workers is None:
+            _workers = ProcessPoolExecutor(BACKGROUND_POOL_WORKERS)
+        return _workers
+
+
+class BackgroundPool:
+    """
+    A bounded queue of precomputed values refilled in the background.
+
+    Subclasses implement `_job`, which returns a function and arguments
+    that compute a value. A refill thread sends the job to a worker
+    process and waits for the result, so the computation doesn't compete
+    with the caller for the GIL; the arguments and results travel pickled.
+    `_finish` completes a computed value in the caller's process and may
+    return None to drop it. `pop` never blocks: if the queue is empty the
+    value is produced inline.
+
+    A pool of size 0 keeps nothing and never starts a thread.
+    """
+
+    def __init__(self, size, autoStart=True, executor: Executor = None):
+        """
+        :param size: the number of values kept ready
+        :param autoStart: whether the first `pop` starts the refill thread
+        :param executor: an executor to compute the values in; a process
+        pool shared by all background pools is used if not given
+        """
+        self.size = size
+        self.autoStart = autoStart
+        self.executor = executor
+        self._queue = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def _job(self):
+        """
+        :return: a function and its arguments that compute a value
+        """
+        raise NotImplementedError
+
+    def _finish(self, value):
+        return value
+
+    def _produce(self):
+        while True:
+            func, *args = self._job()
+            value = self._finish(func(*args))
+            if value is not None:
+                return value
+
+    def pop(self):
+        if self.autoStart:
+            self.start()
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            logging.debug("{} is empty".format(type(self).__name__))
+            return self._produce()
+
+    def fill(self, count=None):
+        """
+        Produce values in the current thread until the pool holds `count`
+        of them (the pool size by default).
+        """
+        count = min(count or self.size, self.size)
+        while len(self) < count:
+            try:
+                self._queue.put_nowait(self._produce())
+            except queue.Full:
+                # the refill thread got there first
+                break
+
+    def start(self):
+        if not self.size or self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refill, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread:
+            self._thread.join()
+
+    def _refill(self):
+        executor = self.executor or _backgroundWorkers()
+        while not self._stop.is_set():
+            func, *args = self._job()
+            try:
+                future = executor.submit(func, *args)
+                value = None
+                while not self._stop.is_set():
+                    try:
+                        value = future.result(timeout=0.5)
+                        break
+                    except FutureTimeoutError:
+                        continue
+                else:
+                    future.cancel()
+                    return
+            except Exception:
+                # pop keeps producing values inline
+                logging.exception("{} can't be refilled".format(
+                    type(self).__name__))
+                return
+            value = self._finish(value)
+            while value is not None and not self._stop.is_set():
+                try:
+                    self._queue.put(value, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
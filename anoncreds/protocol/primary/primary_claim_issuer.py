@@ -1,17 +1,71 @@
-from anoncreds.protocol.globals import LARGE_VPRIME_PRIME, LARGE_E_START, \
-    LARGE_E_END_RANGE, LARGE_PRIME
+import asyncio
+from collections import namedtuple
+from concurrent.futures import Executor
+
+from anoncreds.protocol.globals import LARGE_VPRIME_PRIME, \
+    OFFLINE_SIGNATURE_POOL_SIZE
+from anoncreds.protocol.pools import BackgroundPool
+from anoncreds.protocol.primary.primary_crt import CRTEngine
+from anoncreds.protocol.primes import SafePrimePool, genSafePrime, EPrimePool
 from anoncreds.protocol.types import PublicKey, SecretKey, PrimaryClaim, ID, \
-    Attribs, ClaimAttributeValues
-from anoncreds.protocol.utils import get_prime_in_range, strToCryptoInteger, \
-    randomQR
+    Attribs, ClaimAttributeValues, IssuanceContext
+from anoncreds.protocol.utils import strToCryptoInteger, randomQR
 from anoncreds.protocol.wallet.issuer_wallet import IssuerWallet
 from config.config import cmod
 from typing import Dict
 
 
+OfflineSignatureValues = namedtuple('OfflineSignatureValues',
+                                    'vprimeprime, Sv, e')
+
+
+def genOfflineSignatureValues(crt: CRTEngine, S):
+    """
+    v'' and S^v'' mod N, the part of a primary claim signature that doesn't
+    depend on the claim request.
+    """
+    # Generate a random number with the Most-significant-bit set to 1
+    vprimeprime = cmod.integer(cmod.randomBits(LARGE_VPRIME_PRIME) |
+                               (2 ** (LARGE_VPRIME_PRIME - 1)))
+    return vprimeprime, crt.pow(S, vprimeprime)
+
+
+class OfflineSignaturePool(BackgroundPool):
+    """
+    (v'', S^v'' mod N, e) triples for primary claims of one key. They don't
+    depend on the claim request, so they are computed in the background
+    and issuance only does the attribute-dependent part.
+    """
+
+    def __init__(self, crt: CRTEngine, S, ePrimePool: EPrimePool,
+                 size=OFFLINE_SIGNATURE_POOL_SIZE):
+        super().__init__(size)
+        self.crt = crt
+        self.S = S
+        self._ePrimePool = ePrimePool
+
+    def _job(self):
+        return genOfflineSignatureValues, self.crt, self.S
+
+    def _finish(self, values) -> OfflineSignatureValues:
+        vprimeprime, Sv = values
+        # Prime number in the range (2^596, 2^596 + 2^119), never used before
+        e = self._ePrimePool.pop()
+        return OfflineSignatureValues(vprimeprime, Sv, e)
+
+
 class PrimaryClaimIssuer:
-    def __init__(self, wallet: IssuerWallet):
+    def __init__(self, wallet: IssuerWallet, primePool: SafePrimePool = None,
+                 ePrimePool: EPrimePool = None,
+                 offlinePoolSize=OFFLINE_SIGNATURE_POOL_SIZE):
         self._wallet = wallet
+        self._primePool = primePool
+        self._ePrimePool = ePrimePool or EPrimePool()
+        self._offlinePoolSize = offlinePoolSize
+        # CRT engines with key=schemaKey
+        self._crtEngines = {}
+        # offline signature pools with key=schemaKey
+        self._offlinePools = {}
 
     async def genKeys(self, schemaId: ID, p_prime=None, q_prime=None) -> (
             PublicKey, SecretKey):
@@ -20,13 +74,15 @@ class PrimaryClaimIssuer:
             raise ValueError("List of attribute names is required to "
                              "setup credential definition")
 
-        p_prime = p_prime if p_prime else PrimaryClaimIssuer._genPrime()
+        p_prime = p_prime if p_prime else await self._genPrime()
         p = 2 * p_prime + 1
 
-        q_prime = q_prime if q_prime else PrimaryClaimIssuer._genPrime()
+        q_prime = q_prime if q_prime else await self._genPrime()
         q = 2 * q_prime + 1
 
         n = p * q
+        crt = CRTEngine(p_prime, q_prime)
+        self._crtEngines[schema.getKey()] = crt
 
         # Generate a random quadratic number
         S = randomQR(n)
@@ -40,18 +96,18 @@ class PrimaryClaimIssuer:
 
         # Generate `Z` as the exponentiation of the quadratic random 'S' .
         # over the random `Xz` in the group defined by modulus `n`
-        Z = (S ** Xz) % n
+        Z = crt.pow(S, Xz)
 
         # Generate random numbers corresponding to every attributes
         R = {}
         for name in schema.attrNames:
-            R[str(name)] = (S ** Xr[str(name)]) % n
+            R[str(name)] = crt.pow(S, Xr[str(name)])
 
         # Rms is a random number needed corresponding to master secret m1
-        Rms = (S ** PrimaryClaimIssuer._genX(p_prime, q_prime)) % n
+        Rms = crt.pow(S, PrimaryClaimIssuer._genX(p_prime, q_prime))
 
         # Rctxt is a random number needed corresponding to context attribute m2
-        Rctxt = (S ** PrimaryClaimIssuer._genX(p_prime, q_prime)) % n
+        Rctxt = crt.pow(S, PrimaryClaimIssuer._genX(p_prime, q_prime))
 
         return PublicKey(n, Rms, Rctxt, R, S, Z), SecretKey(p_prime, q_prime)
 
@@ -61,60 +117,88 @@ class PrimaryClaimIssuer:
         minValue = 2
         return cmod.integer(cmod.random(maxValue - minValue)) + minValue
 
-    @classmethod
-    def _genPrime(cls):
+    async def _genPrime(self):
         # Generate 2 large primes `p_prime` and `q_prime` and use them
-        # to generate another 2 primes `p` and `q` of 1024 bits
-        prime = cmod.randomPrime(LARGE_PRIME)
-        i = 0
-        while not cmod.isPrime(2 * prime + 1):
-            prime = cmod.randomPrime(LARGE_PRIME)
-            i += 1
-        print("In {} iterations, found prime {}".format(i, prime))
-        return prime
+        # to generate another 2 primes `p` and `q` of 1024 bits.
+        # The search is CPU-bound, so keep it off the event loop.
+        generate = self._primePool.pop if self._primePool else genSafePrime
+        return await asyncio.get_event_loop().run_in_executor(None, generate)
 
     async def issuePrimaryClaim(self, schemaId: ID, attributes: Attribs,
-                                U) -> (PrimaryClaim, Dict[str, ClaimAttributeValues]):
+                                U, context: IssuanceContext,
+                                executor: Executor = None) -> (
+            PrimaryClaim, Dict[str, ClaimAttributeValues]):
+        """
+        Issue a primary claim.
+
+        :param context: the issuance context of this request
+        :param executor: an executor (e.g. a process pool) to compute the
+        signature in; it's computed in the current thread if not given
+        """
         u = strToCryptoInteger(U) if isinstance(U, str) else U
 
         if not u:
             raise ValueError("u must be provided to issue a credential")
-        # Generate a random prime and
-        # Set the Most-significant-bit to 1
-        vprimeprime = cmod.integer(cmod.randomBits(LARGE_VPRIME_PRIME) |
-                                   (2 ** (LARGE_VPRIME_PRIME - 1)))
-        # Generate prime number in the range (2^596, 2^596 + 2^119)
-        estart = 2 ** LARGE_E_START
-        eend = (estart + 2 ** LARGE_E_END_RANGE)
-        e = get_prime_in_range(estart, eend)
         encodedAttrs = attributes.encoded()
-        A = await self._sign(schemaId, encodedAttrs, vprimeprime, u, e)
 
-        m2 = await self._wallet.getContextAttr(schemaId)
+        pk = await self._wallet.getPublicKey(schemaId)
+        sk = await self._wallet.getSecretKey(schemaId)
+        m2 = context.m2
+        crt = await self._getCRTEngine(schemaId, sk)
+        # v'', S^v'' and e don't depend on the request
+        vprimeprime, Sv, e = (await self._getOfflinePool(schemaId, crt,
+                                                         pk)).pop()
+        if executor:
+            A = await asyncio.get_event_loop().run_in_executor(
+                executor, signPrimaryClaim, crt, pk, encodedAttrs, m2, Sv,
+                u, e)
+        else:
+            A = signPrimaryClaim(crt, pk, encodedAttrs, m2, Sv, u, e)
+
         claimAttributes = \
             {attr: ClaimAttributeValues(
                 attributes._vals[attr], encodedAttrs[attr]) for attr in attributes.keys()}
 
         return (PrimaryClaim(m2, A, e, vprimeprime), claimAttributes)
 
-    async def _sign(self, schemaId: ID, attrs, v, u, e):
-        pk = await self._wallet.getPublicKey(schemaId)
-        sk = await self._wallet.getSecretKey(schemaId)
-        m2 = await self._wallet.getContextAttr(schemaId)
-
-        Rx = 1 % pk.N
-        # Get the product sequence for the (R[i] and attrs[i]) combination
-        for k, val in attrs.items():
-            Rx = Rx * (pk.R[str(k)] ** val)
-        Rx = Rx * (pk.Rctxt ** m2)
-        if u != 0:
-            u = u % pk.N
-            Rx *= u
-        nprime = sk.pPrime * sk.qPrime
-        einverse = e % nprime
-        Q = pk.Z / (Rx * (pk.S ** v)) % pk.N
-        A = Q ** (einverse ** -1) % pk.N
-        return A
+    async def _getCRTEngine(self, schemaId: ID, sk: SecretKey) -> CRTEngine:
+        schemaKey = (await self._wallet.getSchema(schemaId)).getKey()
+        crt = self._crtEngines.get(schemaKey)
+        if not crt or not crt.matches(sk):
+            crt = CRTEngine.fromSecretKey(sk)
+            self._crtEngines[schemaKey] = crt
+        return crt
+
+    async def _getOfflinePool(self, schemaId: ID, crt: CRTEngine,
+                              pk: PublicKey) -> OfflineSignaturePool:
+        schemaKey = (await self._wallet.getSchema(schemaId)).getKey()
+        pool = self._offlinePools.get(schemaKey)
+        if not pool or pool.crt is not crt or pool.S != pk.S:
+            if pool:
+                pool.stop(wait=False)
+            pool = OfflineSignaturePool(crt, pk.S, self._ePrimePool,
+                                        self._offlinePoolSize)
+            self._offlinePools[schemaKey] = pool
+        return pool
 
     def __repr__(self):
         return str(self.__dict__)
+
+
+def signPrimaryClaim(crt: CRTEngine, pk: PublicKey, attrs, m2, Sv, u, e):
+    """
+    A = (Z / (prod(R[k] ** attrs[k]) * Rctxt ** m2 * Sv * u)) ** (1 / e)
+    mod N, where Sv = S ** v'' is precomputed
+
+    Depends on its arguments only, so it can be run in a worker process.
+    """
+    # Get the product sequence for the (R[i] and attrs[i]) combination
+    pairs = [(pk.R[str(k)], val) for k, val in attrs.items()]
+    pairs.append((pk.Rctxt, m2))
+    pairs.append((Sv % pk.N, 1))
+    if u != 0:
+        pairs.append((u % pk.N, 1))
+    Rx = crt.powProduct(pairs)
+
+    Q = pk.Z / Rx % pk.N
+    return crt.root(Q, e)
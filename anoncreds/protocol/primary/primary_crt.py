@@ -0,0 +1,74 @@
+from typing import Sequence, Tuple
+
+from anoncreds.protocol.types import SecretKey
+from anoncreds.protocol.utils import multiExp
+from config.config import cmod
+
+
+class CRTEngine:
+    """
+    Issuer-side arithmetic modulo N = p * q that uses the known factorization.
+
+    Every exponentiation is done modulo p and modulo q separately, with the
+    exponent reduced modulo p - 1 and q - 1, and the two halves are
+    recombined with Garner's formula. The result is the same value the
+    direct computation modulo N would give.
+    """
+
+    def __init__(self, pPrime, qPrime):
+        self.pPrime = int(pPrime)
+        self.qPrime = int(qPrime)
+        self.p = 2 * self.pPrime + 1
+        self.q = 2 * self.qPrime + 1
+        self.n = self.p * self.q
+        self.nPrime = self.pPrime * self.qPrime
+
+        self._P = cmod.integer(self.p)
+        self._Q = cmod.integer(self.q)
+        self._N = cmod.integer(self.n)
+        self._NPrime = cmod.integer(self.nPrime)
+        # q^-1 mod p used to recombine the residues
+        self._qInv = int((cmod.integer(self.q) % self._P) ** -1)
+
+    @classmethod
+    def fromSecretKey(cls, sk: SecretKey):
+        return cls(sk.pPrime, sk.qPrime)
+
+    def matches(self, sk: SecretKey):
+        return self.pPrime == int(sk.pPrime) and self.qPrime == int(sk.qPrime)
+
+    def split(self, x):
+        x = cmod.integer(int(x))
+        return x % self._P, x % self._Q
+
+    def combine(self, xp, xq):
+        xp, xq = int(xp), int(xq)
+        h = ((xp - xq) * self._qInv) % self.p
+        return cmod.integer(xq + self.q * h) % self._N
+
+    def pow(self, base, exp):
+        """
+        base ** exp mod N
+        """
+        return self.powProduct([(base, exp)])
+
+    def powProduct(self, pairs: Sequence[Tuple]):
+        """
+        Product of base ** exp mod N over all (base, exp) pairs
+        """
+        pairsP = []
+        pairsQ = []
+        for base, exp in pairs:
+            exp = int(exp)
+            bp, bq = self.split(base)
+            pairsP.append((bp, exp % (self.p - 1)))
+            pairsQ.append((bq, exp % (self.q - 1)))
+        return self.combine(multiExp(pairsP, self._P),
+                            multiExp(pairsQ, self._Q))
+
+    def root(self, x, e):
+        """
+        The e-th root of x mod N, that is x ** (e^-1 mod p'q') mod N
+        """
+        d = (cmod.integer(int(e)) % self._NPrime) ** -1
+        return self.pow(x, d)
@@ -1,15 +1,20 @@
+import asyncio
+from collections import namedtuple
+from concurrent.futures import Executor
 from typing import Sequence, Dict
 
 from anoncreds.protocol.globals import LARGE_VPRIME, LARGE_MVECT, LARGE_E_START, \
     LARGE_ETILDE, \
     LARGE_VTILDE, LARGE_UTILDE, LARGE_RTILDE, LARGE_ALPHATILDE, ITERATIONS, \
-    DELTA
+    DELTA, PROOF_COMMITMENT_POOL_SIZE
+from anoncreds.protocol.pools import BackgroundPool
 from anoncreds.protocol.primary.primary_proof_common import calcTge, calcTeq
 from anoncreds.protocol.types import PrimaryClaim, Predicate, PrimaryInitProof, \
     PrimaryEqualInitProof, PrimaryPrecicateGEInitProof, PrimaryProof, \
     PrimaryEqualProof, PrimaryPredicateGEProof, \
-    ID, ClaimInitDataType, ClaimAttributeValues
-from anoncreds.protocol.utils import splitRevealedAttrs, fourSquares
+    ID, ClaimInitDataType, ClaimAttributeValues, PublicKey
+from anoncreds.protocol.utils import splitRevealedAttrs, fourSquares, \
+    powProduct, runInExecutor
 from anoncreds.protocol.wallet.prover_wallet import ProverWallet
 from config.config import cmod
 
@@ -22,10 +27,8 @@ class PrimaryClaimInitializer:
         pk = await self._wallet.getPublicKey(schemaId)
         ms = await self._wallet.getMasterSecret(schemaId)
         vprime = cmod.randomBits(LARGE_VPRIME)
-        N = pk.N
-        Rms = pk.Rms
-        S = pk.S
-        U = (S ** vprime) * (Rms ** ms) % N
+        bases = pk.bases()
+        U = powProduct([(bases.S, vprime), (bases.Rms, ms)], pk.N)
 
         return ClaimInitDataType(U=U, vPrime=vprime)
 
@@ -36,24 +39,282 @@ class PrimaryClaimInitializer:
         return claim
 
 
+# Randomized values of an equality proof that don't depend on the proof
+# request: Aprime = A * S^Ra, partialT = Aprime^etilde * S^vtilde and
+# Rmtilde[k] = R[k]^mtilde[k] for every attribute of the claim
+EqCommitment = namedtuple('EqCommitment',
+                          'Aprime, vprime, eprime, etilde, vtilde, mtilde, '
+                          'Rmtilde, m2Tilde, Rctxtm2Tilde, partialT')
+
+# Randomized values of a predicate proof that don't depend on the proof
+# request: Sr[i] = S^r[i], tau[i] = Z^utilde[i] * S^rtilde[i],
+# SrtildeDelta = S^rtilde[DELTA] and Salphatilde = S^alphatilde
+GeCommitment = namedtuple('GeCommitment',
+                          'r, Sr, utilde, rtilde, tau, SrtildeDelta, '
+                          'alphatilde, Salphatilde')
+
+
+def _randomInt(bits):
+    return cmod.integer(cmod.randomBits(bits))
+
+
+def precomputeEqCommitment(pk: PublicKey, c1: PrimaryClaim,
+                           attrNames) -> EqCommitment:
+    bases = pk.bases()
+    N = pk.N
+    Ra = _randomInt(LARGE_VPRIME)
+    A, e, v = c1.A, c1.e, c1.v
+    Aprime = A * powProduct([(bases.S, Ra)], N) % N
+    vprime = (v - e * Ra)
+    eprime = e - (2 ** LARGE_E_START)
+
+    etilde = _randomInt(LARGE_ETILDE)
+    vtilde = _randomInt(LARGE_VTILDE)
+    mtilde = {k: _randomInt(LARGE_MVECT) for k in attrNames}
+    Rmtilde = {k: powProduct([(bases.R[k], mtilde[k])], N)
+               for k in attrNames}
+    m2Tilde = _randomInt(LARGE_MVECT)
+    Rctxtm2Tilde = powProduct([(bases.Rctxt, m2Tilde)], N)
+    partialT = powProduct([(Aprime, etilde), (bases.S, vtilde)], N)
+    return EqCommitment(Aprime, vprime, eprime, etilde, vtilde, mtilde,
+                        Rmtilde, m2Tilde, Rctxtm2Tilde, partialT)
+
+
+def precomputeGeCommitment(pk: PublicKey) -> GeCommitment:
+    bases = pk.bases()
+    N = pk.N
+    r = {}
+    Sr = {}
+    for i in [str(i) for i in range(0, ITERATIONS)] + [DELTA]:
+        r[i] = _randomInt(LARGE_VPRIME)
+        Sr[i] = powProduct([(bases.S, r[i])], N)
+
+    utilde = {}
+    rtilde = {}
+    tau = []
+    for i in range(0, ITERATIONS):
+        utilde[str(i)] = _randomInt(LARGE_UTILDE)
+        rtilde[str(i)] = _randomInt(LARGE_RTILDE)
+        tau.append(powProduct([(bases.Z, utilde[str(i)]),
+                               (bases.S, rtilde[str(i)])], N))
+    rtilde[DELTA] = _randomInt(LARGE_RTILDE)
+    alphatilde = _randomInt(LARGE_ALPHATILDE)
+    return GeCommitment(r, Sr, utilde, rtilde, tau,
+                        powProduct([(bases.S, rtilde[DELTA])], N),
+                        alphatilde, powProduct([(bases.S, alphatilde)], N))
+
+
+def initEqProof(pk: PublicKey, c1: PrimaryClaim, mtilde, m1Tilde, m2Tilde,
+                revealedAttrs, pre: EqCommitment = None) \
+        -> PrimaryEqualInitProof:
+    """
+    Creates an equality init proof. `mtilde` holds the randomness of the
+    unrevealed attributes; the randomized claim comes from `pre` if given.
+    """
+    unrevealedAttrs = list(mtilde.keys())
+    if pre:
+        bases = pk.bases()
+        N = pk.N
+        # T = Aprime^etilde * S^vtilde * prod(R[k]^mtilde[k]) *
+        #     Rms^m1Tilde * Rctxt^m2Tilde, as in calcTeq
+        pairs = [(bases.Rms, m1Tilde)]
+        T = pre.partialT
+        if m2Tilde:
+            pairs.append((bases.Rctxt, m2Tilde))
+        else:
+            m2Tilde = pre.m2Tilde
+            T = T * pre.Rctxtm2Tilde % N
+        for k in unrevealedAttrs:
+            T = T * pre.Rmtilde[k] % N
+        T = T * powProduct(pairs, N) % N
+        return PrimaryEqualInitProof(c1, pre.Aprime, T, pre.etilde,
+                                     pre.eprime, pre.vtilde, pre.vprime,
+                                     mtilde, m1Tilde, m2Tilde,
+                                     unrevealedAttrs, revealedAttrs)
+
+    m2Tilde = m2Tilde if m2Tilde else _randomInt(LARGE_MVECT)
+    Ra = _randomInt(LARGE_VPRIME)
+
+    A, e, v = c1.A, c1.e, c1.v
+    Aprime = A * powProduct([(pk.bases().S, Ra)], pk.N) % pk.N
+    vprime = (v - e * Ra)
+    eprime = e - (2 ** LARGE_E_START)
+
+    etilde = _randomInt(LARGE_ETILDE)
+    vtilde = _randomInt(LARGE_VTILDE)
+
+    # T = ((Aprime ** etilde) * Rur * (pk.S ** vtilde)) % pk.N
+    T = calcTeq(pk, Aprime, etilde, vtilde, mtilde, m1Tilde, m2Tilde,
+                unrevealedAttrs)
+
+    return PrimaryEqualInitProof(c1, Aprime, T, etilde, eprime, vtilde,
+                                 vprime, mtilde, m1Tilde, m2Tilde,
+                                 unrevealedAttrs, revealedAttrs)
+
+
+def initGeProof(pk: PublicKey, predicate: Predicate, delta, mj,
+                pre: GeCommitment = None) -> PrimaryPrecicateGEInitProof:
+    """
+    Creates an init proof for `delta` >= 0, where `delta` is the attribute
+    value minus the predicate value and `mj` is the attribute's mtilde.
+    """
+    # gen U for Delta
+    u = fourSquares(delta)
+    bases = pk.bases()
+    N = pk.N
+
+    if pre:
+        # T[i] = Z^u[i] * S^r[i]
+        T = {}
+        CList = []
+        for i in range(0, ITERATIONS):
+            T[str(i)] = powProduct([(bases.Z, u[str(i)])], N) * \
+                pre.Sr[str(i)] % N
+            CList.append(T[str(i)])
+        T[DELTA] = powProduct([(bases.Z, delta)], N) * pre.Sr[DELTA] % N
+        CList.append(T[DELTA])
+
+        # the same Tau list as calcTge
+        TauList = list(pre.tau)
+        TauList.append(powProduct([(bases.Z, mj)], N) * pre.SrtildeDelta % N)
+        TauList.append(powProduct([(T[str(i)], pre.utilde[str(i)])
+                                   for i in range(0, ITERATIONS)], N) *
+                       pre.Salphatilde % N)
+        return PrimaryPrecicateGEInitProof(CList, TauList, u, pre.utilde,
+                                           pre.r, pre.rtilde, pre.alphatilde,
+                                           predicate, T)
+
+    # prepare C list
+    r = {}
+    T = {}
+    CList = []
+    for i in range(0, ITERATIONS):
+        r[str(i)] = _randomInt(LARGE_VPRIME)
+        T[str(i)] = powProduct([(bases.Z, u[str(i)]),
+                                (bases.S, r[str(i)])], N)
+        CList.append(T[str(i)])
+    r[DELTA] = _randomInt(LARGE_VPRIME)
+    T[DELTA] = powProduct([(bases.Z, delta), (bases.S, r[DELTA])], N)
+    CList.append(T[DELTA])
+
+    # prepare Tau List
+    utilde = {}
+    rtilde = {}
+    for i in range(0, ITERATIONS):
+        utilde[str(i)] = _randomInt(LARGE_UTILDE)
+        rtilde[str(i)] = _randomInt(LARGE_RTILDE)
+    rtilde[DELTA] = _randomInt(LARGE_RTILDE)
+    alphatilde = _randomInt(LARGE_ALPHATILDE)
+
+    TauList = calcTge(pk, utilde, rtilde, mj, alphatilde, T)
+    return PrimaryPrecicateGEInitProof(CList, TauList, u, utilde, r, rtilde,
+                                       alphatilde, predicate, T)
+
+
+class EqCommitmentPool(BackgroundPool):
+    """
+    Equality proof commitments for one claim, each to be used only once.
+    """
+
+    def __init__(self, pk: PublicKey, c1: PrimaryClaim, attrNames,
+                 size=PROOF_COMMITMENT_POOL_SIZE):
+        super().__init__(size)
+        self.pk = pk
+        self.claim = c1
+        self.attrNames = list(attrNames)
+
+    def _job(self):
+        return precomputeEqCommitment, self.pk, self.claim, self.attrNames
+
+
+class GeCommitmentPool(BackgroundPool):
+    """
+    Predicate proof commitments for one public key, each to be used only
+    once.
+    """
+
+    def __init__(self, pk: PublicKey, size=PROOF_COMMITMENT_POOL_SIZE):
+        super().__init__(size)
+        self.pk = pk
+
+    def _job(self):
+        return precomputeGeCommitment, self.pk
+
+
 class PrimaryProofBuilder:
-    def __init__(self, wallet: ProverWallet):
+    def __init__(self, wallet: ProverWallet,
+                 commitmentPoolSize=PROOF_COMMITMENT_POOL_SIZE):
         self._wallet = wallet
+        self._commitmentPoolSize = commitmentPoolSize
+        # commitment pools with key=schemaKey
+        self._eqPools = {}
+        self._gePools = {}
+
+    async def precomputeCommitments(self, schemaId: ID, c1: PrimaryClaim):
+        """
+        Start filling commitment pools for the claim in the background;
+        proofs for the claim use the precomputed commitments when available.
+        """
+        if not self._commitmentPoolSize:
+            return
+        schemaKey = (await self._wallet.getSchema(schemaId)).getKey()
+        pk = await self._wallet.getPublicKey(schemaId)
+        attrNames = (await self._wallet.getClaimAttributes(schemaId)).keys()
+
+        for pools in (self._eqPools, self._gePools):
+            if schemaKey in pools:
+                pools.pop(schemaKey).stop(wait=False)
+        self._eqPools[schemaKey] = EqCommitmentPool(
+            pk, c1, attrNames, self._commitmentPoolSize)
+        self._gePools[schemaKey] = GeCommitmentPool(
+            pk, self._commitmentPoolSize)
+        for pools in (self._eqPools, self._gePools):
+            pools[schemaKey].start()
+
+    async def _getCommitmentPool(self, pools, schemaId):
+        schemaKey = (await self._wallet.getSchema(
+            ID(schemaId=schemaId))).getKey()
+        return pools.get(schemaKey)
 
     async def initProof(self, schemaId, c1: PrimaryClaim,
                         revealedAttrs: Sequence[str],
                         predicates: Sequence[Predicate],
-                        m1Tilde, m2Tilde, claimAttributes: Dict[str, ClaimAttributeValues]) -> PrimaryInitProof:
+                        m1Tilde, m2Tilde, claimAttributes: Dict[str, ClaimAttributeValues],
+                        executor: Executor = None) -> PrimaryInitProof:
+        """
+        Creates an init proof for the claim. The equality and predicate
+        init proofs are independent of each other and are computed
+        concurrently in the executor if it's given.
+        """
         if not c1:
             return None
 
-        eqProof = await self._initEqProof(schemaId, c1, revealedAttrs,
-                                          m1Tilde, m2Tilde, claimAttributes)
-        geProofs = []
+        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
+        revealedAttrs, unrevealedAttrs = splitRevealedAttrs(
+            claimAttributes, [a.name for a in revealedAttrs])
+
+        deltas = []
         for predicate in predicates:
-            geProof = await self._initGeProof(schemaId, eqProof, c1,
-                                              predicate, claimAttributes)
-            geProofs.append(geProof)
+            k, value = predicate.attrName, predicate.value
+            delta = claimAttributes[k].encoded - value
+            if delta < 0:
+                raise ValueError("Predicate is not satisfied")
+            deltas.append(delta)
+
+        eqPre = await self._popEqCommitment(schemaId, c1, unrevealedAttrs)
+        mtilde = {k: eqPre.mtilde[k] for k in unrevealedAttrs} if eqPre \
+            else self._getMTilde(unrevealedAttrs)
+        eqProof = runInExecutor(executor, initEqProof, pk, c1, mtilde,
+                                m1Tilde, m2Tilde, revealedAttrs, eqPre)
+
+        geProofs = []
+        for predicate, delta in zip(predicates, deltas):
+            gePre = await self._popGeCommitment(schemaId, pk)
+            geProofs.append(runInExecutor(executor, initGeProof, pk,
+                                          predicate, delta,
+                                          mtilde[predicate.attrName], gePre))
+
+        eqProof, *geProofs = await asyncio.gather(eqProof, *geProofs)
         return PrimaryInitProof(eqProof, geProofs)
 
     async def finalizeProof(self, schemaId, cH,
@@ -71,77 +332,19 @@ class PrimaryProofBuilder:
             geProofs.append(geProof)
         return PrimaryProof(eqProof, geProofs)
 
-    async def _initEqProof(self, schemaId, c1: PrimaryClaim,
-                           revealedAttrs: Sequence[str], m1Tilde, m2Tilde, claimAttributes: Dict[str, ClaimAttributeValues]) \
-            -> PrimaryEqualInitProof:
-        m2Tilde = m2Tilde if m2Tilde else cmod.integer(
-            cmod.randomBits(LARGE_MVECT))
-        revealedAttrs, unrevealedAttrs = splitRevealedAttrs(
-            claimAttributes, [a.name for a in revealedAttrs])
-        mtilde = self._getMTilde(unrevealedAttrs)
-
-        Ra = cmod.integer(cmod.randomBits(LARGE_VPRIME))
-        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
-
-        A, e, v = c1.A, c1.e, c1.v
-        Aprime = A * (pk.S ** Ra) % pk.N
-        vprime = (v - e * Ra)
-        eprime = e - (2 ** LARGE_E_START)
-
-        etilde = cmod.integer(cmod.randomBits(LARGE_ETILDE))
-        vtilde = cmod.integer(cmod.randomBits(LARGE_VTILDE))
-
-        Rur = 1 % pk.N
-        for k, value in unrevealedAttrs.items():
-            if k in claimAttributes:
-                Rur = Rur * (pk.R[k] ** mtilde[k])
-        Rur *= pk.Rms ** m1Tilde
-        Rur *= pk.Rctxt ** m2Tilde
-
-        # T = ((Aprime ** etilde) * Rur * (pk.S ** vtilde)) % pk.N
-        T = calcTeq(pk, Aprime, etilde, vtilde, mtilde, m1Tilde, m2Tilde,
-                    unrevealedAttrs.keys())
-
-        return PrimaryEqualInitProof(c1, Aprime, T, etilde, eprime, vtilde,
-                                     vprime, mtilde, m1Tilde, m2Tilde,
-                                     unrevealedAttrs.keys(), revealedAttrs)
-
-    async def _initGeProof(self, schemaId, eqProof: PrimaryEqualInitProof,
-                           c1: PrimaryClaim, predicate: Predicate, claimAttributes: Dict[str, ClaimAttributeValues]) \
-            -> PrimaryPrecicateGEInitProof:
-        # gen U for Delta
-        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
-        k, value = predicate.attrName, predicate.value
-        delta = claimAttributes[k].encoded - value
-        if delta < 0:
-            raise ValueError("Predicate is not satisfied")
-
-        u = fourSquares(delta)
-
-        # prepare C list
-        r = {}
-        T = {}
-        CList = []
-        for i in range(0, ITERATIONS):
-            r[str(i)] = cmod.integer(cmod.randomBits(LARGE_VPRIME))
-            T[str(i)] = (pk.Z ** u[str(i)]) * (pk.S ** r[str(i)]) % pk.N
-            CList.append(T[str(i)])
-        r[DELTA] = cmod.integer(cmod.randomBits(LARGE_VPRIME))
-        T[DELTA] = (pk.Z ** delta) * (pk.S ** r[DELTA]) % pk.N
-        CList.append(T[DELTA])
-
-        # prepare Tau List
-        utilde = {}
-        rtilde = {}
-        for i in range(0, ITERATIONS):
-            utilde[str(i)] = cmod.integer(cmod.randomBits(LARGE_UTILDE))
-            rtilde[str(i)] = cmod.integer(cmod.randomBits(LARGE_RTILDE))
-        rtilde[DELTA] = cmod.integer(cmod.randomBits(LARGE_RTILDE))
-        alphatilde = cmod.integer(cmod.randomBits(LARGE_ALPHATILDE))
-
-        TauList = calcTge(pk, utilde, rtilde, eqProof.mTilde[k], alphatilde, T)
-        return PrimaryPrecicateGEInitProof(CList, TauList, u, utilde, r, rtilde,
-                                           alphatilde, predicate, T)
+    async def _popEqCommitment(self, schemaId, c1: PrimaryClaim,
+                               unrevealedAttrs) -> EqCommitment:
+        pool = await self._getCommitmentPool(self._eqPools, schemaId)
+        if pool and pool.claim == c1 and \
+                set(unrevealedAttrs) <= set(pool.attrNames):
+            return pool.pop()
+        return None
+
+    async def _popGeCommitment(self, schemaId, pk: PublicKey) -> GeCommitment:
+        pool = await self._getCommitmentPool(self._gePools, schemaId)
+        if pool and pool.pk == pk:
+            return pool.pop()
+        return None
 
     async def _finalizeEqProof(self, schemaId, cH,
                                initProof: PrimaryEqualInitProof) -> PrimaryEqualProof:
@@ -1,28 +1,34 @@
 from anoncreds.protocol.globals import ITERATIONS, DELTA
+from anoncreds.protocol.utils import powProduct
+
+
+def teqPairs(pk, Aprime, e, v, mtilde, m1Tilde, m2Tilde, unrevealedAttrNames):
+    bases = pk.bases()
+    pairs = [(bases.R[k], mtilde[k]) for k in unrevealedAttrNames]
+    pairs.append((bases.Rms, m1Tilde))
+    pairs.append((bases.Rctxt, m2Tilde))
+    pairs.append((bases.S, v))
+    pairs.append((Aprime, e))
+    return pairs
 
 
 def calcTeq(pk, Aprime, e, v, mtilde, m1Tilde, m2Tilde, unrevealedAttrNames):
-    Rur = 1 % pk.N
-    for k in unrevealedAttrNames:
-        Rur = Rur * (pk.R[k] ** mtilde[k])
-    Rur *= pk.Rms ** m1Tilde
-    Rur *= pk.Rctxt ** m2Tilde
-    return ((Aprime ** e) * Rur * (pk.S ** v)) % pk.N
+    return powProduct(teqPairs(pk, Aprime, e, v, mtilde, m1Tilde, m2Tilde,
+                               unrevealedAttrNames), pk.N)
 
 
 def calcTge(pk, u, r, mj, alpha, T):
+    bases = pk.bases()
     TauList = []
     for i in range(0, ITERATIONS):
-        Ttau = (pk.Z ** u[str(i)]) * (pk.S ** r[str(i)]) % pk.N
+        Ttau = powProduct([(bases.Z, u[str(i)]), (bases.S, r[str(i)])], pk.N)
         TauList.append(Ttau)
-    Ttau = (pk.Z ** mj) * (pk.S ** r[DELTA]) % pk.N
+    Ttau = powProduct([(bases.Z, mj), (bases.S, r[DELTA])], pk.N)
     TauList.append(Ttau)
 
     # gen Q
-    Q = 1 % pk.N
-    for i in range(0, ITERATIONS):
-        Q *= T[str(i)] ** u[str(i)]
-    Q = Q * (pk.S ** alpha) % pk.N
+    Q = powProduct([(T[str(i)], u[str(i)]) for i in range(0, ITERATIONS)] +
+                   [(bases.S, alpha)], pk.N)
     TauList.append(Q)
 
     return TauList
@@ -1,56 +1,80 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Sequence
+
 from anoncreds.protocol.globals import LARGE_E_START, ITERATIONS, DELTA
-from anoncreds.protocol.primary.primary_proof_common import calcTeq, calcTge
+from anoncreds.protocol.primary.primary_proof_common import teqPairs
 from anoncreds.protocol.types import PrimaryEqualProof, \
-    PrimaryPredicateGEProof, PrimaryProof, ID
+    PrimaryPredicateGEProof, PrimaryProof, ID, PublicKey
+from anoncreds.protocol.utils import powProduct, runInExecutor
 from anoncreds.protocol.wallet.wallet import Wallet
 from config.config import cmod
 
 
-class PrimaryProofVerifier:
-    def __init__(self, wallet: Wallet):
-        self._wallet = wallet
+def verifyEquality(pk: PublicKey, attrNames, cH,
+                   proof: PrimaryEqualProof) -> Sequence:
+    THat = []
+    unrevealedAttrNames = set(attrNames) - set(proof.revealedAttrs.keys())
 
-    async def verify(self, schemaId, cHash, primaryProof: PrimaryProof):
-        cH = cmod.integer(cHash)
-        THat = await self._verifyEquality(schemaId, cH, primaryProof.eqProof)
-        for geProof in primaryProof.geProofs:
-            THat += await self._verifyGEPredicate(schemaId, cH, geProof)
+    # T = calcTeq(...) * (Z / Rar) ** -cH, where
+    # Rar = prod(R[attr] ** revealed[attr]) * Aprime ** 2^596,
+    # computed as a single product of powers
+    pairs = teqPairs(pk, proof.Aprime, proof.e + cH * 2 ** LARGE_E_START,
+                     proof.v, proof.m, proof.m1, proof.m2,
+                     unrevealedAttrNames)
+    bases = pk.bases()
+    for attrName in proof.revealedAttrs.keys():
+        pairs.append((bases.R[str(attrName)],
+                      cH * proof.revealedAttrs[str(attrName)]))
+    pairs.append((bases.Z, -1 * cH))
+    T = powProduct(pairs, pk.N)
 
-        return THat
+    THat.append(T)
+    return THat
 
-    async def _verifyEquality(self, schemaId, cH, proof: PrimaryEqualProof):
-        THat = []
-        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
-        attrNames = (await self._wallet.getSchema(ID(schemaId=schemaId))).attrNames
-        unrevealedAttrNames = set(attrNames) - set(proof.revealedAttrs.keys())
 
-        T1 = calcTeq(pk, proof.Aprime, proof.e, proof.v,
-                     proof.m, proof.m1, proof.m2,
-                     unrevealedAttrNames)
+def verifyGEPredicate(pk: PublicKey, cH,
+                      proof: PrimaryPredicateGEProof) -> Sequence:
+    v = proof.predicate.value
 
-        Rar = 1 % pk.N
-        for attrName in proof.revealedAttrs.keys():
-            Rar *= pk.R[str(attrName)] ** proof.revealedAttrs[str(attrName)]
-        Rar *= proof.Aprime ** (2 ** LARGE_E_START)
-        T2 = (pk.Z / Rar) ** (-1 * cH) % pk.N
-        T = T1 * T2 % pk.N
+    # (T[DELTA] * Z ** v) ** -cH = T[DELTA] ** -cH * Z ** (-cH * v), so
+    # Z ** (-cH * v) is folded into the Z ** mj term, and every T ** -cH
+    # factor is a part of the product of powers of its tau value
+    bases = pk.bases()
+    minusCH = -1 * cH
+    TauList = []
+    for i in range(0, ITERATIONS):
+        TauList.append(powProduct([(bases.Z, proof.u[str(i)]),
+                                   (bases.S, proof.r[str(i)]),
+                                   (proof.T[str(i)], minusCH)], pk.N))
+    TauList.append(powProduct([(bases.Z, proof.mj - cH * v),
+                               (bases.S, proof.r[DELTA]),
+                               (proof.T[DELTA], minusCH)], pk.N))
+    TauList.append(powProduct(
+        [(proof.T[str(i)], proof.u[str(i)]) for i in range(0, ITERATIONS)] +
+        [(bases.S, proof.alpha), (proof.T[DELTA], minusCH)], pk.N))
 
-        THat.append(T)
-        return THat
+    return TauList
 
-    async def _verifyGEPredicate(self, schemaId, cH,
-                                 proof: PrimaryPredicateGEProof):
-        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
-        v = proof.predicate.value
 
-        TauList = calcTge(pk, proof.u, proof.r, proof.mj, proof.alpha, proof.T)
+class PrimaryProofVerifier:
+    def __init__(self, wallet: Wallet):
+        self._wallet = wallet
 
-        for i in range(0, ITERATIONS):
-            TT = proof.T[str(i)] ** (-1 * cH) % pk.N
-            TauList[i] = TauList[i] * TT % pk.N
-        TauList[ITERATIONS] = TauList[ITERATIONS] * (
-            (proof.T[DELTA] * (pk.Z ** v)) ** (-1 * cH)) % pk.N
-        TauList[ITERATIONS + 1] = (TauList[ITERATIONS + 1] * (
-            proof.T[DELTA] ** (-1 * cH))) % pk.N
+    async def verify(self, schemaId, cHash, primaryProof: PrimaryProof,
+                     executor: Executor = None):
+        """
+        Recomputes the tau values of the proof. The equality and predicate
+        sub-proofs are evaluated concurrently in the executor if it's given.
+        """
+        cH = cmod.integer(cHash)
+        pk = await self._wallet.getPublicKey(ID(schemaId=schemaId))
+        attrNames = (await self._wallet.getSchema(
+            ID(schemaId=schemaId))).attrNames
 
-        return TauList
+        THats = await asyncio.gather(
+            runInExecutor(executor, verifyEquality, pk, attrNames, cH,
+                          primaryProof.eqProof),
+            *[runInExecutor(executor, verifyGEPredicate, pk, cH, geProof)
+              for geProof in primaryProof.geProofs])
+        return [THat for THatList in THats for THat in THatList]
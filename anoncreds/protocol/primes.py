@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from random import randint
+
+from anoncreds.protocol.globals import LARGE_PRIME, SIEVE_LIMIT, \
+    SIEVE_WINDOW, SAFE_PRIME_SEARCH_WINDOWS, E_SIEVE_LIMIT, E_SIEVE_WINDOW, \
+    LARGE_E_START, LARGE_E_END_RANGE, E_PRIME_POOL_SIZE
+from anoncreds.protocol.pools import BackgroundPool
+from config.config import cmod
+
+
+def _smallPrimes(limit):
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0] = sieve[1] = 0
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+    return [i for i in range(3, limit + 1) if sieve[i]]
+
+
+# odd primes used to sieve candidates before the expensive primality tests
+SMALL_PRIMES = _smallPrimes(SIEVE_LIMIT)
+# a shorter list is enough for `e`: cmod.isPrime rejects most composites
+# cheaply, so a long sieve costs more than it saves
+E_SMALL_PRIMES = [s for s in SMALL_PRIMES if s < E_SIEVE_LIMIT]
+
+
+def _randomOdd(bits):
+    # top bit is set so that the result has exactly `bits` bits
+    return int(cmod.randomBits(bits)) | (1 << (bits - 1)) | 1
+
+
+def _sieveSafePrimeCandidates(start, window):
+    """
+    Sieve the odd numbers `start + 2k` for k in [0, window) and return the
+    ones for which neither `p` nor `2p + 1` has a factor in SMALL_PRIMES.
+    """
+    sieve = bytearray([1]) * window
+    for s in SMALL_PRIMES:
+        r = start % s
+        half = (s + 1) // 2  # 2^-1 mod s
+        # start + 2k == 0 (mod s)
+        k = (-r * half) % s
+        sieve[k::s] = bytes(len(range(k, window, s)))
+        # 2 * (start + 2k) + 1 == 0 (mod s)
+        k = ((-half - r) * half) % s
+        sieve[k::s] = bytes(len(range(k, window, s)))
+    return [start + 2 * k for k in range(window) if sieve[k]]
+
+
+def _sievePrimeCandidates(start, window, smallPrimes=E_SMALL_PRIMES):
+    """
+    Sieve the odd numbers `start + 2k` for k in [0, window) and return the
+    ones without a factor in `smallPrimes`.
+    """
+    sieve = bytearray([1]) * window
+    for s in smallPrimes:
+        # start + 2k == 0 (mod s), skipping s itself
+        k = (-(start % s) * ((s + 1) // 2)) % s
+        if start + 2 * k == s:
+            k += s
+        sieve[k::s] = bytes(len(range(k, window, s)))
+    return [start + 2 * k for k in range(window) if sieve[k]]
+
+
+def genPrimeInRange(start, end, window=E_SIEVE_WINDOW):
+    """
+    Find a prime in [start, end] with an incremental sieve that starts at a
+    random point of the interval and wraps around to its beginning.
+
+    :return: the prime as int
+    """
+    start, end = int(start), int(end)
+    x = randint(start, end) | 1
+    for lo, hi in ((x, end), (start | 1, x - 2)):
+        while lo <= hi:
+            w = min(window, (hi - lo) // 2 + 1)
+            for c in _sievePrimeCandidates(lo, w):
+                if cmod.isPrime(c):
+                    return c
+            lo += 2 * w
+    if start <= 2 <= end:
+        return 2
+    raise ValueError("No prime in range [{}, {}]".format(start, end))
+
+
+def _searchSafePrime(bits, windows=SAFE_PRIME_SEARCH_WINDOWS,
+                     window=SIEVE_WINDOW):
+    """
+    Look for a prime `p` of `bits` bits such that `2p + 1` is prime as well,
+    scanning `windows` sieved windows from a random starting point.
+
+    :return: the prime as int or None if nothing was found
+    """
+    # keep the whole scanned range within `bits` bits
+    start = min(_randomOdd(bits), (1 << bits) - 2 * window * windows) | 1
+    for _ in range(windows):
+        for p in _sieveSafePrimeCandidates(start, window):
+            if cmod.isPrime(p) and cmod.isPrime(2 * p + 1):
+                return p
+        start += 2 * window
+    return None
+
+
+def genSafePrime(bits=LARGE_PRIME, workers=None):
+    """
+    Generate a prime `p` of `bits` bits such that `2p + 1` is also prime.
+
+    The search is fanned out over a process pool of `workers` processes
+    (the number of CPUs by default); `workers=1` searches in the current
+    process.
+
+    :return: the prime as a crypto integer
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        p = None
+        while not p:
+            p = _searchSafePrime(bits)
+        return cmod.integer(p)
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {executor.submit(_searchSafePrime, bits)
+                   for _ in range(workers)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                p = f.result()
+                if p:
+                    logging.debug("Found safe prime of {} bits".format(bits))
+                    return cmod.integer(p)
+                pending.add(executor.submit(_searchSafePrime, bits))
+    finally:
+        for f in pending:
+            f.cancel()
+        executor.shutdown(wait=False)
+
+
+class SafePrimePool:
+    """
+    A file-backed pool of pre-generated safe primes.
+
+    The pool can be filled in the background with `startFilling` and
+    primes are drawn with `pop`; if the pool is empty a new safe prime is
+    generated on demand.
+    """
+
+    def __init__(self, path, bits=LARGE_PRIME, workers=None):
+        self.path = path
+        self.bits = bits
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def pop(self):
+        with self._lock:
+            primes = self._load()
+            if primes:
+                p = primes.pop()
+                self._save(primes)
+                return cmod.integer(p)
+        logging.debug("Safe prime pool {} is empty".format(self.path))
+        return genSafePrime(self.bits, self.workers)
+
+    def add(self, p):
+        with self._lock:
+            primes = self._load()
+            primes.append(int(p))
+            self._save(primes)
+
+    def fill(self, count):
+        """
+        Generate safe primes until the pool holds at least `count` of them.
+        """
+        while not self._stop.is_set() and len(self) < count:
+            self.add(genSafePrime(self.bits, self.workers))
+
+    def startFilling(self, count):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.fill, args=(count,),
+                                        daemon=True)
+        self._thread.start()
+
+    def stopFilling(self, wait=True):
+        self._stop.set()
+        if wait and self._thread:
+            self._thread.join()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            data = json.load(f)
+        if data['bits'] != self.bits:
+            raise ValueError('Pool {} contains primes of {} bits, expected {}'
+                             .format(self.path, data['bits'], self.bits))
+        return [int(p) for p in data['primes']]
+
+    def _save(self, primes):
+        tmpPath = self.path + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump({'bits': self.bits,
+                       'primes': [str(p) for p in primes]}, f)
+        os.replace(tmpPath, self.path)
+
+
+class EPrimePool(BackgroundPool):
+    """
+    Primes in [2^596, 2^596 + 2^119] for the `e` of primary claims, kept
+    ready in the background.
+
+    Every prime handed out is recorded so that no `e` is issued twice. If
+    `usedPath` is given the record is kept in that file (one prime per
+    line) and survives restarts.
+    """
+
+    def __init__(self, size=E_PRIME_POOL_SIZE, usedPath=None,
+                 autoStart=True):
+        super().__init__(size, autoStart)
+        self.lower = 2 ** LARGE_E_START
+        self.upper = self.lower + 2 ** LARGE_E_END_RANGE
+        self.usedPath = usedPath
+        self._lock = threading.Lock()
+        self._used = self._loadUsed()
+        # primes produced but not handed out yet
+        self._pending = set()
+
+    def isUsed(self, e):
+        with self._lock:
+            return int(e) in self._used
+
+    def pop(self):
+        while True:
+            e = super().pop()
+            with self._lock:
+                self._pending.discard(e)
+                if e in self._used:
+                    continue
+                self._markUsed(e)
+            return e
+
+    def _job(self):
+        return genPrimeInRange, self.lower, self.upper
+
+    def _finish(self, e):
+        with self._lock:
+            if e in self._used or e in self._pending:
+                return None
+            self._pending.add(e)
+            return e
+
+    def _markUsed(self, e):
+        self._used.add(e)
+        if self.usedPath:
+            with open(self.usedPath, 'a') as f:
+                f.write('{}\n'.format(e))
+
+    def _loadUsed(self):
+        if not self.usedPath or not os.path.exists(self.usedPath):
+            return set()
+        with open(self.usedPath) as f:
+            return {int(line) for line in f if line.strip()}
@@ -0,0 +1,157 @@
+from anoncreds.protocol.exceptions import ProofValidationError, \
+    NotFoundError
+from anoncreds.protocol.globals import LARGE_ETILDE, LARGE_E_END_RANGE, \
+    LARGE_VTILDE, LARGE_MVECT, LARGE_M2_TILDE, LARGE_UTILDE, LARGE_RTILDE, \
+    LARGE_VPRIME, LARGE_ALPHATILDE, LARGE_CHASH, LARGE_MASTER_SECRET, \
+    ITERATIONS, DELTA, PAIRING_GROUP
+from anoncreds.protocol.types import FullProof, ProofRequest, ID, \
+    PrimaryEqualProof, PrimaryPredicateGEProof, NonRevocProof, PublicKey
+from anoncreds.protocol.utils import isCryptoInteger, isGroupElement
+from anoncreds.protocol.wallet.wallet import Wallet
+from config.config import cmod
+
+# Upper bounds on the bit lengths of the values a prover sends. Every
+# value is a random blinding value plus the challenge hash times a secret,
+# so it takes at most one bit more than the larger of the two terms.
+E_BITS = max(LARGE_ETILDE, LARGE_CHASH + LARGE_E_END_RANGE) + 1
+V_BITS = LARGE_VTILDE + 1
+M_BITS = LARGE_MVECT + 1
+M1_BITS = LARGE_M2_TILDE + 1
+# m2Tilde is taken from the non-revocation proof (an element of ZR) if
+# the claim has one
+M2_BITS = max(LARGE_MVECT, LARGE_CHASH + LARGE_MASTER_SECRET,
+              int(cmod.PairingGroup(PAIRING_GROUP).order()).bit_length()) + 1
+U_BITS = LARGE_UTILDE + 1
+R_BITS = max(LARGE_RTILDE, LARGE_CHASH + LARGE_VPRIME) + 1
+ALPHA_BITS = LARGE_ALPHATILDE + 1
+
+GE_U_KEYS = frozenset(str(i) for i in range(0, ITERATIONS))
+GE_T_KEYS = GE_U_KEYS | {DELTA}
+
+NON_REVOC_C_GROUPS = {'E': cmod.G1, 'D': cmod.G1, 'A': cmod.G1,
+                      'G': cmod.G1, 'W': cmod.G2, 'S': cmod.G2,
+                      'U': cmod.G2}
+
+
+class ProofValidator:
+    """
+    Structural and range checks of a proof, cheap compared to the proof
+    math. A proof passing them can still fail verification, but junk is
+    rejected before any exponentiation or pairing is evaluated.
+    """
+
+    def __init__(self, wallet: Wallet):
+        self._wallet = wallet
+
+    async def validate(self, proofRequest: ProofRequest, proof: FullProof):
+        """
+        :raises ProofValidationError: if the proof is malformed or doesn't
+        correspond to the proof request
+        """
+        if proofRequest.verifiableAttributes.keys() != proof.requestedProof.revealed_attrs.keys():
+            raise ProofValidationError('Received attributes ={} do not correspond to requested={}'.format(
+                proof.requestedProof.revealed_attrs.keys(), proofRequest.verifiableAttributes.keys()))
+
+        if proofRequest.predicates.keys() != proof.requestedProof.predicates.keys():
+            raise ProofValidationError('Received predicates ={} do not correspond to requested={}'.format(
+                proof.requestedProof.predicates.keys(), proofRequest.predicates.keys()))
+
+        _checkBits('cHash', proof.aggregatedProof.cHash, LARGE_CHASH)
+
+        for proofItem in proof.proofs.values():
+            schemaId = ID(schemaId=proofItem.schema_seq_no)
+            try:
+                schema = await self._wallet.getSchema(schemaId)
+                pk = await self._wallet.getPublicKey(schemaId)
+            except NotFoundError as ex:
+                raise ProofValidationError(
+                    'Unknown schema {}: {}'.format(proofItem.schema_seq_no,
+                                                   ex))
+
+            primaryProof = proofItem.proof.primaryProof
+            if not primaryProof:
+                raise ProofValidationError(
+                    'No primary proof for schema {}'.format(
+                        proofItem.schema_seq_no))
+            attrNames = set(schema.attrNames)
+            self._validateEqProof(primaryProof.eqProof, pk, attrNames)
+            for geProof in primaryProof.geProofs:
+                self._validateGeProof(geProof, pk, primaryProof.eqProof)
+
+            if proofItem.proof.nonRevocProof:
+                self._validateNonRevocProof(proofItem.proof.nonRevocProof)
+
+    @staticmethod
+    def _validateEqProof(proof: PrimaryEqualProof, pk: PublicKey, attrNames):
+        revealedAttrNames = set(proof.revealedAttrs.keys())
+        if not revealedAttrNames <= attrNames:
+            raise ProofValidationError(
+                'Unknown revealed attributes {}'.format(
+                    revealedAttrNames - attrNames))
+        if set(proof.m.keys()) != attrNames - revealedAttrNames:
+            raise ProofValidationError(
+                'Proof is not given for all unrevealed attributes')
+
+        _checkBits('e', proof.e, E_BITS)
+        _checkBits('v', proof.v, V_BITS)
+        for k, m in proof.m.items():
+            _checkBits('m[{}]'.format(k), m, M_BITS)
+        _checkBits('m1', proof.m1, M1_BITS)
+        _checkBits('m2', proof.m2, M2_BITS)
+        _checkModN('Aprime', proof.Aprime, pk.N)
+
+    @staticmethod
+    def _validateGeProof(proof: PrimaryPredicateGEProof, pk: PublicKey,
+                         eqProof: PrimaryEqualProof):
+        if proof.predicate.attrName not in eqProof.m:
+            raise ProofValidationError(
+                'Predicate for a revealed or unknown attribute {}'.format(
+                    proof.predicate.attrName))
+        if set(proof.u.keys()) != GE_U_KEYS or \
+                set(proof.r.keys()) != GE_T_KEYS or \
+                set(proof.T.keys()) != GE_T_KEYS:
+            raise ProofValidationError(
+                'Predicate proof must have {} iterations and {}'.format(
+                    ITERATIONS, DELTA))
+
+        for k, u in proof.u.items():
+            _checkBits('u[{}]'.format(k), u, U_BITS)
+        for k, r in proof.r.items():
+            _checkBits('r[{}]'.format(k), r, R_BITS)
+        _checkBits('alpha', proof.alpha, ALPHA_BITS)
+        _checkBits('mj', proof.mj, M_BITS)
+        for k, T in proof.T.items():
+            _checkModN('T[{}]'.format(k), T, pk.N)
+
+    @staticmethod
+    def _validateNonRevocProof(proof: NonRevocProof):
+        for name, group in NON_REVOC_C_GROUPS.items():
+            _checkGroupElement(name, getattr(proof.CProof, name), group)
+        for name, x in proof.XList._asdict().items():
+            _checkGroupElement(name, x, cmod.ZR)
+
+
+def _checkBits(name, value, bits):
+    try:
+        value = abs(int(value))
+    except (TypeError, ValueError):
+        raise ProofValidationError('{} is not an integer'.format(name))
+    if value.bit_length() > bits:
+        raise ProofValidationError(
+            '{} is longer than {} bits'.format(name, bits))
+
+
+def _checkModN(name, value, N):
+    if not isCryptoInteger(value) or int(cmod.getMod(value)) != int(N):
+        raise ProofValidationError('{} is not an integer mod N'.format(name))
+    if not 0 < int(value) < int(N):
+        raise ProofValidationError('{} is out of range'.format(name))
+
+
+def _checkGroupElement(name, value, group):
+    if not isGroupElement(value) or value.type != group:
+        raise ProofValidationError(
+            '{} is not an element of the expected group'.format(name))
+    if not cmod.PairingGroup(PAIRING_GROUP).ismember(value):
+        raise ProofValidationError(
+            '{} is not a member of the group'.format(name))
@@ -1,7 +1,10 @@
+import asyncio
+from concurrent.futures import Executor
 from functools import reduce
 from typing import Dict, Sequence, Any
 
-from anoncreds.protocol.globals import LARGE_MASTER_SECRET, LARGE_M2_TILDE
+from anoncreds.protocol.globals import LARGE_MASTER_SECRET, LARGE_M2_TILDE, \
+    PROOF_COMMITMENT_POOL_SIZE
 from anoncreds.protocol.primary.primary_proof_builder import \
     PrimaryClaimInitializer, PrimaryProofBuilder
 from anoncreds.protocol.revocation.accumulators.non_revocation_proof_builder import \
@@ -17,13 +20,25 @@ from config.config import cmod
 
 
 class Prover:
-    def __init__(self, wallet: ProverWallet):
+    def __init__(self, wallet: ProverWallet,
+                 commitmentPoolSize=PROOF_COMMITMENT_POOL_SIZE,
+                 executor: Executor = None):
+        """
+        :param commitmentPoolSize: how many proof commitments per claim
+        are precomputed in a background process (0 disables
+        precomputation)
+        :param executor: an executor (usually a process pool) to compute
+        the independent sub-proofs of a proof in concurrently; sub-proofs
+        are computed in the event loop's thread if not given
+        """
         self.wallet = wallet
+        self._executor = executor
 
         self._primaryClaimInitializer = PrimaryClaimInitializer(wallet)
         self._nonRevocClaimInitializer = NonRevocationClaimInitializer(wallet)
 
-        self._primaryProofBuilder = PrimaryProofBuilder(wallet)
+        self._primaryProofBuilder = PrimaryProofBuilder(wallet,
+                                                        commitmentPoolSize)
         self._nonRevocProofBuilder = NonRevocationProofBuilder(wallet)
 
     #
@@ -138,6 +153,7 @@ class Prover:
             schemaId,
             claim)
         await self.wallet.submitPrimaryClaim(schemaId=schemaId, claim=claim)
+        await self._primaryProofBuilder.precomputeCommitments(schemaId, claim)
 
     async def _initNonRevocationClaim(self, schemaId: ID,
                                       claim: NonRevocationClaim):
@@ -215,62 +231,76 @@ class Prover:
     async def _prepareProof(self, claims: Dict[SchemaKey, ProofClaims],
                             nonce, requestedProof) -> FullProof:
         m1Tilde = cmod.integer(cmod.randomBits(LARGE_M2_TILDE))
-        initProofs = {}
         CList = []
         TauList = []
 
-        # 1. init proofs
-        for schemaId, val in claims.items():
-            c1, c2, revealedAttrs, predicates = val.claims.primaryClaim, val.claims.nonRevocClaim, val.revealedAttrs, val.predicates
-
-            claim = await self.wallet.getClaimAttributes(ID(schemaId=schemaId))
-
-            nonRevocInitProof = None
-            if c2:
-                nonRevocInitProof = await self._nonRevocProofBuilder.initProof(
-                    schemaId, c2)
-                CList += nonRevocInitProof.asCList()
-                TauList += nonRevocInitProof.asTauList()
-
-            primaryInitProof = None
-            if c1:
-                m2Tilde = cmod.integer(int(
-                    nonRevocInitProof.TauListParams.m2)) if nonRevocInitProof else None
-                primaryInitProof = await self._primaryProofBuilder.initProof(
-                    schemaId, c1, revealedAttrs, predicates,
-                    m1Tilde, m2Tilde, claim)
-                CList += primaryInitProof.asCList()
-                TauList += primaryInitProof.asTauList()
-
-            initProof = InitProof(nonRevocInitProof, primaryInitProof)
-            initProofs[schemaId] = initProof
+        # 1. init proofs (claims are independent of each other)
+        schemaIds = list(claims.keys())
+        initProofs = await asyncio.gather(
+            *[self._initProof(schemaId, claims[schemaId], m1Tilde)
+              for schemaId in schemaIds])
+        initProofs = dict(zip(schemaIds, initProofs))
+        for initProof in initProofs.values():
+            if initProof.nonRevocInitProof:
+                CList += initProof.nonRevocInitProof.asCList()
+                TauList += initProof.nonRevocInitProof.asTauList()
+            if initProof.primaryInitProof:
+                CList += initProof.primaryInitProof.asCList()
+                TauList += initProof.primaryInitProof.asTauList()
 
         # 2. hash
         cH = self._get_hash(self._prepare_collection(
             CList), self._prepare_collection(TauList), nonce)
 
         # 3. finalize proofs
-        proofs = {}
-        for schemaId, initProof in initProofs.items():
-            nonRevocProof = None
-            if initProof.nonRevocInitProof:
-                nonRevocProof = await self._nonRevocProofBuilder.finalizeProof(
-                    schemaId, cH, initProof.nonRevocInitProof)
-            primaryProof = await self._primaryProofBuilder.finalizeProof(
-                schemaId, cH, initProof.primaryInitProof)
-
-            schema = await self.wallet.getSchema(ID(schemaId=schemaId))
-
-            proof = Proof(primaryProof, nonRevocProof)
-            proofInfo = ProofInfo(
-                proof=proof, schema_seq_no=schemaId, issuer_did=schema.issuerId)
-
-            proofs[str(schemaId)] = proofInfo
+        proofInfos = await asyncio.gather(
+            *[self._finalizeProof(schemaId, cH, initProof)
+              for schemaId, initProof in initProofs.items()])
+        proofs = {str(schemaId): proofInfo
+                  for schemaId, proofInfo in zip(initProofs, proofInfos)}
 
         aggregatedProof = AggregatedProof(cH, self._prepare_collection(CList))
 
         return FullProof(proofs, aggregatedProof, requestedProof)
 
+    async def _initProof(self, schemaId, val: ProofClaims,
+                         m1Tilde) -> InitProof:
+        c1, c2, revealedAttrs, predicates = val.claims.primaryClaim, val.claims.nonRevocClaim, val.revealedAttrs, val.predicates
+
+        claim = await self.wallet.getClaimAttributes(ID(schemaId=schemaId))
+
+        # the primary proof shares m2Tilde with the non-revocation proof,
+        # so draw it up front and compute both proofs concurrently
+        tauListParams = None
+        m2Tilde = None
+        if c2:
+            tauListParams = self._nonRevocProofBuilder.genTauListParams(
+                schemaId)
+            m2Tilde = cmod.integer(int(tauListParams.m2))
+
+        nonRevocInitProof, primaryInitProof = await asyncio.gather(
+            self._nonRevocProofBuilder.initProof(schemaId, c2, tauListParams,
+                                                 self._executor),
+            self._primaryProofBuilder.initProof(schemaId, c1, revealedAttrs,
+                                                predicates, m1Tilde, m2Tilde,
+                                                claim, self._executor))
+        return InitProof(nonRevocInitProof, primaryInitProof)
+
+    async def _finalizeProof(self, schemaId, cH,
+                             initProof: InitProof) -> ProofInfo:
+        nonRevocProof = None
+        if initProof.nonRevocInitProof:
+            nonRevocProof = await self._nonRevocProofBuilder.finalizeProof(
+                schemaId, cH, initProof.nonRevocInitProof)
+        primaryProof = await self._primaryProofBuilder.finalizeProof(
+            schemaId, cH, initProof.primaryInitProof)
+
+        schema = await self.wallet.getSchema(ID(schemaId=schemaId))
+
+        proof = Proof(primaryProof, nonRevocProof)
+        return ProofInfo(
+            proof=proof, schema_seq_no=schemaId, issuer_did=schema.issuerId)
+
     async def _getCList(self, initProofs: Dict[Schema, InitProof]):
         CList = []
         for initProof in initProofs.values():
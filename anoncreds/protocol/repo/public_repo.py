@@ -35,6 +35,16 @@ class PublicRepo:
     async def getAccumulator(self, schemaId: ID) -> Accumulator:
         raise NotImplementedError
 
+    async def getAccumulatorVersion(self, schemaId: ID):
+        """
+        The version of the current accumulator (see `Accumulator.version`).
+
+        Verifiers ask for it to find out whether their copy of the
+        accumulator is up to date. Repos that keep accumulators remotely
+        should answer it without sending the accumulator.
+        """
+        return (await self.getAccumulator(schemaId)).version
+
     @abstractmethod
     async def getTails(self, schemaId: ID) -> Tails:
         raise NotImplementedError
@@ -65,6 +75,14 @@ class PublicRepo:
     @abstractmethod
     async def submitAccumUpdate(self, schemaId: ID, accum: Accumulator,
                                 timestampMs: TimestampType):
+        """
+        Publishes the accumulator after claims were issued or revoked.
+
+        The change log of the accumulator (`changes` from `firstEpoch`) is
+        a part of its published state: provers update their witnesses from
+        it. It covers the latest epochs only; provers with older witnesses
+        recompute them from V.
+        """
         raise NotImplementedError
 
 
@@ -1,8 +1,13 @@
+from concurrent.futures import Executor
+
+from anoncreds.protocol.bitset import BitSet
 from anoncreds.protocol.globals import PAIRING_GROUP
+from anoncreds.protocol.revocation.accumulators.tails_generator import \
+    TailsGenerator
 from anoncreds.protocol.types import NonRevocationClaim, RevocationPublicKey, \
     RevocationSecretKey, \
     Accumulator, AccumulatorPublicKey, AccumulatorSecretKey, Witness, \
-    ID, TimestampType, Tails
+    ID, TimestampType, Tails, IssuanceContext
 from anoncreds.protocol.utils import currentTimestampMillisec, groupIdentityG2
 from anoncreds.protocol.wallet.issuer_wallet import IssuerWallet
 from config.config import cmod
@@ -40,43 +45,45 @@ class NonRevocationClaimIssuer:
         return (RevocationPublicKey(qr, g, gprime, h, h0, h1, h2, htilde, hhat, u, pk, y),
                 RevocationSecretKey(x, sk))
 
-    async def issueAccumulator(self, schemaId, iA, L) \
+    async def issueAccumulator(self, schemaId, iA, L, tailsPath=None,
+                               executor: Executor = None) \
             -> (Accumulator, Tails, AccumulatorPublicKey,
                 AccumulatorSecretKey):
+        """
+        :param tailsPath: a directory to write the tails to as they are
+        generated, and to resume an interrupted generation from
+        :param executor: an executor to generate the tails in; they are
+        generated in the current process if not given
+        """
         pkR = await self._wallet.getPublicKeyRevocation(schemaId)
-        group = cmod.PairingGroup(PAIRING_GROUP)
-        gamma = group.random(cmod.ZR)
-
-        tails = Tails()
-        gCount = 2 * L
-        for i in range(gCount):
-            if i != L + 1:
-                gVal = pkR.g ** (gamma ** i)
-                gPrimeVal = pkR.gprime ** (gamma ** i)
-                tails.addValue(i, gVal, gPrimeVal)
+
+        tails, gamma = await TailsGenerator(tailsPath).generate(
+            pkR.g, pkR.gprime, L, executor)
         z = cmod.pair(pkR.g, pkR.gprime) ** (gamma ** (L + 1))
 
         acc = 1
-        V = set()
+        V = BitSet()
 
         accPK = AccumulatorPublicKey(z)
         accSK = AccumulatorSecretKey(gamma)
         accum = Accumulator(iA, acc, V, L)
         return accum, tails, accPK, accSK
 
-    async def issueNonRevocationClaim(self, schemaId: ID, Ur, iA, i) -> (
+    async def issueNonRevocationClaim(self, schemaId: ID, Ur,
+                                      context: IssuanceContext, i=None) -> (
             NonRevocationClaim, Accumulator, TimestampType):
         accum = await self._wallet.getAccumulator(schemaId)
         pkR = await self._wallet.getPublicKeyRevocation(schemaId)
         skR = await self._wallet.getSecretKeyRevocation(schemaId)
         tails = await self._wallet.getTails(schemaId)
         skAccum = await self._wallet.getSecretKeyAccumulator(schemaId)
-        m2 = await self._wallet.getContextAttr(schemaId)
+        m2 = context.m2
 
         if accum.isFull():
             raise ValueError("Accumulator is full. New one must be issued.")
 
-        # TODO: currently all revo creds are issued sequentially
+        # revo creds are issued sequentially: the Issuer serializes calls
+        # for the same accumulator
         group = cmod.PairingGroup(
             PAIRING_GROUP)  # super singular curve, 1024 bits
 
@@ -88,17 +95,20 @@ class NonRevocationClaimIssuer:
         m2 = group.init(cmod.ZR, int(m2))
         sigma = (pkR.h0 * (pkR.h1 ** m2) * Ur * tails.g[i] * (
             pkR.h2 ** vrPrimeprime)) ** (1 / (skR.x + c))
-        omega = groupIdentityG2()
-        for j in accum.V:
-            omega *= tails.gprime[accum.L + 1 - j + i]
+        gammaI = skAccum.gamma ** i
+
+        # omega is the product of g'[L + 1 - j + i] = g'[L + 1 - j] ** gamma^i
+        # over the claims j in the accumulator, and acc is the product of
+        # g'[L + 1 - j], so omega is acc ** gamma^i whatever the size of V
+        omega = accum.acc ** gammaI if accum.V else groupIdentityG2()
 
-        sigmai = pkR.gprime ** (1 / (skR.sk + (skAccum.gamma ** i)))
-        ui = pkR.u ** (skAccum.gamma ** i)
+        sigmai = pkR.gprime ** (1 / (skR.sk + gammaI))
+        ui = pkR.u ** gammaI
 
         accum.acc *= tails.gprime[accum.L + 1 - i]
-        accum.V.add(i)
+        accum.add(i)
 
-        witness = Witness(sigmai, ui, tails.g[i], omega, accum.V.copy())
+        witness = Witness(sigmai, ui, tails.g[i], omega, accum.epoch)
 
         ts = currentTimestampMillisec()
         return (
@@ -110,7 +120,7 @@ class NonRevocationClaimIssuer:
         accum = await self._wallet.getAccumulator(schemaId)
         tails = await self._wallet.getTails(schemaId)
 
-        accum.V.discard(i)
+        accum.remove(i)
         accum.acc /= tails.gprime[accum.L + 1 - i]
 
         ts = currentTimestampMillisec()
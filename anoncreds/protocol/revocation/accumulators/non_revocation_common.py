@@ -1,45 +1,143 @@
 from anoncreds.protocol.types import Accumulator, NonRevocProofXList, \
     NonRevocProofCList, RevocationPublicKey, \
-    NonRevocProofTauList, AccumulatorPublicKey
-from anoncreds.protocol.utils import groupIdentityG1
+    NonRevocProofTauList, AccumulatorPublicKey, AccumulatorPairings, \
+    Witness, Tails
+from anoncreds.protocol.utils import groupIdentityG1, groupIdentityG2, \
+    PairingProduct
 from config.config import cmod
 
 
 def createTauListValues(pk: RevocationPublicKey, accum: Accumulator,
                         params: NonRevocProofXList,
                         proofC: NonRevocProofCList) -> NonRevocProofTauList:
+    return _evaluate(createTauListValueProducts(pk, accum, params, proofC))
+
+
+def createTauListExpectedValues(pk: RevocationPublicKey, accum: Accumulator,
+                                accumPk: AccumulatorPublicKey,
+                                proofC: NonRevocProofCList) -> NonRevocProofTauList:
+    return _evaluate(createTauListExpectedProducts(pk, accum, accumPk, proofC))
+
+
+def createAccumulatorPairings(pk: RevocationPublicKey, accum: Accumulator,
+                              accumPk: AccumulatorPublicKey) \
+        -> AccumulatorPairings:
+    return AccumulatorPairings(htildeAcc=cmod.pair(pk.htilde, accum.acc),
+                               zInv=1 / accumPk.z)
+
+
+def createTauListValueProducts(pk: RevocationPublicKey, accum: Accumulator,
+                               params: NonRevocProofXList,
+                               proofC: NonRevocProofCList,
+                               accumPairings: AccumulatorPairings = None) \
+        -> NonRevocProofTauList:
+    """
+    Tau list values with T3, T4, T7 and T8 as unevaluated PairingProducts.
+
+    :param accumPairings: pairings of the accumulator, if they are known
+    """
+    pairings = pk.pairings()
     T1 = (pk.h ** params.rho) * (pk.htilde ** params.o)
     T2 = (proofC.E ** params.c) * (pk.h ** (-params.m)) * (
         pk.htilde ** (-params.t))
-    T3 = ((cmod.pair(proofC.A, pk.hhat) ** params.c) *
-          (cmod.pair(pk.htilde, pk.hhat) ** params.r)) / \
-         ((cmod.pair(pk.htilde, pk.y) ** params.rho) *
-          (cmod.pair(pk.htilde, pk.hhat) ** params.m) *
-          (cmod.pair(pk.h1, pk.hhat) ** params.m2) *
-          (cmod.pair(pk.h2, pk.hhat) ** params.s))
-    T4 = (cmod.pair(pk.htilde, accum.acc) ** params.r) * \
-         (cmod.pair(1 / pk.g, pk.hhat) ** params.rPrime)
+    T3 = PairingProduct([(proofC.A ** params.c, pk.hhat)],
+                        [(pairings.htildeHhat, params.r - params.m),
+                         (pairings.htildeY, -params.rho),
+                         (pairings.h1Hhat, -params.m2),
+                         (pairings.h2Hhat, -params.s)])
+    if accumPairings:
+        T4 = PairingProduct(powers=[(accumPairings.htildeAcc, params.r),
+                                    (pairings.gInvHhat, params.rPrime)])
+    else:
+        T4 = PairingProduct([(pk.htilde ** params.r, accum.acc)],
+                            [(pairings.gInvHhat, params.rPrime)])
     T5 = (pk.g ** params.r) * (pk.htilde ** params.oPrime)
     T6 = (proofC.D ** params.rPrimePrime) * (pk.g ** -params.mPrime) * (
         pk.htilde ** -params.tPrime)
-    T7 = (cmod.pair(pk.pk * proofC.G, pk.hhat) ** params.rPrimePrime) * \
-         (cmod.pair(pk.htilde, pk.hhat) ** -params.mPrime) * \
-         (cmod.pair(pk.htilde, proofC.S) ** params.r)
-    T8 = (cmod.pair(pk.htilde, pk.u) ** params.r) * \
-         (cmod.pair(1 / pk.g, pk.hhat) ** params.rPrimePrimePrime)
+    T7 = PairingProduct([((pk.pk * proofC.G) ** params.rPrimePrime, pk.hhat),
+                         (pk.htilde ** params.r, proofC.S)],
+                        [(pairings.htildeHhat, -params.mPrime)])
+    T8 = PairingProduct(powers=[(pairings.htildeU, params.r),
+                                (pairings.gInvHhat, params.rPrimePrimePrime)])
     return NonRevocProofTauList(T1, T2, T3, T4, T5, T6, T7, T8)
 
 
-def createTauListExpectedValues(pk: RevocationPublicKey, accum: Accumulator,
-                                accumPk: AccumulatorPublicKey,
-                                proofC: NonRevocProofCList) -> NonRevocProofTauList:
+def createTauListExpectedProducts(pk: RevocationPublicKey, accum: Accumulator,
+                                  accumPk: AccumulatorPublicKey,
+                                  proofC: NonRevocProofCList,
+                                  accumPairings: AccumulatorPairings = None) \
+        -> NonRevocProofTauList:
+    """
+    Expected tau list values with T3, T4, T7 and T8 as unevaluated
+    PairingProducts.
+
+    :param accumPairings: pairings of the accumulator, if they are known
+    """
+    zInv = accumPairings.zInv if accumPairings else 1 / accumPk.z
+    gInv = 1 / pk.g
     T1 = proofC.E
     T2 = groupIdentityG1()
-    T3 = cmod.pair(pk.h0 * proofC.G, pk.hhat) / cmod.pair(proofC.A, pk.y)
-    T4 = cmod.pair(proofC.G, accum.acc) / (
-        cmod.pair(pk.g, proofC.W) * accumPk.z)
+    T3 = PairingProduct([(pk.h0 * proofC.G, pk.hhat), (1 / proofC.A, pk.y)])
+    T4 = PairingProduct([(proofC.G, accum.acc), (gInv, proofC.W)],
+                        [(zInv, None)])
     T5 = proofC.D
     T6 = groupIdentityG1()
-    T7 = cmod.pair(pk.pk * proofC.G, proofC.S) / cmod.pair(pk.g, pk.gprime)
-    T8 = cmod.pair(proofC.G, pk.u) / cmod.pair(pk.g, proofC.U)
+    T7 = PairingProduct([(pk.pk * proofC.G, proofC.S)],
+                        [(1 / pk.pairings().gGprime, None)])
+    T8 = PairingProduct([(proofC.G, pk.u), (gInv, proofC.U)])
     return NonRevocProofTauList(T1, T2, T3, T4, T5, T6, T7, T8)
+
+
+def _evaluate(tauList: NonRevocProofTauList) -> NonRevocProofTauList:
+    return NonRevocProofTauList(
+        *[T.value() if isinstance(T, PairingProduct) else T
+          for T in tauList.asList()])
+
+
+def updateWitness(witness: Witness, i, L, tails: Tails, added, removed,
+                  epoch) -> Witness:
+    """
+    The witness of claim `i` after the claims `added` were issued into and
+    the claims `removed` were revoked from the accumulator.
+
+    omega is the product of g'[L + 1 - j + i] over the claims j in the
+    accumulator other than i, so it is multiplied by the factors of the
+    added claims and divided by the factors of the removed ones: the cost
+    depends on the size of the change only, not on the size of V.
+
+    :param epoch: the epoch of the accumulator after the change
+    """
+    added = [j for j in added if j != i]
+    removed = [j for j in removed if j != i]
+    if not added and not removed:
+        return witness._replace(epoch=epoch)
+
+    def factors(indexes):
+        return _product(tails.gprime[L + 1 - j + i] for j in indexes)
+
+    omega = witness.omega
+    if added:
+        omega *= factors(added)
+    if removed:
+        omega /= factors(removed)
+    return witness._replace(omega=omega, epoch=epoch)
+
+
+def recomputeWitness(witness: Witness, i, L, tails: Tails, V,
+                     epoch) -> Witness:
+    """
+    The witness of claim `i` computed from all the claims `V` in the
+    accumulator, for a witness older than the change log of the
+    accumulator. The cost depends on the size of V.
+
+    :param epoch: the epoch of the accumulator holding V
+    """
+    omega = _product(tails.gprime[L + 1 - j + i] for j in V if j != i)
+    return witness._replace(omega=omega, epoch=epoch)
+
+
+def _product(values):
+    result = groupIdentityG2()
+    for value in values:
+        result *= value
+    return result
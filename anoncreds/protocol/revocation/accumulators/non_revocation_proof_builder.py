@@ -1,15 +1,39 @@
+from concurrent.futures import Executor
+
+from anoncreds.protocol.bitset import BitSet
 from anoncreds.protocol.globals import PAIRING_GROUP
 from anoncreds.protocol.revocation.accumulators.non_revocation_common import \
     createTauListValues, \
-    createTauListExpectedValues
+    createTauListExpectedValues, updateWitness, recomputeWitness
 from anoncreds.protocol.types import NonRevocationClaim, NonRevocInitProof, \
     NonRevocProofXList, NonRevocProofCList, NonRevocProof, \
-    ID, ClaimInitDataType
-from anoncreds.protocol.utils import int_to_ZR
+    ID, ClaimInitDataType, RevocationPublicKey, Accumulator
+from anoncreds.protocol.utils import int_to_ZR, runInExecutor
 from anoncreds.protocol.wallet.prover_wallet import ProverWallet
 from config.config import cmod
 
 
+def createCListValues(c2: NonRevocationClaim, params: NonRevocProofXList,
+                      pkR: RevocationPublicKey) -> NonRevocProofCList:
+    E = (pkR.h ** params.rho) * (pkR.htilde ** params.o)
+    D = (pkR.g ** params.r) * (pkR.htilde ** params.oPrime)
+    A = c2.sigma * (pkR.htilde ** params.rho)
+    G = c2.witness.gi * (pkR.htilde ** params.r)
+    W = c2.witness.omega * (pkR.hhat ** params.rPrime)
+    S = c2.witness.sigmai * (pkR.hhat ** params.rPrimePrime)
+    U = c2.witness.ui * (pkR.hhat ** params.rPrimePrimePrime)
+    return NonRevocProofCList(E, D, A, G, W, S, U)
+
+
+def initNonRevocProof(pkR: RevocationPublicKey, accum: Accumulator,
+                      c2: NonRevocationClaim, cListParams: NonRevocProofXList,
+                      tauListParams: NonRevocProofXList) -> NonRevocInitProof:
+    proofCList = createCListValues(c2, cListParams, pkR)
+    proofTauList = createTauListValues(pkR, accum, tauListParams, proofCList)
+    return NonRevocInitProof(proofCList, proofTauList, cListParams,
+                             tauListParams)
+
+
 class NonRevocationClaimInitializer:
     def __init__(self, wallet: ProverWallet):
         self._wallet = wallet
@@ -46,7 +70,7 @@ class NonRevocationClaimInitializer:
             raise ValueError("issuer is sending incorrect data")
 
         pairGGCalc = cmod.pair(pkR.pk * claim.witness.gi, claim.witness.sigmai)
-        pairGG = cmod.pair(pkR.g, pkR.gprime)
+        pairGG = pkR.pairings().gGprime
         if pairGGCalc != pairGG:
             raise ValueError("issuer is sending incorrect data")
 
@@ -73,58 +97,61 @@ class NonRevocationProofBuilder:
                                                  ts=ts,
                                                  seqNo=seqNo)
 
-        oldV = c2.witness.V
         newAccum = await self._wallet.getAccumulator(
             ID(schemaId=schemaId))
-        newV = newAccum.V
         tails = await self._wallet.getTails(ID(schemaId=schemaId))
 
-        if c2.i not in newV:
+        if c2.i not in newAccum.V:
             raise ValueError("Can not update Witness. I'm revoced.")
 
-        if oldV != newV:
-            vOldMinusNew = oldV - newV
-            vNewMinusOld = newV - oldV
-            omegaDenom = 1
-            for j in vOldMinusNew:
-                omegaDenom *= tails.gprime[newAccum.L + 1 - j + c2.i]
-            omegaNum = 1
-            newOmega = c2.witness.omega
-            for j in vNewMinusOld:
-                omegaNum *= tails.gprime[newAccum.L + 1 - j + c2.i]
-                newOmega *= omegaNum / omegaDenom
-
-            newWitness = c2.witness._replace(V=newV, omega=newOmega)
-            c2 = c2._replace(witness=newWitness)
-
-            await self._wallet.submitNonRevocClaim(schemaId=ID(schemaId=schemaId),
-                                                   claim=c2)
-
+        epoch = c2.witness.epoch
+        if epoch == newAccum.epoch:
+            return c2
+        if isinstance(epoch, int) and epoch < newAccum.firstEpoch:
+            # the changes since the witness are no longer published
+            newWitness = recomputeWitness(c2.witness, c2.i, newAccum.L,
+                                          tails, newAccum.V, newAccum.epoch)
+        else:
+            if isinstance(epoch, int):
+                added, removed = newAccum.changesSince(epoch)
+            else:
+                # a witness stored before witnesses kept an accumulator
+                # epoch
+                added, removed = BitSet(epoch).changes(newAccum.V)
+            newWitness = updateWitness(c2.witness, c2.i, newAccum.L, tails,
+                                       added=added, removed=removed,
+                                       epoch=newAccum.epoch)
+        c2 = c2._replace(witness=newWitness)
+
+        await self._wallet.submitNonRevocClaim(schemaId=ID(schemaId=schemaId),
+                                               claim=c2)
         return c2
 
-    async def initProof(self, schemaId,
-                        c2: NonRevocationClaim) -> NonRevocInitProof:
+    async def initProof(self, schemaId, c2: NonRevocationClaim,
+                        tauListParams: NonRevocProofXList = None,
+                        executor: Executor = None) -> NonRevocInitProof:
+        """
+        Creates an init proof for the claim, computing the pairings in the
+        executor if it's given.
+
+        :param tauListParams: randomness for the tau list (generated if not
+        given); pass it to know its m2 before the proof is computed
+        """
         if not c2:
             return None
 
         c2 = await self.updateNonRevocationClaim(schemaId, c2)
 
         pkR = await self._wallet.getPublicKeyRevocation(ID(schemaId=schemaId))
+        # compute the constant pairings once here rather than in a worker
+        pkR.pairings()
         accum = await self._wallet.getAccumulator(ID(schemaId=schemaId))
-        CList = []
-        TauList = []
 
         cListParams = self._genCListParams(schemaId, c2)
-        proofCList = self._createCListValues(schemaId, c2, cListParams, pkR)
-        CList.extend(proofCList.asList())
-
-        tauListParams = self._genTauListParams(schemaId)
-        proofTauList = createTauListValues(pkR, accum, tauListParams,
-                                           proofCList)
-        TauList.extend(proofTauList.asList())
-
-        return NonRevocInitProof(proofCList, proofTauList, cListParams,
-                                 tauListParams)
+        tauListParams = tauListParams if tauListParams \
+            else self.genTauListParams(schemaId)
+        return await runInExecutor(executor, initNonRevocProof, pkR, accum,
+                                   c2, cListParams, tauListParams)
 
     async def finalizeProof(self, schemaId, cH,
                             initProof: NonRevocInitProof) -> NonRevocProof:
@@ -162,19 +189,7 @@ class NonRevocationProofBuilder:
                                   o=o, oPrime=oPrime, m=m, mPrime=mPrime, t=t,
                                   tPrime=tPrime, m2=m2, s=c2.v, c=c2.c)
 
-    def _createCListValues(self, schemaId, c2: NonRevocationClaim,
-                           params: NonRevocProofXList,
-                           pkR) -> NonRevocProofCList:
-        E = (pkR.h ** params.rho) * (pkR.htilde ** params.o)
-        D = (pkR.g ** params.r) * (pkR.htilde ** params.oPrime)
-        A = c2.sigma * (pkR.htilde ** params.rho)
-        G = c2.witness.gi * (pkR.htilde ** params.r)
-        W = c2.witness.omega * (pkR.hhat ** params.rPrime)
-        S = c2.witness.sigmai * (pkR.hhat ** params.rPrimePrime)
-        U = c2.witness.ui * (pkR.hhat ** params.rPrimePrimePrime)
-        return NonRevocProofCList(E, D, A, G, W, S, U)
-
-    def _genTauListParams(self, schemaId) -> NonRevocProofXList:
+    def genTauListParams(self, schemaId) -> NonRevocProofXList:
         group = cmod.PairingGroup(
             PAIRING_GROUP)  # super singular curve, 1024 bits
         return NonRevocProofXList(group=group)
@@ -186,7 +201,7 @@ class NonRevocationProofBuilder:
             ID(schemaId=schemaId))
 
         cListParams = self._genCListParams(schemaId, c2)
-        proofCList = self._createCListValues(schemaId, c2, cListParams, pkR)
+        proofCList = createCListValues(c2, cListParams, pkR)
         proofTauList = createTauListValues(pkR, accum, cListParams, proofCList)
 
         proofTauListCalc = createTauListExpectedValues(pkR, accum, accumPk,
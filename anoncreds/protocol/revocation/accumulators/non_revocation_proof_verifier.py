@@ -1,42 +1,137 @@
-from typing import Sequence
+import asyncio
+from concurrent.futures import Executor
+from typing import Sequence, Tuple, Any, List
 
 from anoncreds.protocol.globals import PAIRING_GROUP
 from anoncreds.protocol.revocation.accumulators.non_revocation_common import \
-    createTauListExpectedValues, \
-    createTauListValues
-from anoncreds.protocol.types import T, NonRevocProof, ID, ProofRequest
-from anoncreds.protocol.utils import int_to_ZR
+    createTauListExpectedProducts, \
+    createTauListValueProducts, createAccumulatorPairings
+from anoncreds.protocol.types import T, NonRevocProof, ID, ProofRequest, \
+    RevocationPublicKey, Accumulator, AccumulatorPublicKey, \
+    AccumulatorPairings
+from anoncreds.protocol.utils import int_to_ZR, runInExecutor, \
+    PairingProduct
 from anoncreds.protocol.wallet.wallet import Wallet
 from config.config import cmod
 
 
+def calcNonRevocTauList(pkR: RevocationPublicKey, accum: Accumulator,
+                        accumPk: AccumulatorPublicKey, cHash,
+                        nonRevocProof: NonRevocProof,
+                        accumPairings: AccumulatorPairings = None) \
+        -> Sequence[T]:
+    CProof = nonRevocProof.CProof
+    XList = nonRevocProof.XList
+
+    group = cmod.PairingGroup(
+        PAIRING_GROUP)  # super singular curve, 1024 bits
+    THatExpected = createTauListExpectedProducts(pkR, accum, accumPk, CProof,
+                                                 accumPairings)
+    THatCalc = createTauListValueProducts(pkR, accum, XList, CProof,
+                                          accumPairings)
+    chNum_z = int_to_ZR(cHash, group)
+
+    # for the pairing-based values the expected and calculated pairings
+    # are evaluated together, with one final exponentiation per value
+    return [(x ** chNum_z * y).value() if isinstance(x, PairingProduct)
+            else (x ** chNum_z) * y
+            for x, y in zip(THatExpected.asList(), THatCalc.asList())]
+
+
 class NonRevocationProofVerifier:
     def __init__(self, wallet: Wallet):
         self._wallet = wallet
+        # schema seq no -> (accumulator id, version, AccumulatorPairings)
+        self._accumPairings = {}
 
     async def verifyNonRevocation(self, proofRequest: ProofRequest, schema_seq_no,
-                                  cHash, nonRevocProof: NonRevocProof) \
+                                  cHash, nonRevocProof: NonRevocProof,
+                                  executor: Executor = None) \
             -> Sequence[T]:
+        pkR, accum, accumPk, accumPairings = \
+            await self._getAccumState(proofRequest, schema_seq_no)
+        return await runInExecutor(executor, calcNonRevocTauList, pkR, accum,
+                                   accumPk, cHash, nonRevocProof,
+                                   accumPairings)
+
+    async def verifyNonRevocationBatch(
+            self, items: Sequence[Tuple[ProofRequest, Any, Any,
+                                        NonRevocProof]],
+            executor: Executor = None) -> List[Sequence[T]]:
+        """
+        Tau lists of many non-revocation proofs. The accumulator of every
+        schema (and time or sequence number requested) is updated, and its
+        keys and pairings are fetched, once for all proofs checked against
+        it.
+
+        :param items: (proof request, schema seq no, challenge hash,
+        non-revocation proof) tuples
+        :return: tau lists in the order of items; an exception raised for
+        an item, or for the accumulator it is checked against, is returned
+        in place of its tau list
+        """
+        states = {}
+        TauLists = []
+        for proofRequest, schema_seq_no, cHash, nonRevocProof in items:
+            key = (schema_seq_no, proofRequest.ts, proofRequest.seqNo)
+            if key not in states:
+                try:
+                    states[key] = await self._getAccumState(proofRequest,
+                                                            schema_seq_no)
+                except Exception as ex:
+                    states[key] = ex
+            if isinstance(states[key], Exception):
+                TauLists.append(_raise(states[key]))
+                continue
+            pkR, accum, accumPk, accumPairings = states[key]
+            TauLists.append(runInExecutor(executor, calcNonRevocTauList, pkR,
+                                          accum, accumPk, cHash,
+                                          nonRevocProof, accumPairings))
+        return await asyncio.gather(*TauLists, return_exceptions=True)
+
+    async def _getAccumState(self, proofRequest: ProofRequest, schema_seq_no):
+        accum = await self.getAccumulator(proofRequest, schema_seq_no)
+        pkR = await self._wallet.getPublicKeyRevocation(ID(schemaId=schema_seq_no))
+        # compute the constant pairings once here rather than in a worker
+        pkR.pairings()
+        accumPk = await self._wallet.getPublicKeyAccumulator(ID(schemaId=schema_seq_no))
+        accumPairings = self._getAccumPairings(schema_seq_no, pkR, accum,
+                                               accumPk)
+        return pkR, accum, accumPk, accumPairings
+
+    async def getAccumulator(self, proofRequest: ProofRequest,
+                             schema_seq_no) -> Accumulator:
+        """
+        The accumulator a proof for the proof request is checked against,
+        updated first if the repo has a newer version. Proofs checked
+        against an accumulator that didn't change cost a version query
+        rather than a download of the accumulator.
+        """
         if await self._wallet.shouldUpdateAccumulator(
-                schemaId=ID(seqId=schema_seq_no),
+                schemaId=ID(schemaId=schema_seq_no),
                 ts=proofRequest.ts,
                 seqNo=proofRequest.seqNo):
             await self._wallet.updateAccumulator(schemaId=ID(schemaId=schema_seq_no),
                                                  ts=proofRequest.ts,
                                                  seqNo=proofRequest.seqNo)
-
-        pkR = await self._wallet.getPublicKeyRevocation(ID(schemaId=schema_seq_no))
         accum = await self._wallet.getAccumulator(ID(schemaId=schema_seq_no))
-        accumPk = await self._wallet.getPublicKeyAccumulator(ID(schemaId=schema_seq_no))
+        cached = self._accumPairings.get(schema_seq_no)
+        if cached and cached[:2] != (accum.iA, accum.version):
+            # the accumulator was updated, its pairings are stale
+            del self._accumPairings[schema_seq_no]
+        return accum
 
-        CProof = nonRevocProof.CProof
-        XList = nonRevocProof.XList
+    def _getAccumPairings(self, schema_seq_no, pkR: RevocationPublicKey,
+                          accum: Accumulator, accumPk: AccumulatorPublicKey) \
+            -> AccumulatorPairings:
+        key = (accum.iA, accum.version)
+        cached = self._accumPairings.get(schema_seq_no)
+        if cached and cached[:2] == key:
+            return cached[2]
+        accumPairings = createAccumulatorPairings(pkR, accum, accumPk)
+        self._accumPairings[schema_seq_no] = key + (accumPairings,)
+        return accumPairings
 
-        group = cmod.PairingGroup(
-            PAIRING_GROUP)  # super singular curve, 1024 bits
-        THatExpected = createTauListExpectedValues(pkR, accum, accumPk, CProof)
-        THatCalc = createTauListValues(pkR, accum, XList, CProof)
-        chNum_z = int_to_ZR(cHash, group)
 
-        return [(x ** chNum_z) * y for x, y in
-                zip(THatExpected.asList(), THatCalc.asList())]
+async def _raise(ex):
+    raise ex
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from anoncreds.protocol.globals import PAIRING_GROUP, TAILS_CHUNK_SIZE
+from anoncreds.protocol.types import Tails
+from anoncreds.protocol.utils import serializeToStr, deserializeFromStr, \
+    runInExecutor
+from config.config import cmod
+
+
+def genTailsChunk(g, gprime, gamma, start, end):
+    """
+    g ** gamma^i and g' ** gamma^i for i in [start, end).
+
+    Every power is derived from the previous one with a single
+    exponentiation by gamma, rather than computing gamma^i from scratch.
+    """
+    gVals = []
+    gprimeVals = []
+    gammaStart = gamma ** start
+    gVal = g ** gammaStart
+    gprimeVal = gprime ** gammaStart
+    for _ in range(start, end):
+        gVals.append(gVal)
+        gprimeVals.append(gprimeVal)
+        gVal = gVal ** gamma
+        gprimeVal = gprimeVal ** gamma
+    return gVals, gprimeVals
+
+
+class TailsGenerator:
+    """
+    Generates the tails of an accumulator: g ** gamma^i and g' ** gamma^i
+    for i in [0, 2L) except L + 1.
+
+    The index range is split in chunks, computed in a process pool if an
+    executor or a number of `workers` is given and one after another
+    otherwise. If `path` is given, every finished chunk is written to a
+    file in that directory, and a generation that was interrupted resumes
+    from the chunks already there.
+
+    The directory also keeps gamma, the secret key of the accumulator, so
+    that an interrupted generation can be resumed. The manifest holding it
+    is created readable by its owner only.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, path=None, chunkSize=TAILS_CHUNK_SIZE,
+                 workers=None):
+        """
+        :param path: a directory to write the chunks to
+        :param chunkSize: the number of indexes in a chunk
+        :param workers: the size of a process pool to compute the chunks
+        in; they are computed in the current process if it's not given
+        """
+        self.path = path
+        self.chunkSize = chunkSize
+        self.workers = workers
+
+    async def generate(self, g, gprime, L, executor: Executor = None):
+        """
+        :param executor: an executor to compute the chunks in; a process
+        pool of `workers` processes is used if not given and `workers` is
+        given
+        :return: the tails and gamma
+        """
+        gamma = self._loadGamma(g, gprime, L)
+        if gamma is None:
+            gamma = cmod.PairingGroup(PAIRING_GROUP).random(cmod.ZR)
+            self._saveManifest(g, gprime, L, gamma)
+
+        tails = Tails()
+        pending = []
+        for start in range(0, 2 * L, self.chunkSize):
+            end = min(start + self.chunkSize, 2 * L)
+            chunk = self._loadChunk(start, end)
+            if chunk:
+                self._addChunk(tails, L, start, *chunk)
+            else:
+                pending.append((start, end))
+        if pending:
+            logging.debug('Generating {} of {} tails chunks'.format(
+                len(pending), -(-2 * L // self.chunkSize)))
+
+        if len(pending) <= 1 or \
+                (executor is None and (self.workers or 1) == 1):
+            for start, end in pending:
+                chunk = genTailsChunk(g, gprime, gamma, start, end)
+                self._saveChunk(start, end, *chunk)
+                self._addChunk(tails, L, start, *chunk)
+            return tails, gamma
+
+        ownExecutor = executor is None
+        executor = executor if executor else \
+            ProcessPoolExecutor(self.workers)
+
+        async def genChunk(start, end):
+            chunk = await runInExecutor(executor, genTailsChunk, g, gprime,
+                                        gamma, start, end)
+            return start, end, chunk
+
+        futures = [asyncio.ensure_future(genChunk(start, end))
+                   for start, end in pending]
+        try:
+            for future in asyncio.as_completed(futures):
+                start, end, chunk = await future
+                self._saveChunk(start, end, *chunk)
+                self._addChunk(tails, L, start, *chunk)
+        finally:
+            for future in futures:
+                future.cancel()
+            if ownExecutor:
+                executor.shutdown(wait=False)
+        return tails, gamma
+
+    @staticmethod
+    def _addChunk(tails: Tails, L, start, gVals, gprimeVals):
+        for i, (gVal, gprimeVal) in enumerate(zip(gVals, gprimeVals),
+                                              start):
+            if i != L + 1:
+                tails.addValue(i, gVal, gprimeVal)
+
+    def _chunkPath(self, start):
+        return os.path.join(self.path, 'tails-{:012d}.json'.format(start))
+
+    def _loadChunk(self, start, end):
+        if not self.path or not os.path.exists(self._chunkPath(start)):
+            return None
+        with open(self._chunkPath(start)) as f:
+            data = json.load(f)
+        if data['start'] != start or data['end'] != end:
+            return None
+        return ([deserializeFromStr(v) for v in data['g']],
+                [deserializeFromStr(v) for v in data['gprime']])
+
+    def _saveChunk(self, start, end, gVals, gprimeVals):
+        if self.path:
+            self._save(self._chunkPath(start), {
+                'start': start,
+                'end': end,
+                'g': [serializeToStr(v) for v in gVals],
+                'gprime': [serializeToStr(v) for v in gprimeVals]})
+
+    def _loadGamma(self, g, gprime, L):
+        if not self.path:
+            return None
+        path = os.path.join(self.path, self.MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data['L'] != L or data['g'] != serializeToStr(g) \
+                or data['gprime'] != serializeToStr(gprime):
+            raise ValueError('Tails in {} are of another accumulator'
+                             .format(self.path))
+        return deserializeFromStr(data['gamma'])
+
+    def _saveManifest(self, g, gprime, L, gamma):
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            # gamma is the secret key of the accumulator
+            self._save(os.path.join(self.path, self.MANIFEST), {
+                'L': L,
+                'g': serializeToStr(g),
+                'gprime': serializeToStr(gprime),
+                'gamma': serializeToStr(gamma)}, mode=0o600)
+
+    @staticmethod
+    def _save(path, data, mode=0o644):
+        # a chunk is either written completely or not at all
+        tmpPath = path + '.tmp'
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        with open(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmpPath, path)
@@ -2,9 +2,12 @@ import os
 from collections import namedtuple
 from typing import Sequence, Set, TypeVar
 
+from anoncreds.protocol.bitset import BitSet
+from anoncreds.protocol.globals import LARGE_VTILDE, LARGE_MVECT, \
+    FIXED_BASE_WINDOW, ACCUMULATOR_CHANGE_LOG_SIZE
 from anoncreds.protocol.utils import toDictWithStrValues, \
     fromDictWithStrValues, encodeAttr, crypto_int_to_str, to_crypto_int, isCryptoInteger, \
-    intToArrayBytes, bytesToInt
+    intToArrayBytes, bytesToInt, FixedBaseTable
 from config.config import cmod
 from typing import NamedTuple
 import uuid
@@ -202,11 +205,50 @@ class Schema(namedtuple('Schema',
         return SchemaKey(self.name, self.version, self.issuerId)
 
 
+PublicKeyBases = namedtuple('PublicKeyBases', 'S, Z, Rms, Rctxt, R')
+
+
 class PublicKey(namedtuple('PublicKey', 'N, Rms, Rctxt, R, S, Z, seqId'),
                 NamedTupleStrSerializer):
     def __new__(cls, N, Rms, Rctxt, R, S, Z, seqId=None):
         return super(PublicKey, cls).__new__(cls, N, Rms, Rctxt, R, S, Z, seqId)
 
+    def precompute(self, window=FIXED_BASE_WINDOW):
+        """
+        Build fixed-base tables for S, Z, Rms, Rctxt and every R[attr].
+
+        The tables stay attached to this instance and are used by every
+        exponentiation that goes through `bases`.
+        """
+        N = self.N
+        self._tables = PublicKeyBases(
+            S=FixedBaseTable(self.S, N, LARGE_VTILDE, window),
+            Z=FixedBaseTable(self.Z, N, LARGE_MVECT, window),
+            Rms=FixedBaseTable(self.Rms, N, LARGE_MVECT, window),
+            Rctxt=FixedBaseTable(self.Rctxt, N, LARGE_MVECT, window),
+            R={k: FixedBaseTable(v, N, LARGE_MVECT, window)
+               for k, v in self.R.items()})
+        return self
+
+    def __getstate__(self):
+        # the fixed-base tables are a local cache, don't pickle them
+        return None
+
+    @property
+    def precomputed(self):
+        return getattr(self, '_tables', None) is not None
+
+    def bases(self) -> PublicKeyBases:
+        """
+        S, Z, Rms, Rctxt and R as fixed-base tables if `precompute` was
+        called, as plain values otherwise; meant to be used with
+        `utils.powProduct`.
+        """
+        tables = getattr(self, '_tables', None)
+        if tables is not None:
+            return tables
+        return PublicKeyBases(self.S, self.Z, self.Rms, self.Rctxt, self.R)
+
     def __eq__(self, other):
         return self.N == other.N and self.Rms == other.Rms \
             and self.Rctxt == other.Rctxt and self.S == other.S \
@@ -242,6 +284,11 @@ class SecretKey(namedtuple('SecretKey', 'pPrime, qPrime'),
     pass
 
 
+RevocationPairings = namedtuple('RevocationPairings',
+                                'htildeHhat, h1Hhat, h2Hhat, gInvHhat, '
+                                'htildeY, htildeU, gGprime')
+
+
 class RevocationPublicKey(namedtuple('RevocationPublicKey',
                                      'qr, g, gprime, h, h0, h1, h2, htilde, hhat, u, pk, y, seqId'),
                           NamedTupleStrSerializer):
@@ -250,6 +297,28 @@ class RevocationPublicKey(namedtuple('RevocationPublicKey',
                                                        h2, htilde, hhat, u, pk, y,
                                                        seqId)
 
+    def pairings(self) -> RevocationPairings:
+        """
+        Pairings of the key's own elements used by non-revocation proofs,
+        computed on the first call and kept with this instance.
+        """
+        pairings = getattr(self, '_pairings', None)
+        if pairings is None:
+            pairings = RevocationPairings(
+                htildeHhat=cmod.pair(self.htilde, self.hhat),
+                h1Hhat=cmod.pair(self.h1, self.hhat),
+                h2Hhat=cmod.pair(self.h2, self.hhat),
+                gInvHhat=cmod.pair(1 / self.g, self.hhat),
+                htildeY=cmod.pair(self.htilde, self.y),
+                htildeU=cmod.pair(self.htilde, self.u),
+                gGprime=cmod.pair(self.g, self.gprime))
+            self._pairings = pairings
+        return pairings
+
+
+# pairings that depend only on an accumulator value and its public key
+AccumulatorPairings = namedtuple('AccumulatorPairings', 'htildeAcc, zInv')
+
 
 class RevocationSecretKey(namedtuple('RevocationSecretKey', 'x, sk'),
                           NamedTupleStrSerializer):
@@ -310,20 +379,105 @@ class PredicateGE(Predicate):
 
 
 class Accumulator:
-    def __init__(self, iA, acc, V: VType, L):
+    def __init__(self, iA, acc, V: VType, L, changes=None, firstEpoch=0,
+                 maxChanges=ACCUMULATOR_CHANGE_LOG_SIZE):
+        """
+        :param changes: the claim added or removed at each epoch since
+        `firstEpoch`
+        :param firstEpoch: the epoch the change log starts at; older
+        changes are dropped from it
+        :param maxChanges: the number of latest epochs the change log
+        covers at least; it is trimmed to that once it grows to twice as
+        many, so it doesn't grow with every claim ever issued or revoked
+        """
         self.iA = iA
         self.acc = acc
         self.V = V
         self.L = L
         self.currentI = 1
+        # the change log is a part of the published accumulator: witnesses
+        # keep the epoch they were computed at instead of a copy of V
+        self.changes = list(changes) if changes else []
+        self.firstEpoch = firstEpoch
+        self.maxChanges = maxChanges
 
     def isFull(self):
         return self.currentI > self.L
 
+    @property
+    def epoch(self):
+        return self.firstEpoch + len(self.changes)
+
+    def add(self, i):
+        if i not in self.V:
+            self.V.add(i)
+            self._logChange(i)
+
+    def remove(self, i):
+        if i in self.V:
+            self.V.discard(i)
+            self._logChange(i)
+
+    def _logChange(self, i):
+        self.changes.append(i)
+        if len(self.changes) >= 2 * self.maxChanges:
+            dropped = len(self.changes) - self.maxChanges
+            del self.changes[:dropped]
+            self.firstEpoch += dropped
+
+    def changesSince(self, epoch) -> (VType, VType):
+        """
+        :return: the claims added to and removed from the accumulator since
+        the epoch
+        :raises ValueError: if the change log of this accumulator doesn't
+        cover the epoch
+        """
+        if not self.firstEpoch <= epoch <= self.epoch:
+            raise ValueError(
+                'Accumulator changes since epoch {} are unknown, the change '
+                'log covers epochs {} to {}'.format(epoch, self.firstEpoch,
+                                                   self.epoch))
+        changed = set()
+        for i in self.changes[epoch - self.firstEpoch:]:
+            changed ^= {i}
+        changed = BitSet(changed)
+        return changed & self.V, changed - self.V
+
+    def membersAt(self, epoch) -> VType:
+        added, removed = self.changesSince(epoch)
+        return (self.V - added) | removed
+
+    @property
+    def version(self):
+        # the accumulator value changes with every issued or revoked claim,
+        # and proofs valid for one value are valid whenever it is restored
+        return str(self.acc)
+
+    def toStrDict(self):
+        return toDictWithStrValues({
+            'iA': self.iA,
+            'acc': self.acc,
+            'V': BitSet(self.V),
+            'L': self.L,
+            'currentI': self.currentI,
+            'changes': self.changes,
+            'firstEpoch': self.firstEpoch
+        })
+
+    @classmethod
+    def fromStrDict(cls, d):
+        d = fromDictWithStrValues(d)
+        accum = cls(d['iA'], d['acc'], BitSet(d.get('V', ())), d['L'],
+                    d.get('changes'), d.get('firstEpoch', 0))
+        accum.currentI = d['currentI']
+        return accum
+
     def __eq__(self, other):
         return self.iA == other.iA and self.acc == other.acc \
             and self.V == other.V and self.L == other.L \
-            and self.currentI == other.currentI
+            and self.currentI == other.currentI \
+            and self.changes == other.changes \
+            and self.firstEpoch == other.firstEpoch
 
 
 ClaimInitDataType = namedtuple('ClaimInitDataType', 'U, vPrime')
@@ -348,6 +502,13 @@ class ClaimRequest(namedtuple('ClaimRequest', 'userId, U, Ur'),
         return cls(userId=data['prover_did'], U=u, Ur=data['ur'])
 
 
+class IssuanceContext(namedtuple('IssuanceContext', 'userId, iA, m2')):
+    """
+    Per-request state of a claim issuance: the context attribute `m2` is
+    derived from the user and the accumulator IDs.
+    """
+
+
 # Accumulator = namedtuple('Accumulator', ['iA', 'acc', 'V', 'L'])
 
 class PrimaryClaim(
@@ -372,7 +533,7 @@ class PrimaryClaim(
         return cls(m2=m2, A=a, e=e, v=v)
 
 
-class Witness(namedtuple('Witness', 'sigmai, ui, gi, omega, V'),
+class Witness(namedtuple('Witness', 'sigmai, ui, gi, omega, epoch'),
               NamedTupleStrSerializer):
     pass
 
@@ -383,7 +544,12 @@ class NonRevocationClaim(
     @classmethod
     def fromStrDict(cls, d):
         d = fromDictWithStrValues(d)
-        witness = Witness(**d['witness'])
+        witnessData = d['witness']
+        if 'V' in witnessData:
+            # claims stored before witnesses kept an accumulator epoch hold
+            # the claims of the accumulator the witness was computed for
+            witnessData['epoch'] = witnessData.pop('V')
+        witness = Witness(**witnessData)
         result = cls(**d)
         return result._replace(witness=witness)
 
@@ -1,23 +1,38 @@
-import logging
+import asyncio
+import base64
+import copyreg
 import string
+import threading
 import time
 from collections import OrderedDict
 from enum import Enum
 from hashlib import sha256
 from math import sqrt, floor
-from random import randint, sample
+from random import sample
 from sys import byteorder
 from typing import Dict, List, Set
 
 import base58
 
+from anoncreds.protocol.bitset import BitSet
 from anoncreds.protocol.globals import KEYS, PK_R
 from anoncreds.protocol.globals import LARGE_PRIME, LARGE_MASTER_SECRET, \
-    LARGE_VPRIME, PAIRING_GROUP
+    LARGE_VPRIME, PAIRING_GROUP, FIXED_BASE_WINDOW
+from anoncreds.protocol.primes import genSafePrime, genPrimeInRange
 from config.config import cmod
 import sys
 
 
+async def runInExecutor(executor, func, *args):
+    """
+    Run `func` in the executor, or inline if no executor is given.
+    """
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_event_loop().run_in_executor(executor, func,
+                                                          *args)
+
+
 def encodeAttr(attrValue):
     return cmod.Conversion.bytes2integer(sha256(str(attrValue).encode()).digest())
 
@@ -50,6 +65,7 @@ def get_hash_as_int(*args, group: cmod.PairingGroup = None):
 CRYPTO_INT_PREFIX = 'CryptoInt_'
 INT_PREFIX = 'Int_'
 GROUP_PREFIX = 'Group_'
+BITSET_PREFIX = 'BitSet_'
 BYTES_PREFIX = 'Bytes_'
 
 
@@ -61,6 +77,9 @@ def serializeToStr(n):
     if isGroupElement(n):
         return GROUP_PREFIX + cmod.PairingGroup(PAIRING_GROUP).serialize(
             n).decode()
+    if isinstance(n, BitSet):
+        # a bit per possible member rather than a string per member
+        return BITSET_PREFIX + base64.b64encode(n.toBytes()).decode()
     return n
 
 
@@ -78,12 +97,26 @@ def deserializeFromStr(n: str):
         res = cmod.PairingGroup(PAIRING_GROUP).deserialize(n)
         # A fix for Identity element as serialized/deserialized not correctly
         if str(res) == '[0, 0]':
-            return groupIdentityG1()
+            return groupIdentityG2() if res.type == cmod.G2 \
+                else groupIdentityG1()
         return res
 
+    if isStr(n) and n.startswith(BITSET_PREFIX):
+        return BitSet.fromBytes(base64.b64decode(n[len(BITSET_PREFIX):]))
+
     return n
 
 
+def _reduceCryptoValue(n):
+    return deserializeFromStr, (serializeToStr(n),)
+
+
+# let crypto integers and group elements be pickled, e.g. to be sent to
+# worker processes
+copyreg.pickle(cmod.integer, _reduceCryptoValue)
+copyreg.pickle(cmod.pc_element, _reduceCryptoValue)
+
+
 def isCryptoInteger(n):
     return isinstance(n, cmod.integer)
 
@@ -117,6 +150,8 @@ def toDictWithStrValues(d):
             result[serializeToStr(key)] = serializeToStr(value)
         elif isNamedTuple(value):
             result[serializeToStr(key)] = toDictWithStrValues(value._asdict())
+        elif isinstance(value, BitSet):
+            result[serializeToStr(key)] = serializeToStr(value)
         elif isinstance(value, Set):
             result[serializeToStr(key)] = {toDictWithStrValues(v) for v in
                                            value}
@@ -172,15 +207,7 @@ def get_values_of_dicts(*args):
 
 
 def get_prime_in_range(start, end):
-    n = 0
-    maxIter = 100000
-    while n < maxIter:
-        r = randint(start, end)
-        if cmod.isPrime(r):
-            logging.debug("Found prime in {} iterations".format(n))
-            return r
-        n += 1
-    raise Exception("Cannot find prime in {} iterations".format(maxIter))
+    return genPrimeInRange(start, end)
 
 
 def splitRevealedAttrs(encodedAttrs, revealedAttrs):
@@ -266,12 +293,7 @@ def genPrime():
     Generate 2 large primes `p_prime` and `q_prime` and use them
     to generate another 2 primes `p` and `q` of 1024 bits
     """
-    prime = cmod.randomPrime(LARGE_PRIME)
-    i = 0
-    while not cmod.isPrime(2 * prime + 1):
-        prime = cmod.randomPrime(LARGE_PRIME)
-        i += 1
-    return prime
+    return genSafePrime(LARGE_PRIME)
 
 
 def base58encode(i):
@@ -378,3 +400,260 @@ def bytesToInt(bytes):
         result = result * 256 + int(b)
 
     return result
+
+
+class FixedBaseTable:
+    """
+    Precomputed powers base ** (2 ** (window * i)) mod N of a fixed base.
+
+    With the table an exponentiation takes about bits / window
+    multiplications and no squarings (Yao's method). The table grows on
+    demand to fit the largest exponent seen.
+    """
+
+    def __init__(self, base, N, bits=0, window=FIXED_BASE_WINDOW):
+        self.N = N
+        self.window = window
+        self._powers = [base % N]
+        self._lock = threading.Lock()
+        self.extend(bits)
+
+    @property
+    def base(self):
+        return self._powers[0]
+
+    @property
+    def bits(self):
+        return len(self._powers) * self.window
+
+    def extend(self, bits):
+        if bits <= self.bits:
+            return
+        with self._lock:
+            powers = self._powers
+            while len(powers) * self.window < bits:
+                x = powers[-1]
+                for _ in range(self.window):
+                    x = x * x % self.N
+                powers.append(x)
+
+    def pow(self, exp):
+        return fixedBaseProduct([(self, exp)], self.N)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _windowDigits(exp: int, window):
+    mask = (1 << window) - 1
+    digits = []
+    while exp:
+        digits.append(exp & mask)
+        exp >>= window
+    return digits
+
+
+def fixedBaseProduct(pairs, N):
+    """
+    Product of table.base ** exp mod N over (FixedBaseTable, exp) pairs.
+
+    All tables share one set of buckets: bucket j collects every power
+    whose exponent digit is j, and the buckets are combined once at the
+    end, so each extra base costs only about bits / window multiplications.
+    Negative exponents are supported.
+    """
+    if not pairs:
+        return 1 % N
+    window = pairs[0][0].window
+    buckets = [[None] * (1 << window), [None] * (1 << window)]
+    for table, exp in pairs:
+        if table.window != window:
+            raise ValueError("Tables with different windows can't be combined")
+        exp = int(exp)
+        negative = exp < 0
+        exp = abs(exp)
+        table.extend(exp.bit_length())
+        bucket = buckets[negative]
+        for power, d in zip(table._powers, _windowDigits(exp, window)):
+            if d:
+                bucket[d] = power if bucket[d] is None \
+                    else bucket[d] * power % N
+
+    result = _combineBuckets(buckets[0], N)
+    if any(b is not None for b in buckets[1]):
+        result = result * (_combineBuckets(buckets[1], N) ** -1) % N
+    return result
+
+
+def _combineBuckets(bucket, N):
+    # prod(bucket[j] ** j) = prod over j of (bucket[j] * ... * bucket[max])
+    result = 1 % N
+    running = None
+    for b in reversed(bucket[1:]):
+        if b is not None:
+            running = b if running is None else running * b % N
+        if running is not None:
+            result = result * running % N
+    return result
+
+
+def _slidingWindows(exp: int, window):
+    # (position of the lowest bit, odd value) of each window of exp
+    bits = bin(exp)[2:]
+    n = len(bits)
+    windows = []
+    i = 0
+    while i < n:
+        if bits[i] == '0':
+            i += 1
+            continue
+        j = min(i + window, n)
+        while bits[j - 1] == '0':
+            j -= 1
+        windows.append((n - j, int(bits[i:j], 2)))
+        i = j
+    return windows
+
+
+def _multiExpWindow(bits):
+    if bits <= 32:
+        return 2
+    if bits <= 128:
+        return 3
+    if bits <= 512:
+        return 4
+    if bits <= 1536:
+        return 5
+    return 6
+
+
+def multiExp(pairs, N):
+    """
+    Product of base ** exp mod N over (base, exp) pairs.
+
+    Bases are interleaved (Straus' method with a sliding window per base)
+    so that all of them share one chain of squarings. Exponents much longer
+    than the others, and products of fewer than 3 bases, are left to the
+    native exponentiation which is faster for them. Negative exponents are
+    supported.
+    """
+    result = 1 % N
+    shared = []
+    for base, exp in pairs:
+        exp = int(exp)
+        if exp < 0:
+            base = base ** -1
+            exp = -exp
+        if exp:
+            shared.append((base, exp))
+    shared.sort(key=lambda p: p[1].bit_length())
+
+    native = []
+    while len(shared) >= 2 and \
+            shared[-1][1].bit_length() > 2 * shared[-2][1].bit_length():
+        native.append(shared.pop())
+    if len(shared) < 3:
+        native += shared
+        shared = []
+    for base, exp in native:
+        result = result * (base ** exp) % N
+    if not shared:
+        return result
+
+    # multipliers to apply after squaring at each bit position
+    byPosition = {}
+    for base, exp in shared:
+        window = _multiExpWindow(exp.bit_length())
+        # odd powers base, base^3, ..., base^(2^window - 1)
+        square = base * base % N
+        odd = [base % N]
+        for _ in range((1 << (window - 1)) - 1):
+            odd.append(odd[-1] * square % N)
+        for position, value in _slidingWindows(exp, window):
+            byPosition.setdefault(position, []).append(odd[value >> 1])
+
+    acc = 1 % N
+    for i in range(shared[-1][1].bit_length() - 1, -1, -1):
+        acc = acc * acc % N
+        for m in byPosition.get(i, ()):
+            acc = acc * m % N
+    return result * acc % N
+
+
+def powProduct(pairs, N):
+    """
+    Product of base ** exp mod N over (base, exp) pairs. Bases that are
+    FixedBaseTable instances are exponentiated with their tables, the rest
+    with `multiExp`.
+    """
+    fixed = [(b, e) for b, e in pairs if isinstance(b, FixedBaseTable)]
+    other = [(b, e) for b, e in pairs if not isinstance(b, FixedBaseTable)]
+    return fixedBaseProduct(fixed, N) * multiExp(other, N) % N
+
+
+class PairingProduct:
+    """
+    An unevaluated product of pairings e(a, b) and powers g ** x of
+    elements of the target group (e.g. precomputed pairings).
+
+    Exponents of pairings are applied to their first argument
+    (e(a, b) ** x = e(a ** x, b)), so raising a product to a power or
+    dividing products needs no exponentiation in the target group. On
+    evaluation pairings with the same second argument are merged into one
+    and all Miller loops share a single final exponentiation.
+    """
+
+    def __init__(self, pairs=(), powers=()):
+        """
+        :param pairs: (a, b) pairs of elements of G1 and G2 for e(a, b)
+        :param powers: (g, x) pairs of an element of GT and an exponent in
+        ZR, or None for g itself
+        """
+        self.pairs = list(pairs)
+        self.powers = list(powers)
+
+    def __mul__(self, other):
+        return PairingProduct(self.pairs + other.pairs,
+                              self.powers + other.powers)
+
+    def __pow__(self, x):
+        return PairingProduct(
+            [(a ** x, b) for a, b in self.pairs],
+            [(g, x if y is None else y * x) for g, y in self.powers])
+
+    def __truediv__(self, other):
+        return self * other.inverse()
+
+    def inverse(self):
+        return PairingProduct(
+            [(1 / a, b) for a, b in self.pairs],
+            [(1 / g, None) if y is None else (g, -y)
+             for g, y in self.powers])
+
+    def value(self):
+        lhs, rhs = [], []
+        for a, b in self.pairs:
+            for i, r in enumerate(rhs):
+                if r == b:
+                    # e(a1, b) * e(a2, b) = e(a1 * a2, b)
+                    lhs[i] *= a
+                    break
+            else:
+                lhs.append(a)
+                rhs.append(b)
+
+        result = None
+        if lhs:
+            # charm's pairing of lists crashes if it isn't given the group
+            group = cmod.PairingGroup(PAIRING_GROUP)
+            result = cmod.pair(lhs, rhs, group.Pairing)
+        for g, y in self.powers:
+            factor = g if y is None else g ** y
+            result = factor if result is None else result * factor
+        return result
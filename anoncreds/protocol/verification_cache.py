@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Dict, Optional
+
+from anoncreds.protocol.globals import VERIFICATION_CACHE_SIZE, \
+    VERIFICATION_CACHE_TTL
+from anoncreds.protocol.types import FullProof, ProofRequest
+
+
+class VerificationCache:
+    """
+    A LRU cache of verification results with a time to live, keyed by a
+    digest of the proof request and the proof.
+
+    A result also records the versions of the accumulators the proof was
+    checked against and is only returned while they are current, so a
+    revocation invalidates it.
+    """
+
+    def __init__(self, size=VERIFICATION_CACHE_SIZE,
+                 ttl=VERIFICATION_CACHE_TTL, clock=time.monotonic):
+        """
+        :param size: the maximum number of results to keep
+        :param ttl: the time in seconds a result is kept for
+        :param clock: a function returning the current time in seconds
+        """
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def digest(proofRequest: ProofRequest, proof: FullProof) -> str:
+        # to_str_dict leaves out non-revocation proofs
+        nonRevocProofs = {k: v.proof.nonRevocProof.toStrDict()
+                          for k, v in proof.proofs.items()
+                          if v.proof.nonRevocProof}
+        data = json.dumps({'proof_request': proofRequest.to_str_dict(),
+                           'proof': proof.to_str_dict(),
+                           'non_revoc_proofs': nonRevocProofs},
+                          sort_keys=True)
+        return sha256(data.encode()).hexdigest()
+
+    def get(self, digest, accumVersions: Dict) -> Optional[bool]:
+        """
+        :param accumVersions: versions of the accumulators the proof is
+        checked against now, by schema sequence number
+        :return: the cached result, None if there is no current one
+        """
+        with self._lock:
+            entry = self._results.get(digest)
+            if not entry:
+                return None
+            result, versions, expires = entry
+            if expires <= self._clock() or versions != accumVersions:
+                del self._results[digest]
+                return None
+            self._results.move_to_end(digest)
+            return result
+
+    def put(self, digest, accumVersions: Dict, result: bool):
+        with self._lock:
+            self._results[digest] = (result, accumVersions,
+                                     self._clock() + self.ttl)
+            self._results.move_to_end(digest)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
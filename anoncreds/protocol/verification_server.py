@@ -0,0 +1,287 @@
+"""
+A verification service: a minimal HTTP server on localhost or a Unix
+socket that verifies proofs with a shared Verifier.
+
+    POST /verify
+    {"proof_request": <ProofRequest.to_str_dict()>,
+     "proof": <FullProof.to_str_dict()>}
+
+answers 200 with {"verified": true|false}, 400 if the request or the proof
+is malformed, 408 if the request isn't received in time and 503 if the
+server is overloaded. The proof math runs in a process pool; requests wait
+for it in a bounded queue and are rejected right away when the queue or
+the number of open connections is full, so latency stays bounded under
+load.
+
+The `to_str_dict` form of a proof carries primary proofs only and drops
+non-revocation proofs, so proofs that must show that their claims are not
+revoked can't be verified through this server.
+
+Run with
+
+    python -m anoncreds.protocol.verification_server \
+        --repo mypackage.repo:createRepo --port 8080
+
+where `createRepo` returns the PublicRepo to fetch schemas and keys from.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from anoncreds.protocol.exceptions import NotFoundError
+from anoncreds.protocol.globals import SERVER_QUEUE_SIZE, \
+    SERVER_MAX_REQUEST_SIZE, SERVER_MAX_CONNECTIONS, SERVER_READ_TIMEOUT, \
+    SERVER_MAX_HEADERS
+from anoncreds.protocol.repo.public_repo import PublicRepo, \
+    PublicRepoInMemory
+from anoncreds.protocol.types import ProofRequest, FullProof, ID
+from anoncreds.protocol.verifier import Verifier
+from anoncreds.protocol.wallet.wallet import WalletInMemory
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 408: 'Request Timeout',
+           413: 'Payload Too Large', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class VerificationServer:
+    def __init__(self, verifier: Verifier, concurrency=None,
+                 queueSize=SERVER_QUEUE_SIZE,
+                 maxRequestSize=SERVER_MAX_REQUEST_SIZE,
+                 maxConnections=SERVER_MAX_CONNECTIONS,
+                 readTimeout=SERVER_READ_TIMEOUT):
+        """
+        :param verifier: the verifier to check proofs with
+        :param concurrency: the number of proofs verified at the same time
+        (the number of CPUs by default)
+        :param queueSize: the number of proofs waiting to be verified
+        beyond which new requests are rejected
+        :param maxRequestSize: the maximum size of a request body in bytes
+        :param maxConnections: the number of open connections beyond which
+        new ones are rejected
+        :param readTimeout: the time in seconds a client has to send its
+        request
+        """
+        self.verifier = verifier
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.queueSize = queueSize
+        self.maxRequestSize = maxRequestSize
+        self.maxConnections = maxConnections
+        self.readTimeout = readTimeout
+        self._connections = 0
+        self._queue = None
+        self._workers = []
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """
+        Starts listening on a Unix socket if `path` is given and on a TCP
+        port otherwise.
+        """
+        self._queue = asyncio.Queue(maxsize=self.queueSize)
+        self._workers = [asyncio.ensure_future(self._work())
+                         for _ in range(self.concurrency)]
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle,
+                                                           path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host,
+                                                      port)
+        return self._server
+
+    @property
+    def sockets(self):
+        return self._server.sockets if self._server else []
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def submit(self, proofRequest: ProofRequest, proof: FullProof):
+        """
+        Queues a proof for verification.
+
+        :return: the verification result
+        :raises HttpError: with status 503 if the queue is full
+        """
+        return await self._submit(self.verifier.verify, proofRequest, proof)
+
+    async def _submit(self, func, *args):
+        future = asyncio.get_event_loop().create_future()
+        try:
+            self._queue.put_nowait((func, args, future))
+        except asyncio.QueueFull:
+            raise HttpError(503, 'Too many proofs waiting to be verified')
+        return await future
+
+    async def _work(self):
+        while True:
+            func, args, future = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    future.set_result(await func(*args))
+            except Exception as ex:
+                if not future.cancelled():
+                    future.set_exception(ex)
+            finally:
+                self._queue.task_done()
+
+    async def verify(self, body: bytes):
+        try:
+            data = json.loads(body.decode())
+            proofRequest = ProofRequest.from_str_dict(data['proof_request'])
+            proofData = data['proof']
+        except (ValueError, KeyError, TypeError, AttributeError) as ex:
+            raise HttpError(400, 'Malformed request: {}'.format(ex))
+        # the keys of the proof are fetched once the request is admitted to
+        # the queue, so they are covered by its bound too
+        return await self._submit(self._verifyProof, proofRequest, proofData)
+
+    async def _verifyProof(self, proofRequest: ProofRequest, proofData):
+        try:
+            # integers of the proof are mod N of the key of their schema
+            n = []
+            for item in proofData['proofs'].values():
+                pk = await self.verifier.wallet.getPublicKey(
+                    ID(schemaId=item['schema_seq_no']))
+                n.append(pk.N)
+            proof = FullProof.from_str_dict(proofData, n)
+        except (ValueError, KeyError, TypeError, AttributeError,
+                NotFoundError) as ex:
+            raise HttpError(400, 'Malformed request: {}'.format(ex))
+
+        try:
+            return await self.verifier.verify(proofRequest, proof)
+        except ValueError as ex:
+            raise HttpError(400, 'Proof is rejected: {}'.format(ex))
+
+    async def _handle(self, reader, writer):
+        self._connections += 1
+        try:
+            try:
+                if self._connections > self.maxConnections:
+                    raise HttpError(503, 'Too many open connections')
+                try:
+                    method, path, body = await asyncio.wait_for(
+                        self._readRequest(reader), self.readTimeout)
+                except asyncio.TimeoutError:
+                    raise HttpError(408, 'Request is not received in {} '
+                                         'seconds'.format(self.readTimeout))
+                if path != '/verify':
+                    raise HttpError(404, 'Unknown path {}'.format(path))
+                if method != 'POST':
+                    raise HttpError(405, 'Use POST')
+                status, response = 200, {'verified': await self.verify(body)}
+            except HttpError as ex:
+                status, response = ex.status, {'error': str(ex)}
+            except Exception as ex:
+                logging.exception('Failed to verify a proof')
+                status, response = 500, {'error': str(ex)}
+            self._writeResponse(writer, status, response)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    async def _readRequest(self, reader):
+        try:
+            method, path, _ = (await reader.readline()).decode().split(' ', 2)
+            length = 0
+            for _ in range(SERVER_MAX_HEADERS + 1):
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            else:
+                raise HttpError(400, 'More than {} headers'.format(
+                    SERVER_MAX_HEADERS))
+        except ValueError:
+            raise HttpError(400, 'Malformed HTTP request')
+        if length < 0:
+            raise HttpError(400, 'Malformed HTTP request')
+        if length > self.maxRequestSize:
+            raise HttpError(413, 'Request is larger than {} bytes'.format(
+                self.maxRequestSize))
+        body = await reader.readexactly(length)
+        return method, path, body
+
+    @staticmethod
+    def _writeResponse(writer, status, response):
+        body = json.dumps(response).encode()
+        writer.write('HTTP/1.1 {} {}\r\n'
+                     'Content-Type: application/json\r\n'
+                     'Content-Length: {}\r\n'
+                     'Connection: close\r\n\r\n'
+                     .format(status, REASONS.get(status, 'Error'), len(body))
+                     .encode())
+        writer.write(body)
+
+
+def loadRepo(spec) -> PublicRepo:
+    """
+    :param spec: 'module:function' of a function returning a PublicRepo
+    """
+    moduleName, _, funcName = spec.partition(':')
+    return getattr(importlib.import_module(moduleName), funcName)()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Proof verification server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', help='listen on a Unix socket at the path')
+    parser.add_argument('--repo',
+                        help='module:function returning the PublicRepo to '
+                             'get schemas and keys from')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='size of the process pool for the proof math')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='proofs verified at the same time')
+    parser.add_argument('--queue-size', type=int, default=SERVER_QUEUE_SIZE,
+                        help='proofs waiting to be verified before new '
+                             'requests are rejected')
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    repo = loadRepo(args.repo) if args.repo else PublicRepoInMemory()
+    processes = args.processes or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(processes)
+    verifier = Verifier(WalletInMemory('verifier', repo), executor=executor)
+    server = VerificationServer(verifier,
+                                concurrency=args.concurrency or processes,
+                                queueSize=args.queue_size)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start(args.host, args.port, args.unix))
+    logging.info('Verifying proofs at {}'.format(
+        args.unix or '{}:{}'.format(args.host, args.port)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,59 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
 from functools import reduce
+from typing import Sequence, Tuple, List, Dict
 
+from anoncreds.protocol.exceptions import NotFoundError, NonceError
 from anoncreds.protocol.globals import LARGE_NONCE
+from anoncreds.protocol.nonce_registry import NonceRegistry
 from anoncreds.protocol.primary.primary_proof_verifier import \
     PrimaryProofVerifier
+from anoncreds.protocol.proof_validator import ProofValidator
 from anoncreds.protocol.revocation.accumulators.non_revocation_proof_verifier import \
     NonRevocationProofVerifier
-from anoncreds.protocol.types import FullProof, ProofRequest
+from anoncreds.protocol.types import FullProof, ProofRequest, ID, T
 from anoncreds.protocol.utils import get_hash_as_int, isCryptoInteger
+from anoncreds.protocol.verification_cache import VerificationCache
 from anoncreds.protocol.wallet.wallet import Wallet
 from config.config import cmod
 
 
 class Verifier:
-    def __init__(self, wallet: Wallet):
+    def __init__(self, wallet: Wallet, executor: Executor = None,
+                 nonceRegistry: NonceRegistry = None,
+                 cache: VerificationCache = None):
+        """
+        :param executor: an executor (usually a process pool) to evaluate
+        the sub-proofs of a proof in concurrently; sub-proofs are evaluated
+        in the event loop's thread if not given
+        :param nonceRegistry: a registry of issued and used nonces; if
+        given, a proof is accepted only for a nonce generated by this
+        verifier, once and before the nonce expires. The nonce is used up
+        by a proof that verifies only, so an invalid proof sent first
+        doesn't deny the honest prover its nonce
+        :param cache: a cache of verification results; if given, an
+        identical retry of a proof gets the earlier result without the
+        proof being verified again. The nonce is checked first, so a proof
+        that was accepted is not accepted again from the cache
+        """
         self.wallet = wallet
+        self._executor = executor
+        self.nonceRegistry = nonceRegistry
+        self.cache = cache
         self._primaryVerifier = PrimaryProofVerifier(wallet)
         self._nonRevocVerifier = NonRevocationProofVerifier(wallet)
+        self._validator = ProofValidator(wallet)
 
     @property
     def verifierId(self):
         return self.wallet.walletId
 
     def generateNonce(self):
-        return cmod.integer(cmod.randomBits(LARGE_NONCE))
+        nonce = cmod.integer(cmod.randomBits(LARGE_NONCE))
+        if self.nonceRegistry is not None:
+            self.nonceRegistry.issue(nonce)
+        return nonce
 
     async def verify(self, proofRequest: ProofRequest, proof: FullProof):
         """
@@ -32,35 +63,191 @@ class Verifier:
         attributes, predicates, timestamps for non-revocation)
         :param proof: a proof
         :return: True if verified successfully and false otherwise.
+        :raises ProofValidationError: if the proof is malformed or doesn't
+        correspond to the proof request
+        :raises NonceError: if the nonce of the proof request is unknown,
+        expired or already used
+        """
+        result, digest, accumVersions = await self._check(proofRequest, proof)
+        if result is None:
+            result = await self._verify(proofRequest, proof)
+            if self.cache is not None:
+                self.cache.put(digest, accumVersions, result)
+        self._consumeNonce(proofRequest, result)
+        return result
+
+    async def _check(self, proofRequest: ProofRequest, proof: FullProof):
+        """
+        The checks done before any proof math: the nonce, a cached result
+        and the proof structure.
+
+        :return: the cached result or None, the digest of the proof and the
+        versions of the accumulators it is checked against (None without a
+        cache)
         """
+        # the nonce is used up only once the proof verifies
+        if self.nonceRegistry is not None:
+            self.nonceRegistry.check(proofRequest.nonce)
 
-        if proofRequest.verifiableAttributes.keys() != proof.requestedProof.revealed_attrs.keys():
-            raise ValueError('Received attributes ={} do not correspond to requested={}'.format(
-                proof.requestedProof.revealed_attrs.keys(), proofRequest.verifiableAttributes.keys()))
+        digest = accumVersions = None
+        if self.cache is not None:
+            digest = self.cache.digest(proofRequest, proof)
+            accumVersions = await self._accumVersions(proofRequest, proof)
+            result = self.cache.get(digest, accumVersions)
+            if result is not None:
+                return result, digest, accumVersions
 
-        if proofRequest.predicates.keys() != proof.requestedProof.predicates.keys():
-            raise ValueError('Received predicates ={} do not correspond to requested={}'.format(
-                proof.requestedProof.predicates.keys(), proofRequest.predicates.keys()))
+        # reject malformed proofs before any expensive math
+        await self._validator.validate(proofRequest, proof)
+        return None, digest, accumVersions
 
-        TauList = []
+    async def _verify(self, proofRequest: ProofRequest, proof: FullProof,
+                      nonRevocTauLists: Dict[str, Sequence[T]] = None):
+        """
+        :param nonRevocTauLists: tau lists of the non-revocation proofs by
+        sub-proof uuid, if they are already computed
+        """
+        # the sub-proofs are independent of each other; their tau values
+        # are concatenated in the order of proofs
+        cHash = proof.aggregatedProof.cHash
+        TauLists = []
         for (uuid, proofItem) in proof.proofs.items():
             if proofItem.proof.nonRevocProof:
-                TauList += await self._nonRevocVerifier.verifyNonRevocation(
-                    proofRequest, proofItem.schema_seq_no, proof.aggregatedProof.cHash,
-                    proofItem.proof.nonRevocProof)
+                if nonRevocTauLists is not None:
+                    TauLists.append(_completed(nonRevocTauLists[uuid]))
+                else:
+                    TauLists.append(
+                        self._nonRevocVerifier.verifyNonRevocation(
+                            proofRequest, proofItem.schema_seq_no, cHash,
+                            proofItem.proof.nonRevocProof, self._executor))
             if proofItem.proof.primaryProof:
-                TauList += await self._primaryVerifier.verify(proofItem.schema_seq_no,
-                                                              proof.aggregatedProof.cHash,
-                                                              proofItem.proof.primaryProof)
+                TauLists.append(self._primaryVerifier.verify(
+                    proofItem.schema_seq_no, cHash,
+                    proofItem.proof.primaryProof, self._executor))
+        TauList = [tau for TauList in await asyncio.gather(*TauLists)
+                   for tau in TauList]
 
         CHver = self._get_hash(proof.aggregatedProof.CList, self._prepare_collection(TauList),
                                cmod.integer(proofRequest.nonce))
 
         return CHver == proof.aggregatedProof.cHash
 
+    async def verifyBatch(self,
+                          proofs: Sequence[Tuple[ProofRequest, FullProof]]) \
+            -> List[bool]:
+        """
+        Verifies many proofs at once, e.g. a burst of proofs for the same
+        few schemas.
+
+        Fixed-base tables are built once for every public key the proofs
+        refer to and are shared by all of them. The non-revocation proofs
+        of the whole batch are checked together: each accumulator is
+        updated, and its keys and pairings are fetched, once per batch
+        rather than once per proof. Each proof is still checked on its own:
+        its challenge hash covers tau values that are not a part of the
+        proof, so proofs can't be combined into a single randomized check,
+        and a failure always points at a single proof.
+
+        :param proofs: a sequence of (proof request, proof) pairs
+        :return: verification results in the order of proofs; a proof that
+        doesn't correspond to its request is reported as not verified
+        """
+        schemaIds = {proofItem.schema_seq_no
+                     for _, proof in proofs
+                     for proofItem in proof.proofs.values()
+                     if proofItem.proof.primaryProof}
+        for schemaId in schemaIds:
+            try:
+                pk = await self.wallet.getPublicKey(ID(schemaId=schemaId))
+            except NotFoundError:
+                # the validator rejects proofs for unknown schemas
+                continue
+            if not pk.precomputed:
+                pk.precompute()
+
+        results = [None] * len(proofs)
+        pending = []
+        for i, (proofRequest, proof) in enumerate(proofs):
+            try:
+                result, digest, accumVersions = \
+                    await self._check(proofRequest, proof)
+            except ValueError as ex:
+                logging.debug("Proof {} is rejected: {}".format(
+                    proofRequest.name, ex))
+                result = False
+            if result is None:
+                pending.append((i, digest, accumVersions))
+            results[i] = result
+
+        nonRevocItems = [(i, uuid, (proofs[i][0], proofItem.schema_seq_no,
+                                    proofs[i][1].aggregatedProof.cHash,
+                                    proofItem.proof.nonRevocProof))
+                         for i, _, _ in pending
+                         for uuid, proofItem in proofs[i][1].proofs.items()
+                         if proofItem.proof.nonRevocProof]
+        nonRevocTauLists = {i: {} for i, _, _ in pending}
+        computed = await self._nonRevocVerifier.verifyNonRevocationBatch(
+            [item for _, _, item in nonRevocItems], self._executor)
+        for (i, uuid, _), tauList in zip(nonRevocItems, computed):
+            nonRevocTauLists[i][uuid] = tauList
+
+        for i, digest, accumVersions in pending:
+            proofRequest, proof = proofs[i]
+            failed = [ex for ex in nonRevocTauLists[i].values()
+                      if isinstance(ex, Exception)]
+            if failed:
+                # e.g. a revoked claim or an accumulator that couldn't be
+                # fetched; the other proofs of the batch are not affected
+                logging.debug("Proof {} is rejected: {}".format(
+                    proofRequest.name, failed[0]))
+                results[i] = False
+                continue
+            try:
+                results[i] = await self._verify(proofRequest, proof,
+                                                nonRevocTauLists[i])
+            except ValueError as ex:
+                logging.debug("Proof {} is rejected: {}".format(
+                    proofRequest.name, ex))
+                results[i] = False
+                continue
+            if self.cache is not None:
+                self.cache.put(digest, accumVersions, results[i])
+
+        for i, (proofRequest, _) in enumerate(proofs):
+            try:
+                self._consumeNonce(proofRequest, results[i])
+            except NonceError as ex:
+                # the same nonce is used by another proof of the batch
+                logging.debug("Proof {} is rejected: {}".format(
+                    proofRequest.name, ex))
+                results[i] = False
+        return results
+
+    def _consumeNonce(self, proofRequest: ProofRequest, result):
+        if result and self.nonceRegistry is not None:
+            self.nonceRegistry.consume(proofRequest.nonce)
+
+    async def _accumVersions(self, proofRequest: ProofRequest,
+                             proof: FullProof):
+        versions = {}
+        for proofItem in proof.proofs.values():
+            if proofItem.proof.nonRevocProof:
+                try:
+                    accum = await self._nonRevocVerifier.getAccumulator(
+                        proofRequest, proofItem.schema_seq_no)
+                except NotFoundError:
+                    # the validator rejects proofs for unknown schemas
+                    continue
+                versions[proofItem.schema_seq_no] = accum.version
+        return versions
+
     def _prepare_collection(self, values):
         return [cmod.toInt(el) if isCryptoInteger(el) else el for el in values]
 
     def _get_hash(self, CList, TauList, nonce):
         return get_hash_as_int(nonce,
                                *reduce(lambda x, y: x + y, [TauList, CList]))
+
+
+async def _completed(value):
+    return value
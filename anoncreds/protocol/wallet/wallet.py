@@ -1,3 +1,4 @@
+import asyncio
 from abc import abstractmethod
 from typing import Any, Dict, Sequence, Iterable
 
@@ -73,6 +74,9 @@ class WalletInMemory(Wallet):
         self._accumPks = {}
         self._tails = {}
 
+        # repo requests in progress, shared by concurrent callers
+        self._fetching = {}
+
     # GET
 
     async def getSchema(self, schemaId: ID) -> Schema:
@@ -81,7 +85,8 @@ class WalletInMemory(Wallet):
         if schemaId.schemaId and schemaId.schemaId in self._schemasById:
             return self._schemasById[schemaId.schemaId]
 
-        schema = await self._repo.getSchema(schemaId)
+        schema = await self._fetchOnce(('schema', schemaId),
+                                       self._repo.getSchema, schemaId)
 
         self._cacheSchema(schema)
 
@@ -118,8 +123,16 @@ class WalletInMemory(Wallet):
 
     async def shouldUpdateAccumulator(self, schemaId: ID, ts=None,
                                       seqNo=None):
-        # TODO
-        return True
+        schema = await self.getSchema(schemaId)
+        accum = self._accums.get(schema.getKey())
+        if accum is None or ts is not None or seqNo is not None:
+            # no copy to compare or a past state of the accumulator is asked
+            # for
+            return True
+        schemaId = schemaId._replace(schemaKey=schema.getKey(),
+                                     schemaId=schema.seqId)
+        return accum.version != await self._repo.getAccumulatorVersion(
+            schemaId)
 
     # HELPER
 
@@ -135,7 +148,8 @@ class WalletInMemory(Wallet):
         elif getFromRepo:
             schemaId = schemaId._replace(schemaKey=schemaKey,
                                          schemaId=schema.seqId)
-            value = await getFromRepo(schemaId)
+            value = await self._fetchOnce((id(dictionary), schemaKey),
+                                          getFromRepo, schemaId)
             dictionary[schemaKey] = value
             return value
 
@@ -144,6 +158,15 @@ class WalletInMemory(Wallet):
                 'No value for schema with ID={} and key={}'.format(
                     schemaId.schemaId, schemaId.schemaKey))
 
+    async def _fetchOnce(self, key, fetch, *args):
+        # concurrent requests for the same value wait for a single fetch
+        future = self._fetching.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch(*args))
+            self._fetching[key] = future
+            future.add_done_callback(lambda _: self._fetching.pop(key, None))
+        return await asyncio.shield(future)
+
     async def _cacheValueForId(self, dictionary: Dict[SchemaKey, Any],
                                schemaId: ID, value: Any):
         schema = await self.getSchema(schemaId)
@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+
+from anoncreds.protocol.bitset import BitSet
+
+
+def testBitSetIsASet():
+    bits = BitSet({1, 5, 200})
+    assert bits == {1, 5, 200}
+    assert len(bits) == 3
+    assert sorted(bits) == [1, 5, 200]
+    assert 5 in bits
+    assert 6 not in bits
+    assert -1 not in bits
+
+    bits.add(7)
+    bits.discard(5)
+    bits.discard(99)
+    assert bits == {1, 7, 200}
+    assert bits.copy() == bits
+    assert not BitSet()
+
+
+def testBitSetOperations():
+    bits = BitSet({1, 5, 200})
+    other = {5, 7}
+    assert bits | other == {1, 5, 7, 200}
+    assert bits & other == {5}
+    assert bits - other == {1, 200}
+    assert other - bits == {7}
+    assert bits ^ other == {1, 7, 200}
+    assert BitSet({1}) < bits
+    assert not bits < bits
+    assert bits >= {1, 200}
+
+
+def testBitSetChanges():
+    old = BitSet({1, 2, 3})
+    added, removed = old.changes({2, 3, 4})
+    assert added == {4}
+    assert removed == {1}
+
+
+def testBitSetRejectsNegative():
+    with pytest.raises(ValueError):
+        BitSet().add(-1)
+
+
+def testBitSetRejectsForeignOperands():
+    bits = BitSet({1})
+    for op in ('__ior__', '__iand__', '__isub__', '__ixor__', '__or__',
+               '__eq__'):
+        assert getattr(bits, op)(5) is NotImplemented
+    with pytest.raises(TypeError):
+        bits |= 5
+    assert bits != 'a'
+    assert bits == {1}
+
+
+def testBitSetSerialization():
+    bits = BitSet({0, 9, 1000})
+    assert BitSet.fromBytes(bits.toBytes()) == bits
+    assert pickle.loads(pickle.dumps(bits)) == bits
+    assert pickle.loads(pickle.dumps(BitSet())) == BitSet()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testAccumulatorMembersInBitSet(issuerGvt, schemaGvtId,
+                                         claimsProver1Gvt):
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    assert isinstance(accum.V, BitSet)
+    assert accum.V == {1}
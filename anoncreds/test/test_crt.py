@@ -0,0 +1,44 @@
+import pytest
+
+from anoncreds.protocol.primary.primary_crt import CRTEngine
+from anoncreds.protocol.types import SecretKey
+from anoncreds.protocol.utils import randomQR
+from anoncreds.test.conftest import primes
+from config.config import cmod
+
+
+@pytest.fixture(scope="module")
+def crt():
+    pPrime, qPrime = primes.get("prime1")
+    return CRTEngine(pPrime, qPrime)
+
+
+def testCRTPowMatchesDirectPow(crt):
+    N = cmod.integer(crt.n)
+    S = randomQR(N)
+    exp = cmod.integer(cmod.randomBits(2724))
+    assert crt.pow(S, exp) == (S ** exp) % N
+
+
+def testCRTPowProductMatchesDirectProduct(crt):
+    N = cmod.integer(crt.n)
+    pairs = [(randomQR(N), cmod.randomBits(592)) for _ in range(5)]
+    expected = 1 % N
+    for base, exp in pairs:
+        expected = expected * (base ** exp) % N
+    assert crt.powProduct(pairs) == expected
+
+
+def testCRTRoot(crt):
+    N = cmod.integer(crt.n)
+    Q = randomQR(N)
+    e = cmod.randomPrime(597)
+    A = crt.root(Q, e)
+    assert A ** e % N == Q
+
+
+def testCRTMatchesSecretKey(crt):
+    pPrime, qPrime = primes.get("prime1")
+    assert crt.matches(SecretKey(pPrime, qPrime))
+    pPrime, qPrime = primes.get("prime2")
+    assert not crt.matches(SecretKey(pPrime, qPrime))
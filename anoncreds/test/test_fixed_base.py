@@ -0,0 +1,87 @@
+import pytest
+
+from anoncreds.protocol.types import ProofRequest, PredicateGE, \
+    AttributeInfo
+from anoncreds.protocol.utils import FixedBaseTable, fixedBaseProduct, \
+    powProduct, randomQR
+from anoncreds.test.conftest import presentProofAndVerify, primes
+from config.config import cmod
+
+
+@pytest.fixture(scope="module")
+def N():
+    pPrime, qPrime = primes.get("prime1")
+    return cmod.integer((2 * pPrime + 1) * (2 * qPrime + 1))
+
+
+def testFixedBaseTablePow(N):
+    g = randomQR(N)
+    table = FixedBaseTable(g, N, 64)
+    for bits in (1, 64, 592, 3060):
+        exp = cmod.integer(cmod.randomBits(bits))
+        assert table.pow(exp) == g ** exp
+    assert table.bits >= 3060
+    assert table.pow(0) == 1 % N
+
+
+def testFixedBaseTableNegativePow(N):
+    g = randomQR(N)
+    exp = -1 * cmod.integer(cmod.randomBits(256))
+    assert FixedBaseTable(g, N).pow(exp) == g ** exp
+
+
+def testFixedBaseProduct(N):
+    bases = [randomQR(N) for _ in range(5)]
+    exps = [cmod.integer(cmod.randomBits(592)) for _ in bases]
+    exps[0] = -1 * exps[0]
+    expected = 1 % N
+    for g, e in zip(bases, exps):
+        expected = expected * (g ** e) % N
+    tables = [FixedBaseTable(g, N) for g in bases]
+    assert fixedBaseProduct(list(zip(tables, exps)), N) == expected
+
+
+def testFixedBaseProductRejectsMixedWindows(N):
+    g = randomQR(N)
+    with pytest.raises(ValueError):
+        fixedBaseProduct([(FixedBaseTable(g, N, window=4), 5),
+                          (FixedBaseTable(g, N, window=5), 5)], N)
+
+
+def testPowProductMixesTablesAndPlainBases(N):
+    g, h = randomQR(N), randomQR(N)
+    e1 = cmod.integer(cmod.randomBits(592))
+    e2 = cmod.integer(cmod.randomBits(592))
+    assert powProduct([(FixedBaseTable(g, N), e1), (h, e2)], N) == \
+        (g ** e1) * (h ** e2) % N
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testPublicKeyPrecompute(keysGvt, issuerGvt, schemaGvtId):
+    pk = await issuerGvt.wallet.getPublicKey(schemaGvtId)
+    assert not pk.precomputed
+    assert pk.bases().S == pk.S
+
+    pk.precompute()
+    assert pk.precomputed
+    bases = pk.bases()
+    assert bases.S.base == pk.S
+    assert bases.Rctxt.base == pk.Rctxt
+    assert {k: t.base for k, t in bases.R.items()} == dict(pk.R)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithPrecomputedKeys(prover1, verifier, claimsProver1Gvt,
+                                       schemaGvtId):
+    for wallet in (prover1.wallet, verifier.wallet):
+        pk = await wallet.getPublicKey(schemaGvtId)
+        pk.precompute()
+
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={
+                                    'uuid2': PredicateGE('age', 18)})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
@@ -0,0 +1,158 @@
+import asyncio
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from anoncreds.protocol.types import ProofRequest, PredicateGE, \
+    AttributeInfo
+from anoncreds.test.conftest import presentProofAndVerify
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ProcessPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testPublicKeyPicklesWithoutTables(issuerGvt, keysGvt, schemaGvtId):
+    pk = await issuerGvt.wallet.getPublicKey(schemaGvtId)
+    pk.precompute()
+    restored = pickle.loads(pickle.dumps(pk))
+    assert restored == pk
+    assert not restored.precomputed
+
+
+def _proofRequest(verifier):
+    return ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                        verifiableAttributes={
+                            'uuid1': AttributeInfo(name='name')},
+                        predicates={'uuid2': PredicateGE('age', 18)})
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testIssueClaimsBatch(issuerGvt, schemaGvtId, keysGvt,
+                               issueAccumulatorGvt, attrsProver1Gvt,
+                               attrsProver2Gvt, prover1, prover2, verifier,
+                               executor):
+    provers = [prover1, prover2]
+    requests = [(schemaGvtId,
+                 await prover.createClaimRequest(schemaGvtId,
+                                                 reqNonRevoc=False))
+                for prover in provers]
+
+    issued = await issuerGvt.issueClaimsBatch(requests, executor)
+    assert len(issued) == 2
+    assert issued[0][1]['name'].raw == 'Alex'
+    assert issued[1][1]['name'].raw == 'Jason'
+
+    for prover, (signature, claimAttributes) in zip(provers, issued):
+        await prover.processClaim(schemaGvtId, claimAttributes, signature)
+        assert await presentProofAndVerify(verifier, _proofRequest(verifier),
+                                           prover)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testIssueClaimsBatchWithNonRevocation(issuerGvt, schemaGvtId,
+                                                keysGvt, issueAccumulatorGvt,
+                                                attrsProver1Gvt,
+                                                attrsProver2Gvt, prover1,
+                                                prover2, verifier, executor):
+    requests = [(schemaGvtId, await prover.createClaimRequest(schemaGvtId))
+                for prover in (prover1, prover2)]
+
+    issued = await issuerGvt.issueClaimsBatch(requests, executor)
+
+    # accumulator indexes are assigned in the order of requests
+    assert [signature.nonRevocClaim.i for signature, _ in issued] == [1, 2]
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    assert accum.V == {1, 2}
+
+    signature, claimAttributes = issued[1]
+    await prover2.processClaim(schemaGvtId, claimAttributes, signature)
+    assert await presentProofAndVerify(verifier, _proofRequest(verifier),
+                                       prover2)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testIssueClaimsBatchWithoutExecutor(issuerGvt, schemaGvtId,
+                                              keysGvt, issueAccumulatorGvt,
+                                              attrsProver1Gvt, prover1):
+    request = await prover1.createClaimRequest(schemaGvtId, reqNonRevoc=False)
+    [(signature, _)] = await issuerGvt.issueClaimsBatch(
+        [(schemaGvtId, request)])
+    assert signature.primaryClaim
+    assert not signature.nonRevocClaim
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testConcurrentIssueClaimSameSchema(issuerGvt, schemaGvtId, keysGvt,
+                                             issueAccumulatorGvt,
+                                             attrsProver1Gvt, attrsProver2Gvt,
+                                             prover1, prover2, verifier):
+    provers = [prover1, prover2]
+    requests = [await prover.createClaimRequest(schemaGvtId)
+                for prover in provers]
+    # issuance neither reads nor writes a shared context attribute
+    await issuerGvt.wallet.submitContextAttr(schemaGvtId, 12345)
+
+    issued = await asyncio.gather(*[issuerGvt.issueClaim(schemaGvtId, r)
+                                    for r in requests])
+
+    # every claim carries the context of its own request
+    for prover, (signature, _) in zip(provers, issued):
+        assert signature.primaryClaim.m2 == \
+            issuerGvt._genContxt(None, prover.proverId).m2
+        assert str(signature.nonRevocClaim.m2) == \
+            str(int(signature.primaryClaim.m2))
+    assert {s.nonRevocClaim.i for s, _ in issued} == {1, 2}
+    assert await issuerGvt.wallet.getContextAttr(schemaGvtId) == 12345
+
+    # the last issued claim sees the current accumulator
+    last = max(range(2), key=lambda k: issued[k][0].nonRevocClaim.i)
+    signature, claimAttributes = issued[last]
+    await provers[last].processClaim(schemaGvtId, claimAttributes, signature)
+    assert await presentProofAndVerify(verifier, _proofRequest(verifier),
+                                       provers[last])
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testFailedIssueClaimsBatchKeepsAccumulator(issuerGvt, schemaGvtId,
+                                                     keysGvt,
+                                                     issueAccumulatorGvt,
+                                                     attrsProver1Gvt,
+                                                     attrsProver2Gvt,
+                                                     prover1, prover2,
+                                                     executor, monkeypatch):
+    requests = [(schemaGvtId, await prover.createClaimRequest(schemaGvtId))
+                for prover in (prover1, prover2)]
+    # the wallet gives out the accumulator it updates in place
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    accBefore, VBefore, epochBefore = accum.acc, set(accum.V), accum.epoch
+
+    issuePrimaryClaim = issuerGvt._issuePrimaryClaim
+    calls = []
+
+    async def failSecond(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise ValueError('Signing failed')
+        return await issuePrimaryClaim(*args)
+
+    monkeypatch.setattr(issuerGvt, '_issuePrimaryClaim', failSecond)
+    with pytest.raises(ValueError):
+        await issuerGvt.issueClaimsBatch(requests, executor)
+
+    # no accumulator index was given out for the failed batch
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    assert accum.acc == accBefore
+    assert set(accum.V) == VBefore
+    assert accum.epoch == epochBefore
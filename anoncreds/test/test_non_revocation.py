@@ -1,8 +1,10 @@
 import pytest
 
-from anoncreds.protocol.types import ProofRequest, ID, AttributeInfo
-from anoncreds.protocol.utils import groupIdentityG1
+from anoncreds.protocol.types import ProofRequest, ID, AttributeInfo, \
+    NonRevocationClaim
+from anoncreds.protocol.utils import groupIdentityG1, groupIdentityG2
 from anoncreds.test.conftest import presentProofAndVerify
+from config.config import cmod
 
 
 @pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
@@ -14,14 +16,15 @@ async def testIssueRevocationCredential(claimsProver1Gvt, issuerGvt,
     tails = await issuerGvt.wallet.getTails(schemaGvtId)
     assert nonRevocClaimGvtProver1
     assert nonRevocClaimGvtProver1.witness
-    assert nonRevocClaimGvtProver1.witness.V
+    assert nonRevocClaimGvtProver1.witness.epoch
     assert nonRevocClaimGvtProver1.i == 1
     assert nonRevocClaimGvtProver1.witness.gi == tails.g[1]
 
     assert acc.V
     assert acc.acc != 1
 
-    assert nonRevocClaimGvtProver1.witness.V == acc.V
+    assert nonRevocClaimGvtProver1.witness.epoch == acc.epoch
+    assert acc.membersAt(nonRevocClaimGvtProver1.witness.epoch) == acc.V
 
 
 @pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
@@ -46,7 +49,7 @@ async def testUpdateWitnessNotChangedIfInSync(claimsProver1Gvt, schemaGvt,
     c2 = await prover1._nonRevocProofBuilder.updateNonRevocationClaim(
         schemaGvt.seqId,
         nonRevocClaimGvtProver1)
-    assert c2.witness.V == acc.V
+    assert c2.witness.epoch == acc.epoch
     assert oldOmega == c2.witness.omega
 
 
@@ -58,15 +61,15 @@ async def testUpdateWitnessChangedIfOutOfSync(claimsProver1Gvt, issuerGvt,
     acc = await issuerGvt.wallet.getAccumulator(ID(schemaId=schemaGvt.seqId))
 
     # not in sync
-    acc.V.add(3)
-    assert nonRevocClaimGvtProver1.witness.V != acc.V
+    acc.add(3)
+    assert nonRevocClaimGvtProver1.witness.epoch != acc.epoch
 
     # witness is updated
     oldOmega = nonRevocClaimGvtProver1.witness.omega
     c2 = await prover1._nonRevocProofBuilder.updateNonRevocationClaim(
         schemaGvt.seqId,
         nonRevocClaimGvtProver1)
-    assert c2.witness.V == acc.V
+    assert c2.witness.epoch == acc.epoch
     assert oldOmega != c2.witness.omega
 
 
@@ -130,3 +133,150 @@ async def testRevocedWithoutUpdateWitness(schemaGvtId, issuerGvt, prover1,
     await issuerGvt.revoke(schemaGvtId, 1)
 
     return await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRevocationPublicKeyPairings(schemaGvtId, issuerGvt, prover1,
+                                          verifier, claimsProver1Gvt):
+    pkR = await verifier.wallet.getPublicKeyRevocation(schemaGvtId)
+    pairings = pkR.pairings()
+    assert pairings is pkR.pairings()
+    assert pairings.htildeHhat == cmod.pair(pkR.htilde, pkR.hhat)
+    assert pairings.gInvHhat == cmod.pair(1 / pkR.g, pkR.hhat)
+    assert pairings.gGprime == cmod.pair(pkR.g, pkR.gprime)
+
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={'attr_uuid': AttributeInfo(name='name')})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testAccumulatorPairingsCachedUntilUpdate(schemaGvtId, issuerGvt,
+                                                   prover1, prover2, verifier,
+                                                   claimsProver1Gvt,
+                                                   claimsProver2Gvt):
+    nonRevocVerifier = verifier._nonRevocVerifier
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={'attr_uuid': AttributeInfo(name='name')})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+    [(iA, version, accumPairings)] = nonRevocVerifier._accumPairings.values()
+
+    assert await presentProofAndVerify(verifier, proofRequest, prover2)
+    [cached] = nonRevocVerifier._accumPairings.values()
+    assert cached[2] is accumPairings
+
+    await issuerGvt.revoke(schemaGvtId, 1)
+    accum = await verifier.wallet.getAccumulator(schemaGvtId)
+    assert await presentProofAndVerify(verifier, proofRequest, prover2)
+    [cached] = nonRevocVerifier._accumPairings.values()
+    assert cached[:2] == (iA, accum.version) != (iA, version)
+    assert cached[2].htildeAcc != accumPairings.htildeAcc
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testUpdateWitnessAfterIssueAndRevoke(claimsProver1Gvt,
+                                               claimsProver2Gvt, issuerGvt,
+                                               schemaGvt, schemaGvtId,
+                                               prover1, prover2):
+    builder = prover1._nonRevocProofBuilder
+    c2 = await builder.updateNonRevocationClaim(
+        schemaGvt.seqId, claimsProver1Gvt.nonRevocClaim)
+    accum = await prover1.wallet.getAccumulator(schemaGvtId)
+    assert accum.membersAt(c2.witness.epoch) == {1, 2}
+
+    # one claim is revoked and another one is issued since the update
+    await issuerGvt.revoke(schemaGvtId, 2)
+    claimRequest = await prover2.createClaimRequest(schemaGvtId)
+    await issuerGvt.issueClaim(schemaGvtId, claimRequest)
+
+    c2 = await builder.updateNonRevocationClaim(schemaGvt.seqId, c2)
+    assert c2.witness.epoch == accum.epoch
+    assert accum.membersAt(c2.witness.epoch) == {1, 3}
+
+    pkR = await prover1.wallet.getPublicKeyRevocation(schemaGvtId)
+    accumPk = await prover1.wallet.getPublicKeyAccumulator(schemaGvtId)
+    assert cmod.pair(c2.witness.gi, accum.acc) / \
+        cmod.pair(pkR.g, c2.witness.omega) == accumPk.z
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testOmegaAtIssuance(claimsProver1Gvt, claimsProver2Gvt, issuerGvt,
+                              schemaGvtId):
+    tails = await issuerGvt.wallet.getTails(schemaGvtId)
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    L = accum.L
+
+    assert claimsProver1Gvt.nonRevocClaim.witness.omega == groupIdentityG2()
+    # claim 2 is issued into an accumulator holding claim 1
+    assert claimsProver2Gvt.nonRevocClaim.witness.omega == \
+        tails.gprime[L + 1 - 1 + 2]
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testUpdateWitnessStoredWithClaims(claimsProver1Gvt,
+                                            claimsProver2Gvt, schemaGvt,
+                                            schemaGvtId, prover1):
+    # a claim stored before witnesses kept an accumulator epoch
+    data = claimsProver1Gvt.nonRevocClaim.toStrDict()
+    del data['witness']['epoch']
+    data['witness']['V'] = {'Int_1'}
+    c2 = NonRevocationClaim.fromStrDict(data)
+    assert c2.witness.epoch == {1}
+
+    c2 = await prover1._nonRevocProofBuilder.updateNonRevocationClaim(
+        schemaGvt.seqId, c2)
+    accum = await prover1.wallet.getAccumulator(schemaGvtId)
+    assert c2.witness.epoch == accum.epoch
+
+    pkR = await prover1.wallet.getPublicKeyRevocation(schemaGvtId)
+    accumPk = await prover1.wallet.getPublicKeyAccumulator(schemaGvtId)
+    assert cmod.pair(c2.witness.gi, accum.acc) / \
+        cmod.pair(pkR.g, c2.witness.omega) == accumPk.z
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testUpdateWitnessFromOlderAccumulator(claimsProver1Gvt, schemaGvt,
+                                                prover1):
+    c2 = claimsProver1Gvt.nonRevocClaim
+    c2 = c2._replace(witness=c2.witness._replace(epoch=c2.witness.epoch + 1))
+    with pytest.raises(ValueError):
+        await prover1._nonRevocProofBuilder.updateNonRevocationClaim(
+            schemaGvt.seqId, c2)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testUpdateWitnessAcrossTrimmedLog(claimsProver1Gvt,
+                                            claimsProver2Gvt, issuerGvt,
+                                            schemaGvt, schemaGvtId,
+                                            prover1, prover2, verifier):
+    c2 = claimsProver1Gvt.nonRevocClaim
+    accum = await issuerGvt.wallet.getAccumulator(schemaGvtId)
+    accum.maxChanges = 1
+
+    # the changes since the witness of claim 1 are dropped from the log
+    await issuerGvt.revoke(schemaGvtId, 2)
+    claimRequest = await prover2.createClaimRequest(schemaGvtId)
+    await issuerGvt.issueClaim(schemaGvtId, claimRequest)
+    accum = await prover1.wallet.getAccumulator(schemaGvtId)
+    assert c2.witness.epoch < accum.firstEpoch
+
+    c2 = await prover1._nonRevocProofBuilder.updateNonRevocationClaim(
+        schemaGvt.seqId, c2)
+    assert c2.witness.epoch == accum.epoch
+
+    pkR = await prover1.wallet.getPublicKeyRevocation(schemaGvtId)
+    accumPk = await prover1.wallet.getPublicKeyAccumulator(schemaGvtId)
+    assert cmod.pair(c2.witness.gi, accum.acc) / \
+        cmod.pair(pkR.g, c2.witness.omega) == accumPk.z
+
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'attr_uuid': AttributeInfo(name='name')})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
@@ -0,0 +1,133 @@
+import pytest
+
+from anoncreds.protocol.exceptions import NonceError
+from anoncreds.protocol.nonce_registry import NonceRegistry, BloomFilter
+from anoncreds.protocol.types import ProofRequest, AttributeInfo
+from anoncreds.protocol.verifier import Verifier
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="function")
+def registry(clock):
+    return NonceRegistry(window=40, generations=4, capacity=1000,
+                         errorRate=1e-6, clock=clock)
+
+
+def testBloomFilter():
+    bloom = BloomFilter(1000, 1e-6)
+    for i in range(1000):
+        bloom.add(i)
+    assert all(i in bloom for i in range(1000))
+    assert sum(i in bloom for i in range(1000, 101000)) < 5
+
+
+def testConsumeIssuedNonce(registry):
+    registry.issue(1)
+    registry.consume(1)
+
+
+def testCheckDoesNotConsumeNonce(registry):
+    registry.issue(1)
+    registry.check(1)
+    registry.consume(1)
+    with pytest.raises(NonceError):
+        registry.check(1)
+
+
+def testRejectUnknownNonce(registry):
+    registry.issue(1)
+    with pytest.raises(NonceError):
+        registry.consume(2)
+
+
+def testRejectReusedNonce(registry):
+    registry.issue(1)
+    registry.consume(1)
+    with pytest.raises(NonceError):
+        registry.consume(1)
+
+
+def testRejectExpiredNonce(registry, clock):
+    registry.issue(1)
+    registry.issue(2)
+    clock.now = 25
+    registry.consume(1)
+    clock.now = 45
+    with pytest.raises(NonceError):
+        registry.consume(2)
+
+
+def testRejectReusedNonceUntilExpired(registry, clock):
+    registry.issue(1)
+    clock.now = 35
+    registry.consume(1)
+    with pytest.raises(NonceError):
+        registry.consume(1)
+    clock.now = 100
+    with pytest.raises(NonceError):
+        registry.consume(1)
+
+
+def testRotateOnCapacity(registry):
+    # a generation holds 250 nonces, the first 250 are dropped
+    for nonce in range(1250):
+        registry.issue(nonce)
+    registry.consume(1249)
+    registry.consume(250)
+    with pytest.raises(NonceError):
+        registry.consume(0)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifierRejectsReplayedProof(prover1, claimsProver1Gvt,
+                                           verifier, clock):
+    verifier = Verifier(verifier.wallet,
+                        nonceRegistry=NonceRegistry(clock=clock))
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    proof = await prover1.presentProof(proofRequest)
+
+    assert await verifier.verify(proofRequest, proof)
+    with pytest.raises(NonceError):
+        await verifier.verify(proofRequest, proof)
+
+    otherRequest = ProofRequest("proof1", "1.0", 1234,
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    with pytest.raises(NonceError):
+        await verifier.verify(otherRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testInvalidProofDoesNotUseNonce(prover1, claimsProver1Gvt,
+                                          verifier, clock):
+    verifier = Verifier(verifier.wallet,
+                        nonceRegistry=NonceRegistry(clock=clock))
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    otherRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+
+    # a proof for another nonce is sent for the request first
+    junk = await prover1.presentProof(otherRequest)
+    assert not await verifier.verify(proofRequest, junk)
+
+    proof = await prover1.presentProof(proofRequest)
+    assert await verifier.verify(proofRequest, proof)
@@ -0,0 +1,227 @@
+import time
+
+import pytest
+
+from anoncreds.protocol.globals import LARGE_E_START, LARGE_E_END_RANGE
+from anoncreds.protocol.issuer import Issuer
+from anoncreds.protocol.prover import Prover
+from anoncreds.protocol.primary.primary_claim_issuer import \
+    OfflineSignaturePool
+from anoncreds.protocol.primary.primary_crt import CRTEngine
+from anoncreds.protocol.primes import EPrimePool
+from anoncreds.protocol.utils import randomQR
+from anoncreds.test.conftest import primes, presentProofAndVerify
+from anoncreds.protocol.types import ProofRequest, AttributeInfo, PredicateGE
+from config.config import cmod
+
+
+def testOfflineSignaturePoolValues():
+    crt = CRTEngine(*primes.get("prime1"))
+    N = cmod.integer(crt.n)
+    S = randomQR(N)
+    ePrimes = EPrimePool(autoStart=False)
+    pool = OfflineSignaturePool(crt, S, ePrimes, size=3)
+    pool.fill()
+    assert len(pool) == 3
+
+    es = set()
+    for _ in range(4):
+        v, Sv, e = pool.pop()
+        assert Sv == S ** v
+        assert cmod.isPrime(e)
+        assert 2 ** LARGE_E_START <= e <= \
+            2 ** LARGE_E_START + 2 ** LARGE_E_END_RANGE
+        assert ePrimes.isUsed(e)
+        es.add(e)
+    assert len(es) == 4
+    pool.stop()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testIssuanceConsumesOfflineSignaturePool(issuerGvt, schemaGvtId,
+                                                   keysGvt,
+                                                   issueAccumulatorGvt,
+                                                   attrsProver1Gvt, prover1,
+                                                   verifier):
+    issuerGvt = Issuer(issuerGvt.wallet, issuerGvt._attrRepo,
+                       offlinePoolSize=2)
+    primaryIssuer = issuerGvt._primaryIssuer
+    pk = await issuerGvt.wallet.getPublicKey(schemaGvtId)
+    sk = await issuerGvt.wallet.getSecretKey(schemaGvtId)
+    crt = await primaryIssuer._getCRTEngine(schemaGvtId, sk)
+    pool = await primaryIssuer._getOfflinePool(schemaGvtId, crt, pk)
+    pool.stop()
+    pool.autoStart = False
+    pool.fill(2)
+    queued = list(pool._queue.queue)
+
+    request = await prover1.createClaimRequest(schemaGvtId)
+    signature, claimAttributes = await issuerGvt.issueClaim(schemaGvtId,
+                                                            request)
+    assert (signature.primaryClaim.v, signature.primaryClaim.e) == \
+        (queued[0].vprimeprime, queued[0].e)
+    assert len(pool) == 1
+
+    await prover1.processClaim(schemaGvtId, claimAttributes, signature)
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testOfflineSignaturePoolOfSizeZero(issuerGvt, schemaGvtId,
+                                             keysGvt):
+    issuerGvt = Issuer(issuerGvt.wallet, issuerGvt._attrRepo,
+                       offlinePoolSize=0)
+    primaryIssuer = issuerGvt._primaryIssuer
+    pk = await issuerGvt.wallet.getPublicKey(schemaGvtId)
+    sk = await issuerGvt.wallet.getSecretKey(schemaGvtId)
+    crt = await primaryIssuer._getCRTEngine(schemaGvtId, sk)
+    pool = await primaryIssuer._getOfflinePool(schemaGvtId, crt, pk)
+    v, Sv, e = pool.pop()
+    assert Sv == pk.S ** v
+    assert pool._thread is None
+
+
+def _waitFor(condition, timeout=60):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testIssuanceWithBackgroundPools(issuerGvt, schemaGvtId, keysGvt,
+                                          issueAccumulatorGvt,
+                                          attrsProver1Gvt, prover1,
+                                          verifier):
+    issuerGvt = Issuer(issuerGvt.wallet, issuerGvt._attrRepo)
+    primaryIssuer = issuerGvt._primaryIssuer
+    pk = await issuerGvt.wallet.getPublicKey(schemaGvtId)
+    sk = await issuerGvt.wallet.getSecretKey(schemaGvtId)
+    crt = await primaryIssuer._getCRTEngine(schemaGvtId, sk)
+    pool = await primaryIssuer._getOfflinePool(schemaGvtId, crt, pk)
+
+    # the pools are on by default and filled by a worker process
+    pool.start()
+    _waitFor(lambda: len(pool) >= 2)
+    queued = list(pool._queue.queue)
+    for v, Sv, e in queued:
+        assert Sv == pk.S ** v
+
+    issued = []
+    for _ in range(3):
+        request = await prover1.createClaimRequest(schemaGvtId)
+        issued.append(await issuerGvt.issueClaim(schemaGvtId, request))
+    pool.stop()
+
+    # every precomputed value is used by one claim at most
+    es = [signature.primaryClaim.e for signature, _ in issued]
+    vs = [signature.primaryClaim.v for signature, _ in issued]
+    assert len(set(es)) == len(set(vs)) == 3
+    assert (vs[0], es[0]) == (queued[0].vprimeprime, queued[0].e)
+    assert all(primaryIssuer._ePrimePool.isUsed(e) for e in es)
+    assert not {value.e for value in pool._queue.queue} & set(es)
+
+    signature, claimAttributes = issued[-1]
+    await prover1.processClaim(schemaGvtId, claimAttributes, signature)
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+
+
+async def _commitmentPools(prover, schemaId):
+    builder = prover._primaryProofBuilder
+    schemaKey = (await prover.wallet.getSchema(schemaId)).getKey()
+    return builder._eqPools[schemaKey], builder._gePools[schemaKey]
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofConsumesCommitmentPools(prover1, verifier,
+                                           claimsProver1Gvt, schemaGvtId):
+    prover1 = Prover(prover1.wallet, commitmentPoolSize=2)
+    c1 = (await prover1.wallet.getClaimSignature(schemaGvtId)).primaryClaim
+    await prover1._primaryProofBuilder.precomputeCommitments(schemaGvtId, c1)
+    eqPool, gePool = await _commitmentPools(prover1, schemaGvtId)
+    assert eqPool.claim == c1
+    for pool in (eqPool, gePool):
+        pool.stop()
+        pool.autoStart = False
+        pool._queue.queue.clear()
+        pool.fill(2)
+    queuedEq = list(eqPool._queue.queue)
+
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+    assert len(eqPool) == 1
+    assert len(gePool) == 1
+
+    # every commitment is used at most once
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    proof = await prover1.presentProof(proofRequest)
+    assert len(eqPool) == 0
+    [proofInfo] = proof.proofs.values()
+    eqProof = proofInfo.proof.primaryProof.eqProof
+    assert eqProof.Aprime != queuedEq[0].Aprime
+    assert eqProof.Aprime == queuedEq[1].Aprime
+    assert await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithoutCommitmentPools(prover1, verifier,
+                                          claimsProver1Gvt, schemaGvtId):
+    prover1 = Prover(prover1.wallet, commitmentPoolSize=0)
+    c1 = (await prover1.wallet.getClaimSignature(schemaGvtId)).primaryClaim
+    await prover1._primaryProofBuilder.precomputeCommitments(schemaGvtId, c1)
+    assert not prover1._primaryProofBuilder._eqPools
+    assert not prover1._primaryProofBuilder._gePools
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    assert await presentProofAndVerify(verifier, proofRequest, prover1)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithBackgroundCommitmentPools(prover1, verifier,
+                                                 claimsProver1Gvt,
+                                                 schemaGvtId):
+    # processing the claim started the pools; a worker process fills them
+    eqPool, gePool = await _commitmentPools(prover1, schemaGvtId)
+    _waitFor(lambda: len(eqPool) == eqPool.size and
+             len(gePool) == gePool.size)
+    for pool in (eqPool, gePool):
+        pool.stop()
+        pool.autoStart = False
+    queuedEq = list(eqPool._queue.queue)
+
+    aprimes = []
+    for _ in range(eqPool.size + 1):
+        proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                    verifiableAttributes={
+                                        'uuid1': AttributeInfo(name='name')})
+        proof = await prover1.presentProof(proofRequest)
+        assert await verifier.verify(proofRequest, proof)
+        [proofInfo] = proof.proofs.values()
+        aprimes.append(proofInfo.proof.primaryProof.eqProof.Aprime)
+
+    # the queued commitments are used in order, each by one proof only,
+    # and an empty pool falls back to computing one inline
+    assert aprimes[:-1] == [c.Aprime for c in queuedEq]
+    assert len(set(aprimes)) == len(aprimes)
+    assert len(eqPool) == 0
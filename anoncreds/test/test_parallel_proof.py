@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from anoncreds.protocol.prover import Prover
+from anoncreds.protocol.types import ProofRequest, PredicateGE, \
+    AttributeInfo
+from anoncreds.protocol.verifier import Verifier
+from anoncreds.test.conftest import presentProofAndVerify
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ProcessPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def _proofRequest(verifier):
+    return ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                        verifiableAttributes={
+                            'uuid1': AttributeInfo(name='name'),
+                            'uuid2': AttributeInfo(name='status')},
+                        predicates={'uuid3': PredicateGE('age', 18),
+                                    'uuid4': PredicateGE('height', 170),
+                                    'uuid5': PredicateGE('period', 5)})
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithExecutor(prover1, verifier, claimsProver1, executor):
+    prover = Prover(prover1.wallet, commitmentPoolSize=0, executor=executor)
+    assert await presentProofAndVerify(verifier, _proofRequest(verifier),
+                                       prover)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithExecutorAndCommitmentPools(prover1, verifier,
+                                                  claimsProver1, executor):
+    prover = Prover(prover1.wallet, executor=executor)
+    prover._primaryProofBuilder = prover1._primaryProofBuilder
+    assert await presentProofAndVerify(verifier, _proofRequest(verifier),
+                                       prover)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testProofWithExecutorUnsatisfiedPredicate(prover1, verifier,
+                                                    claimsProver1, executor):
+    prover = Prover(prover1.wallet, executor=executor)
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                predicates={'uuid1': PredicateGE('age', 100)})
+    with pytest.raises(ValueError):
+        await prover.presentProof(proofRequest)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyWithExecutor(prover1, verifier, claimsProver1, executor):
+    proofRequest = _proofRequest(verifier)
+    proof = await prover1.presentProof(proofRequest)
+    parallelVerifier = Verifier(verifier.wallet, executor)
+    assert await parallelVerifier.verify(proofRequest, proof)
+
+    proofRequest.nonce = verifier.generateNonce()
+    assert not await parallelVerifier.verify(proofRequest, proof)
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from anoncreds.protocol.globals import LARGE_E_START, LARGE_E_END_RANGE
+from anoncreds.protocol.primes import genSafePrime, SafePrimePool, \
+    _sieveSafePrimeCandidates, SMALL_PRIMES, genPrimeInRange, EPrimePool
+from config.config import cmod
+
+BITS = 256
+
+
+def isSafePrime(p, bits=BITS):
+    p = cmod.integer(p)
+    return int(p).bit_length() == bits and \
+        cmod.isPrime(p) and cmod.isPrime(2 * p + 1)
+
+
+def testSieveKeepsSafePrimeCandidatesOnly():
+    start = 2 ** 64 + 1
+    candidates = _sieveSafePrimeCandidates(start, 1000)
+    assert candidates
+    for c in candidates:
+        assert c % 2 == 1
+        for s in SMALL_PRIMES[:100]:
+            assert c % s != 0 or c == s
+            assert (2 * c + 1) % s != 0
+
+
+def testGenSafePrime():
+    assert isSafePrime(genSafePrime(BITS, workers=1))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+def testGenSafePrimeParallel():
+    assert isSafePrime(genSafePrime(BITS, workers=2))
+
+
+def testSafePrimePoolPersists(tmpdir):
+    path = str(tmpdir.join('primes.json'))
+    pool = SafePrimePool(path, bits=BITS, workers=1)
+    pool.fill(3)
+    assert len(pool) == 3
+
+    p = pool.pop()
+    assert isSafePrime(p)
+
+    reopened = SafePrimePool(path, bits=BITS, workers=1)
+    assert len(reopened) == 2
+    assert int(p) not in {int(reopened.pop()), int(reopened.pop())}
+    assert len(reopened) == 0
+
+    # an empty pool falls back to generating a prime
+    assert isSafePrime(reopened.pop())
+
+
+def testSafePrimePoolBackgroundFilling(tmpdir):
+    path = str(tmpdir.join('primes.json'))
+    pool = SafePrimePool(path, bits=BITS, workers=1)
+    pool.startFilling(2)
+    pool._thread.join()
+    assert len(pool) == 2
+
+
+def testSafePrimePoolRejectsOtherSize(tmpdir):
+    path = str(tmpdir.join('primes.json'))
+    SafePrimePool(path, bits=BITS, workers=1).fill(1)
+    with pytest.raises(ValueError):
+        len(SafePrimePool(path, bits=BITS * 2))
+
+
+def testGenPrimeInRange():
+    start = 2 ** LARGE_E_START
+    end = start + 2 ** LARGE_E_END_RANGE
+    for _ in range(10):
+        e = genPrimeInRange(start, end)
+        assert start <= e <= end
+        assert cmod.isPrime(e)
+
+
+def testGenPrimeInSmallRange():
+    assert genPrimeInRange(2, 2) == 2
+    assert genPrimeInRange(3, 5) in {3, 5}
+    assert genPrimeInRange(90, 100) == 97
+    with pytest.raises(ValueError):
+        genPrimeInRange(24, 28)
+
+
+def testEPrimePoolNeverReturnsUsedPrime(tmpdir):
+    path = str(tmpdir.join('used'))
+    pool = EPrimePool(size=4, usedPath=path, autoStart=False)
+    pool.fill()
+    assert len(pool) == 4
+
+    drawn = [pool.pop() for _ in range(6)]
+    assert len(set(drawn)) == 6
+    assert all(pool.isUsed(e) for e in drawn)
+
+    # the record survives a restart
+    reopened = EPrimePool(size=4, usedPath=path, autoStart=False)
+    assert all(reopened.isUsed(e) for e in drawn)
+
+
+def testEPrimePoolSkipsPrimesUsedMeanwhile(tmpdir):
+    path = str(tmpdir.join('used'))
+    pool = EPrimePool(size=2, usedPath=path, autoStart=False)
+    pool.fill()
+    queued = list(pool._queue.queue)
+
+    # the queued primes get recorded as used by someone else meanwhile
+    pool._used.update(queued)
+
+    assert pool.pop() not in queued
+    assert len(pool) == 0
+
+
+def testEPrimePoolBackgroundRefill():
+    pool = EPrimePool(size=3)
+    try:
+        pool.pop()
+        deadline = time.time() + 30
+        while len(pool) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(pool) == 3
+    finally:
+        pool.stop()
+
+
+def testEPrimePoolOfSizeZero():
+    pool = EPrimePool(size=0)
+    e = pool.pop()
+    assert pool.isUsed(e)
+    pool.fill()
+    assert len(pool) == 0
+    assert pool._thread is None
@@ -0,0 +1,137 @@
+import pytest
+
+from anoncreds.protocol.exceptions import ProofValidationError
+from anoncreds.protocol.globals import DELTA
+from anoncreds.protocol.proof_validator import ProofValidator
+from anoncreds.protocol.types import ProofRequest, PredicateGE, \
+    AttributeInfo
+from config.config import cmod
+
+
+@pytest.fixture(scope="function")
+def proofRequest(verifier):
+    return ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                        verifiableAttributes={
+                            'uuid1': AttributeInfo(name='name')},
+                        predicates={'uuid2': PredicateGE('age', 18)})
+
+
+@pytest.fixture(scope="function")
+def proof(prover1, claimsProver1Gvt, proofRequest, event_loop):
+    return event_loop.run_until_complete(prover1.presentProof(proofRequest))
+
+
+def _replaceProofItem(proof, primaryProof=None, nonRevocProof=None,
+                      schemaSeqNo=None):
+    [(key, proofItem)] = proof.proofs.items()
+    innerProof = proofItem.proof._replace(
+        primaryProof=primaryProof or proofItem.proof.primaryProof,
+        nonRevocProof=nonRevocProof or proofItem.proof.nonRevocProof)
+    proofItem = proofItem._replace(
+        proof=innerProof,
+        schema_seq_no=schemaSeqNo or proofItem.schema_seq_no)
+    return proof._replace(proofs={key: proofItem})
+
+
+def _primaryProof(proof):
+    [proofItem] = proof.proofs.values()
+    return proofItem.proof.primaryProof
+
+
+def _replaceEqProof(proof, **kwargs):
+    primaryProof = _primaryProof(proof)
+    return _replaceProofItem(proof, primaryProof._replace(
+        eqProof=primaryProof.eqProof._replace(**kwargs)))
+
+
+def _replaceGeProof(proof, **kwargs):
+    primaryProof = _primaryProof(proof)
+    [geProof] = primaryProof.geProofs
+    return _replaceProofItem(proof, primaryProof._replace(
+        geProofs=[geProof._replace(**kwargs)]))
+
+
+async def _assertRejected(verifier, proofRequest, proof):
+    with pytest.raises(ProofValidationError):
+        await ProofValidator(verifier.wallet).validate(proofRequest, proof)
+    with pytest.raises(ProofValidationError):
+        await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testValidProofPasses(verifier, proofRequest, proof):
+    await ProofValidator(verifier.wallet).validate(proofRequest, proof)
+    assert await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectUnknownSchema(verifier, proofRequest, proof):
+    await _assertRejected(verifier, proofRequest,
+                          _replaceProofItem(proof, schemaSeqNo=100500))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectOversizedValues(verifier, proofRequest, proof):
+    big = cmod.integer(2 ** 4000)
+    for kwargs in ({'e': big}, {'v': big}, {'m1': big}, {'m2': big}):
+        await _assertRejected(verifier, proofRequest,
+                              _replaceEqProof(proof, **kwargs))
+    m = dict(_primaryProof(proof).eqProof.m)
+    m['age'] = big
+    await _assertRejected(verifier, proofRequest,
+                          _replaceEqProof(proof, m=m))
+    await _assertRejected(verifier, proofRequest,
+                          _replaceGeProof(proof, alpha=big))
+    u = dict(_primaryProof(proof).geProofs[0].u)
+    u['0'] = big
+    await _assertRejected(verifier, proofRequest,
+                          _replaceGeProof(proof, u=u))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectWrongModulus(verifier, proofRequest, proof):
+    Aprime = _primaryProof(proof).eqProof.Aprime
+    await _assertRejected(verifier, proofRequest,
+                          _replaceEqProof(proof, Aprime=cmod.integer(
+                              int(Aprime)) % cmod.integer(2 ** 2048 + 1)))
+    await _assertRejected(verifier, proofRequest,
+                          _replaceEqProof(proof, Aprime=int(Aprime)))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectWrongIterations(verifier, proofRequest, proof):
+    T = dict(_primaryProof(proof).geProofs[0].T)
+    del T[DELTA]
+    await _assertRejected(verifier, proofRequest, _replaceGeProof(proof, T=T))
+
+    u = dict(_primaryProof(proof).geProofs[0].u)
+    u['4'] = u['0']
+    await _assertRejected(verifier, proofRequest, _replaceGeProof(proof, u=u))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectMissingUnrevealedAttribute(verifier, proofRequest, proof):
+    m = dict(_primaryProof(proof).eqProof.m)
+    del m['age']
+    await _assertRejected(verifier, proofRequest,
+                          _replaceEqProof(proof, m=m))
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectWrongGroupElement(verifier, proofRequest, proof):
+    [proofItem] = proof.proofs.values()
+    nonRevocProof = proofItem.proof.nonRevocProof
+    CProof = nonRevocProof.CProof._replace(E=nonRevocProof.CProof.W)
+    await _assertRejected(verifier, proofRequest, _replaceProofItem(
+        proof, nonRevocProof=nonRevocProof._replace(CProof=CProof)))
+
+    XList = nonRevocProof.XList._replace(rho=nonRevocProof.CProof.E)
+    await _assertRejected(verifier, proofRequest, _replaceProofItem(
+        proof, nonRevocProof=nonRevocProof._replace(XList=XList)))
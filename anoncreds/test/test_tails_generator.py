@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from anoncreds.protocol.globals import PAIRING_GROUP
+from anoncreds.protocol.revocation.accumulators.tails_generator import \
+    TailsGenerator
+from config.config import cmod
+
+L = 5
+
+
+@pytest.fixture(scope="module")
+def generators():
+    group = cmod.PairingGroup(PAIRING_GROUP)
+    return group.random(cmod.G1), group.random(cmod.G2)
+
+
+def assertTails(tails, gamma, g, gprime):
+    assert sorted(tails.g) == sorted(tails.gprime) == \
+        [i for i in range(2 * L) if i != L + 1]
+    for i in tails.g:
+        assert tails.g[i] == g ** (gamma ** i)
+        assert tails.gprime[i] == gprime ** (gamma ** i)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testGenerateTailsInChunks(generators):
+    g, gprime = generators
+    tails, gamma = await TailsGenerator(chunkSize=3, workers=1).generate(
+        g, gprime, L)
+    assertTails(tails, gamma, g, gprime)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testGenerateTailsInProcessPool(generators):
+    g, gprime = generators
+    with ProcessPoolExecutor(2) as executor:
+        tails, gamma = await TailsGenerator(chunkSize=3).generate(
+            g, gprime, L, executor)
+    assertTails(tails, gamma, g, gprime)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testResumeTailsGeneration(generators, tmpdir):
+    g, gprime = generators
+    generator = TailsGenerator(str(tmpdir.join('tails')), chunkSize=3,
+                               workers=1)
+    tails, gamma = await generator.generate(g, gprime, L)
+    manifest = os.path.join(generator.path, TailsGenerator.MANIFEST)
+    assert os.stat(manifest).st_mode & 0o777 == 0o600
+
+    # as if the generation was interrupted before the last chunk
+    os.remove(generator._chunkPath(9))
+    resumed, resumedGamma = await generator.generate(g, gprime, L)
+    assert resumedGamma == gamma
+    assert resumed.g == tails.g
+    assert resumed.gprime == tails.gprime
+
+    with pytest.raises(ValueError):
+        await generator.generate(g, gprime, L + 1)
@@ -3,7 +3,10 @@ import pytest
 from anoncreds.protocol.types import PublicKey, Schema, Claims, \
     ProofRequest, PredicateGE, FullProof, \
     SchemaKey, ClaimRequest, Proof, AttributeInfo, ProofInfo, AggregatedProof, RequestedProof, PrimaryProof, \
-    PrimaryEqualProof, PrimaryPredicateGEProof, ID, ClaimAttributeValues
+    PrimaryEqualProof, PrimaryPredicateGEProof, ID, ClaimAttributeValues, \
+    Accumulator
+from anoncreds.protocol.bitset import BitSet
+from anoncreds.protocol.utils import serializeToStr, deserializeFromStr
 from config.config import cmod
 
 
@@ -402,3 +405,76 @@ async def test_proof_from_to_dict(prover1, nonce, claimsProver1Gvt, schemaGvt):
                       schema_seq_no=proofInfo.schema_seq_no)
 
     assert proof == ProofInfo.from_str_dict(proof.to_str_dict(), n)
+
+
+def testAccumulatorMembersAtEpoch():
+    accum = Accumulator(iA=1, acc=1, V=BitSet(), L=5)
+    accum.add(1)
+    accum.add(2)
+    epoch = accum.epoch
+    accum.remove(2)
+    accum.add(3)
+    accum.add(4)
+    accum.remove(4)
+    accum.remove(5)
+
+    assert accum.epoch == epoch + 4
+    assert accum.V == {1, 3}
+    assert accum.membersAt(epoch) == {1, 2}
+    assert accum.changesSince(epoch) == ({3}, {2})
+    assert accum.changesSince(accum.epoch) == (set(), set())
+
+
+def testAccumulatorChangesOutsideLog():
+    accum = Accumulator(iA=1, acc=1, V=BitSet({1, 2}), L=5, changes=[2],
+                        firstEpoch=1)
+    accum.add(3)
+    assert accum.epoch == 3
+    assert accum.changesSince(1) == ({2, 3}, set())
+    with pytest.raises(ValueError):
+        accum.changesSince(0)
+    with pytest.raises(ValueError):
+        accum.changesSince(4)
+
+
+def testAccumulatorChangeLogIsBounded():
+    accum = Accumulator(iA=1, acc=1, V=BitSet(), L=20, maxChanges=3)
+    for i in range(1, 11):
+        accum.add(i)
+        assert 3 <= len(accum.changes) < 6 or accum.epoch < 3
+    assert accum.epoch == 10
+    assert accum.firstEpoch == 10 - len(accum.changes)
+    assert accum.changesSince(7) == ({8, 9, 10}, set())
+    with pytest.raises(ValueError):
+        accum.changesSince(accum.firstEpoch - 1)
+
+    restored = Accumulator.fromStrDict(accum.toStrDict())
+    assert restored.firstEpoch == accum.firstEpoch
+    assert restored.changes == accum.changes
+
+
+def testAccumulatorFromToDict():
+    accum = Accumulator(iA='110', acc=1, V=BitSet(), L=5)
+    accum.add(1)
+    accum.add(2)
+    accum.remove(1)
+    accum.currentI = 3
+    restored = Accumulator.fromStrDict(accum.toStrDict())
+    assert restored == accum
+    assert restored.epoch == accum.epoch
+    assert restored.membersAt(1) == {1}
+
+
+def testAccumulatorMembersSerializedAsBits():
+    accum = Accumulator(iA='110', acc=1, V=BitSet({1, 9, 1000}), L=1000)
+    data = accum.toStrDict()
+    assert data['V'] == serializeToStr(BitSet({1, 9, 1000}))
+    assert len(data['V']) < 200
+    restored = Accumulator.fromStrDict(data)
+    assert isinstance(restored.V, BitSet)
+    assert restored.V == {1, 9, 1000}
+
+    # an accumulator stored with V as a list of members
+    data['V'] = [serializeToStr(i) for i in (1, 9, 1000)]
+    assert Accumulator.fromStrDict(data).V == {1, 9, 1000}
+    assert deserializeFromStr(serializeToStr(BitSet())) == BitSet()
@@ -4,7 +4,8 @@ import pytest
 
 from anoncreds.protocol.globals import PAIRING_GROUP
 from anoncreds.protocol.utils import toDictWithStrValues, \
-    deserializeFromStr, serializeToStr, fromDictWithStrValues, get_hash_as_int, intToArrayBytes, bytesToInt
+    deserializeFromStr, serializeToStr, fromDictWithStrValues, get_hash_as_int, intToArrayBytes, bytesToInt, \
+    multiExp, randomQR, PairingProduct
 from anoncreds.test.conftest import primes
 from config.config import cmod
 
@@ -48,6 +49,15 @@ def testGroupElementG1IdentitySerializeToFromStr():
     assert identity == deserializeFromStr(serializeToStr(identity))
 
 
+def testGroupElementG2IdentitySerializeToFromStr():
+    group = cmod.PairingGroup(PAIRING_GROUP)
+    identity = group.init(cmod.G2, 0)
+    restored = deserializeFromStr(serializeToStr(identity))
+    assert restored.type == cmod.G2
+    elem = group.random(cmod.G2)
+    assert restored * elem == elem
+
+
 @pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
 def testToFromDictWithStrValues():
     group = cmod.PairingGroup(PAIRING_GROUP)
@@ -218,3 +228,56 @@ def testBytesToInt():
 def testIntToArrayBytesAndBack():
     val = cmod.integer(1606507817390189252221968804450207070282033)
     assert val == bytesToInt(intToArrayBytes(val))
+
+
+def _directProduct(pairs, N):
+    result = 1 % N
+    for base, exp in pairs:
+        result = result * (base ** exp) % N
+    return result
+
+
+@pytest.fixture(scope="module")
+def N():
+    pPrime, qPrime = primes.get("prime1")
+    return cmod.integer((2 * pPrime + 1) * (2 * qPrime + 1))
+
+
+def testMultiExpManyBases(N):
+    pairs = [(randomQR(N), cmod.integer(cmod.randomBits(592)))
+             for _ in range(30)]
+    pairs.append((randomQR(N), cmod.integer(cmod.randomBits(3060))))
+    assert multiExp(pairs, N) == _directProduct(pairs, N)
+
+
+def testMultiExpMixedSizesAndSigns(N):
+    pairs = [(randomQR(N), cmod.integer(cmod.randomBits(bits)))
+             for bits in (1, 7, 40, 200, 600, 1200, 2000)]
+    pairs.append((randomQR(N), -1 * cmod.integer(cmod.randomBits(256))))
+    pairs.append((randomQR(N), 0))
+    assert multiExp(pairs, N) == _directProduct(pairs, N)
+
+
+def testMultiExpFewBases(N):
+    assert multiExp([], N) == 1 % N
+    pairs = [(randomQR(N), cmod.integer(cmod.randomBits(592)))]
+    assert multiExp(pairs, N) == _directProduct(pairs, N)
+    pairs.append((randomQR(N), 12345))
+    assert multiExp(pairs, N) == _directProduct(pairs, N)
+
+
+def testPairingProduct():
+    group = cmod.PairingGroup(PAIRING_GROUP)
+    g1, g2, h1, h2 = (group.random(cmod.G1) for _ in range(4))
+    x, y = group.random(cmod.ZR), group.random(cmod.ZR)
+    const = cmod.pair(h1, h2)
+
+    expected = (cmod.pair(g1, h1) ** x) * cmod.pair(g2, h1) / \
+        (cmod.pair(g2, h2) * const ** y)
+    product = PairingProduct([(g1 ** x, h1), (g2, h1)]) / \
+        PairingProduct([(g2, h2)], [(const, y)])
+    assert product.value() == expected
+    assert (product ** y).value() == expected ** y
+    assert (PairingProduct(powers=[(const, None)]) /
+            PairingProduct(powers=[(const, None)])).value() == \
+        const / const
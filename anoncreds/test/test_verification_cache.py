@@ -0,0 +1,176 @@
+import pytest
+
+from anoncreds.protocol.exceptions import NonceError
+from anoncreds.protocol.nonce_registry import NonceRegistry
+from anoncreds.protocol.types import ProofRequest, AttributeInfo
+from anoncreds.protocol.verification_cache import VerificationCache
+from anoncreds.protocol.verifier import Verifier
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def testCacheResult():
+    cache = VerificationCache(size=10, ttl=10)
+    assert cache.get('a', {}) is None
+    cache.put('a', {}, True)
+    cache.put('b', {1: 'acc1'}, False)
+    assert cache.get('a', {}) is True
+    assert cache.get('b', {1: 'acc1'}) is False
+
+
+def testCacheExpires():
+    clock = Clock()
+    cache = VerificationCache(size=10, ttl=10, clock=clock)
+    cache.put('a', {}, True)
+    clock.now = 9
+    assert cache.get('a', {}) is True
+    clock.now = 10
+    assert cache.get('a', {}) is None
+    assert len(cache) == 0
+
+
+def testCacheEvictsLeastRecentlyUsed():
+    cache = VerificationCache(size=2, ttl=10)
+    cache.put('a', {}, True)
+    cache.put('b', {}, True)
+    assert cache.get('a', {}) is True
+    cache.put('c', {}, True)
+    assert cache.get('b', {}) is None
+    assert cache.get('a', {}) is True
+    assert cache.get('c', {}) is True
+
+
+def testCacheInvalidatedByAccumulatorVersion():
+    cache = VerificationCache(size=10, ttl=10)
+    cache.put('a', {1: 'acc1'}, True)
+    assert cache.get('a', {1: 'acc2'}) is None
+    assert cache.get('a', {1: 'acc1'}) is None
+
+
+@pytest.fixture(scope="function")
+def cachingVerifier(verifier):
+    verifier = Verifier(verifier.wallet, cache=VerificationCache())
+    verified = []
+    verify = verifier._verify
+
+    async def countingVerify(*args):
+        verified.append(args)
+        return await verify(*args)
+
+    verifier._verify = countingVerify
+    verifier.verified = verified
+    return verifier
+
+
+@pytest.fixture(scope="function")
+def proofRequest(verifier):
+    return ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                        verifiableAttributes={
+                            'uuid1': AttributeInfo(name='name')})
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRetryIsNotVerifiedAgain(prover1, claimsProver1Gvt,
+                                      cachingVerifier, proofRequest):
+    proof = await prover1.presentProof(proofRequest)
+    assert await cachingVerifier.verify(proofRequest, proof)
+    assert await cachingVerifier.verify(proofRequest, proof)
+    assert len(cachingVerifier.verified) == 1
+
+    otherRequest = ProofRequest("proof1", "1.0",
+                                cachingVerifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    assert not await cachingVerifier.verify(otherRequest, proof)
+    assert len(cachingVerifier.verified) == 2
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRevocationInvalidatesResult(prover1, claimsProver1Gvt,
+                                          issuerGvt, schemaGvtId,
+                                          cachingVerifier, proofRequest):
+    proof = await prover1.presentProof(proofRequest)
+    assert await cachingVerifier.verify(proofRequest, proof)
+
+    await issuerGvt.revoke(schemaGvtId, 1)
+    await cachingVerifier.verify(proofRequest, proof)
+    assert len(cachingVerifier.verified) == 2
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testCachedProofIsNotReplayed(prover1, claimsProver1Gvt, verifier):
+    verifier = Verifier(verifier.wallet, nonceRegistry=NonceRegistry(),
+                        cache=VerificationCache())
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    proof = await prover1.presentProof(proofRequest)
+
+    assert await verifier.verify(proofRequest, proof)
+    with pytest.raises(NonceError):
+        await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testCachedFailureKeepsNonce(prover1, claimsProver1Gvt, verifier):
+    verifier = Verifier(verifier.wallet, nonceRegistry=NonceRegistry(),
+                        cache=VerificationCache())
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    otherRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    junk = await prover1.presentProof(otherRequest)
+    assert not await verifier.verify(proofRequest, junk)
+    assert not await verifier.verify(proofRequest, junk)
+
+    proof = await prover1.presentProof(proofRequest)
+    assert await verifier.verify(proofRequest, proof)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testUnchangedAccumulatorIsNotFetched(prover1, claimsProver1Gvt,
+                                               issuerGvt, schemaGvtId,
+                                               cachingVerifier, proofRequest,
+                                               monkeypatch):
+    wallet = cachingVerifier.wallet
+    fetched = []
+    updateAccumulator = wallet.updateAccumulator
+
+    async def countingUpdate(*args, **kwargs):
+        fetched.append(kwargs)
+        return await updateAccumulator(*args, **kwargs)
+
+    monkeypatch.setattr(wallet, 'updateAccumulator', countingUpdate)
+    proof = await prover1.presentProof(proofRequest)
+    assert await cachingVerifier.verify(proofRequest, proof)
+    fetched.clear()
+
+    # a cache hit and a fresh proof against the same accumulator only ask
+    # the repo for its version
+    assert await cachingVerifier.verify(proofRequest, proof)
+    otherRequest = ProofRequest("proof1", "1.0",
+                                cachingVerifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')})
+    assert await cachingVerifier.verify(
+        otherRequest, await prover1.presentProof(otherRequest))
+    assert not fetched
+    assert len(cachingVerifier.verified) == 2
+
+    # a new version of the accumulator is noticed
+    await issuerGvt.revoke(schemaGvtId, 1)
+    await cachingVerifier.verify(proofRequest, proof)
+    assert len(cachingVerifier.verified) == 3
@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import pytest
+
+from anoncreds.protocol.types import ProofRequest, AttributeInfo, \
+    PredicateGE
+from anoncreds.protocol.verification_server import VerificationServer, \
+    HttpError
+
+
+@pytest.fixture(scope="function")
+def claimsProver1GvtPrimary(prover1, issuerGvt, schemaGvtId, keysGvt,
+                            attrsProver1Gvt, event_loop):
+    # to_str_dict of a proof carries only primary proofs
+    claimRequest = event_loop.run_until_complete(
+        prover1.createClaimRequest(schemaGvtId, reqNonRevoc=False))
+    signature, claim = event_loop.run_until_complete(
+        issuerGvt.issueClaim(schemaGvtId, claimRequest))
+    event_loop.run_until_complete(
+        prover1.processClaim(schemaGvtId, claim, signature))
+
+
+@pytest.fixture(scope="function")
+def server(verifier, event_loop):
+    server = VerificationServer(verifier, concurrency=2)
+    event_loop.run_until_complete(server.start())
+    yield server
+    event_loop.run_until_complete(server.stop())
+
+
+async def _post(server, path, body: bytes):
+    host, port = server.sockets[0].getsockname()[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write('POST {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n'.format(
+        path, len(body)).encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(body.decode())
+
+
+async def _postProof(server, proofRequest, proof):
+    return await _post(server, '/verify', json.dumps({
+        'proof_request': proofRequest.to_str_dict(),
+        'proof': proof.to_str_dict()}).encode())
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyOverHttp(prover1, claimsProver1GvtPrimary, verifier,
+                             server):
+    proofRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    proof = await prover1.presentProof(proofRequest)
+    assert await _postProof(server, proofRequest, proof) == \
+        (200, {'verified': True})
+
+    otherRequest = ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                                verifiableAttributes={
+                                    'uuid1': AttributeInfo(name='name')},
+                                predicates={'uuid2': PredicateGE('age', 18)})
+    assert await _postProof(server, otherRequest, proof) == \
+        (200, {'verified': False})
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectMalformedRequests(server):
+    status, _ = await _post(server, '/verify', b'{"proof": {}}')
+    assert status == 400
+    status, _ = await _post(server, '/verify', b'not json')
+    assert status == 400
+    status, _ = await _post(server, '/other', b'{}')
+    assert status == 404
+
+
+class BlockedVerifier:
+    def __init__(self, wallet):
+        self.wallet = wallet
+        self.release = asyncio.Event()
+
+    async def verify(self, proofRequest, proof):
+        await self.release.wait()
+        return True
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectWhenOverloaded(verifier):
+    blocked = BlockedVerifier(verifier.wallet)
+    server = VerificationServer(blocked, concurrency=1, queueSize=1)
+    await server.start()
+    try:
+        # one proof is being verified and one is waiting
+        first = asyncio.ensure_future(server.submit(None, None))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(server.submit(None, None))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HttpError) as ex:
+            await server.submit(None, None)
+        assert ex.value.status == 503
+
+        blocked.release.set()
+        assert await first and await second
+    finally:
+        await server.stop()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectSlowAndOversizedHeaders(verifier):
+    server = VerificationServer(verifier, concurrency=1, readTimeout=0.1)
+    await server.start()
+    try:
+        host, port = server.sockets[0].getsockname()[:2]
+
+        # a client that never finishes its request
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'POST /verify HTTP/1.1\r\n')
+        response = await reader.read()
+        writer.close()
+        assert int(response.split()[1]) == 408
+
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'POST /verify HTTP/1.1\r\n' +
+                     b'X-Header: 1\r\n' * 150 + b'\r\n')
+        response = await reader.read()
+        writer.close()
+        assert int(response.split()[1]) == 400
+    finally:
+        await server.stop()
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testRejectTooManyConnections(verifier):
+    server = VerificationServer(verifier, concurrency=1, maxConnections=1)
+    await server.start()
+    try:
+        host, port = server.sockets[0].getsockname()[:2]
+        # the first connection holds the only slot
+        _, idle = await asyncio.open_connection(host, port)
+        await asyncio.sleep(0.1)
+
+        status, _ = await _post(server, '/verify', b'{}')
+        assert status == 503
+        idle.close()
+    finally:
+        await server.stop()
@@ -0,0 +1,114 @@
+import pytest
+
+from anoncreds.protocol.types import ProofRequest, PredicateGE, \
+    AttributeInfo
+
+
+def _proofRequest(verifier, **predicates):
+    return ProofRequest("proof1", "1.0", verifier.generateNonce(),
+                        verifiableAttributes={
+                            'uuid1': AttributeInfo(name='name')},
+                        predicates=predicates)
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatch(prover1, prover2, verifier, claimsProver1Gvt,
+                          claimsProver2Gvt, schemaGvtId):
+    batch = []
+    for prover in (prover1, prover2, prover1):
+        proofRequest = _proofRequest(verifier, uuid2=PredicateGE('age', 18))
+        batch.append((proofRequest, await prover.presentProof(proofRequest)))
+
+    assert await verifier.verifyBatch(batch) == [True, True, True]
+    pk = await verifier.wallet.getPublicKey(schemaGvtId)
+    assert pk.precomputed
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatchReportsBadProofs(prover1, prover2, verifier,
+                                          claimsProver1Gvt, claimsProver2Gvt):
+    proofRequest1 = _proofRequest(verifier)
+    proof1 = await prover1.presentProof(proofRequest1)
+    proofRequest2 = _proofRequest(verifier)
+    proof2 = await prover2.presentProof(proofRequest2)
+    # a proof for another request (nonce)
+    otherRequest = _proofRequest(verifier)
+    # a proof that doesn't reveal the requested predicate
+    withPredicate = _proofRequest(verifier, uuid2=PredicateGE('age', 18))
+    withPredicate.nonce = proofRequest1.nonce
+
+    batch = [(proofRequest1, proof1), (otherRequest, proof2),
+             (proofRequest2, proof2), (withPredicate, proof1)]
+    assert await verifier.verifyBatch(batch) == [True, False, True, False]
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatchEmpty(verifier):
+    assert await verifier.verifyBatch([]) == []
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatchUpdatesAccumulatorOnce(prover1, prover2, verifier,
+                                                claimsProver1Gvt,
+                                                claimsProver2Gvt):
+    batch = []
+    for prover in (prover1, prover2, prover1, prover2):
+        proofRequest = _proofRequest(verifier)
+        batch.append((proofRequest, await prover.presentProof(proofRequest)))
+
+    updates = []
+    updateAccumulator = verifier.wallet.updateAccumulator
+
+    async def countingUpdate(*args, **kwargs):
+        updates.append(args)
+        return await updateAccumulator(*args, **kwargs)
+
+    verifier.wallet.updateAccumulator = countingUpdate
+    assert await verifier.verifyBatch(batch) == [True] * 4
+    assert len(updates) == 1
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatchReportsRevokedClaims(prover1, prover2, verifier,
+                                              issuerGvt, schemaGvtId,
+                                              claimsProver1Gvt,
+                                              claimsProver2Gvt):
+    batch = []
+    for prover in (prover1, prover2):
+        proofRequest = _proofRequest(verifier)
+        batch.append((proofRequest, await prover.presentProof(proofRequest)))
+
+    await issuerGvt.revoke(schemaGvtId, 1)
+    proofRequest = _proofRequest(verifier)
+    batch.append((proofRequest, await prover2.presentProof(proofRequest)))
+
+    assert await verifier.verifyBatch(batch) == [False, False, True]
+
+
+@pytest.mark.skipif('sys.platform == "win32"', reason='SOV-86')
+@pytest.mark.asyncio
+async def testVerifyBatchReportsAccumulatorErrors(prover1, prover2, verifier,
+                                                  claimsProver1Gvt,
+                                                  claimsProver2Gvt):
+    batch = []
+    for prover in (prover1, prover2, prover1):
+        proofRequest = _proofRequest(verifier)
+        batch.append((proofRequest, await prover.presentProof(proofRequest)))
+    # the accumulator at this time can't be fetched
+    batch[1][0].ts = 1
+
+    nonRevocVerifier = verifier._nonRevocVerifier
+    getAccumState = nonRevocVerifier._getAccumState
+
+    async def failingGetAccumState(proofRequest, schema_seq_no):
+        if proofRequest.ts == 1:
+            raise RuntimeError('Repo is not available')
+        return await getAccumState(proofRequest, schema_seq_no)
+
+    nonRevocVerifier._getAccumState = failingGetAccumState
+    assert await verifier.verifyBatch(batch) == [True, False, True]